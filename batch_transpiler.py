@@ -0,0 +1,176 @@
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import line_cache
+import transpile_options
+from file_transpiler import transpile_file
+from build_cache import BuildCache, cached_transpile
+
+SOURCE_EXTENSION = ".tpy"
+
+def glob_root(pattern):
+    """
+    Returns the part of a glob pattern before its first wildcard, the
+    directory every match lies under.
+    """
+    prefix = []
+    for part in pattern.split(os.sep):
+        if glob.has_magic(part):
+            break
+        prefix.append(part)
+    return os.sep.join(prefix) or "."
+
+def collect_sources(inputs):
+    """
+    Expands files, directories and glob patterns into (source, root) pairs.
+    Directories are searched recursively for .tpy files; root is the
+    directory the source was found under (for a glob, the part of the
+    pattern before its first wildcard) and is used to mirror the layout
+    into an output directory. Results are sorted and de-duplicated so the
+    same inputs always produce the same job list.
+    """
+    sources = []
+    seen = set()
+
+    def add(path, root):
+        path = os.path.normpath(path)
+        if path not in seen:
+            seen.add(path)
+            sources.append((path, root))
+
+    for item in inputs:
+        if os.path.isdir(item):
+            found = []
+            for dir_path, dir_names, file_names in os.walk(item):
+                dir_names.sort()
+                for name in file_names:
+                    if name.endswith(SOURCE_EXTENSION):
+                        found.append(os.path.join(dir_path, name))
+            for path in sorted(found):
+                add(path, item)
+        elif glob.has_magic(item):
+            root = glob_root(item)
+            for path in sorted(glob.glob(item, recursive=True)):
+                if os.path.isfile(path):
+                    add(path, root)
+        else:
+            add(item, os.path.dirname(item))
+
+    return sources
+
+def output_path_for(source_path, root, out_dir=None):
+    """
+    Returns the output path for a source: next to it by default, or at the
+    same relative location under out_dir.
+    """
+    if out_dir is None:
+        return os.path.splitext(source_path)[0] + ".py"
+    relative = os.path.relpath(source_path, root or ".")
+    return os.path.join(out_dir, os.path.splitext(relative)[0] + ".py")
+
+def output_paths(sources, out_dir=None):
+    """
+    Maps every (source, root) pair to its output path. Raises ValueError
+    when two sources would be written to the same output.
+    """
+    outputs = {}
+    owners = {}
+    for source, root in sources:
+        output_path = output_path_for(source, root, out_dir)
+        key = os.path.normcase(os.path.normpath(output_path))
+        if key in owners:
+            raise ValueError(f"{owners[key]} and {source} would both be written to {output_path}")
+        owners[key] = source
+        outputs[source] = output_path
+    return outputs
+
+def quiet_transpile(source_path, output_path, source_map=False, workers=1):
+    transpile_file(source_path, output_path, verbose=False, source_map=source_map, workers=workers)
+
+def transpile_job(job):
+    """
+    Worker entry point: transpiles one (source, output, cache_dir, options,
+    source_map, file_workers) job and reports (source, output, error, cache_hit,
+    line_counts) instead of raising, so one bad file does not stop the batch.
+    file_workers is the process count a large file may be split over;
+    line_counts are the (hits, misses, evictions) of the worker's line cache
+    during the job.
+    """
+    source_path, output_path, cache_dir, options, source_map, file_workers = job
+    transpile = partial(quiet_transpile, workers=file_workers)
+    cache = line_cache.shared()
+    before = cache.counters() if cache is not None else (0, 0, 0)
+
+    def line_counts():
+        after = cache.counters() if cache is not None else (0, 0, 0)
+        return tuple(count - start for count, start in zip(after, before))
+
+    try:
+        if os.path.dirname(output_path):
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with transpile_options.using(**options):
+            if cache_dir is None:
+                transpile(source_path, output_path, source_map)
+                return source_path, output_path, None, False, line_counts()
+            hit = cached_transpile(transpile, source_path, output_path, BuildCache(cache_dir), source_map)
+            return source_path, output_path, None, hit, line_counts()
+    except Exception as e:
+        return source_path, output_path, f"{type(e).__name__}: {e}", False, line_counts()
+
+def transpile_batch(inputs, out_dir=None, workers=None, cache=None, options=None, source_map=False):
+    """
+    Transpiles every source matched by inputs on one warm process pool.
+    Returns a list of (source, output, error, cache_hit, line_counts) tuples
+    in job order; error is None for files that transpiled successfully.
+    Every worker keeps one line cache, of this process's size, for all the
+    files it is handed. When a BuildCache
+    is given, unchanged sources are served from it and its counters are
+    updated once the batch is done. options are code-generation options for
+    every file (default: the ones active in this process). With source_map,
+    a line map is written next to every output. Raises ValueError, before
+    anything is written, if two sources map to the same output path.
+    """
+    cache_dir = cache.cache_dir if cache is not None else None
+    if options is None:
+        options = transpile_options.current()
+    sources = collect_sources(inputs)
+    outputs = output_paths(sources, out_dir)
+    # Files are only split over processes when -j asks for it and they are
+    # not already spread over a pool, e.g. a single large file
+    file_workers = workers or 1
+    if workers is None:
+        workers = os.cpu_count() or 1
+    pool_workers = max(1, min(workers, len(sources)))
+    if pool_workers > 1:
+        file_workers = 1
+    jobs = [(source, outputs[source], cache_dir, options, source_map, file_workers)
+            for source, _ in sources]
+    workers = pool_workers
+
+    if workers == 1:
+        results = [transpile_job(job) for job in jobs]
+    else:
+        # Hand out several files per task to keep pool round-trips cheap
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=line_cache.configure,
+                                 initargs=(line_cache.configured_size(),)) as executor:
+            results = list(executor.map(transpile_job, jobs, chunksize=chunksize))
+
+    if cache is not None:
+        hits = sum(1 for _, _, error, hit, _ in results if hit)
+        misses = sum(1 for _, _, error, hit, _ in results if error is None and not hit)
+        cache.record(hits=hits, misses=misses)
+        cache.evict()
+    return results
+
+def print_summary(results):
+    """
+    Prints a per-file failure report and the overall counts.
+    Returns the number of failed files.
+    """
+    failures = [(source, error) for source, _, error, _, _ in results if error is not None]
+    for source, error in failures:
+        print(f"❌ {source}: {error}")
+    print(f"✅ {len(results) - len(failures)} transpiled, {len(failures)} failed")
+    return len(failures)
@@ -0,0 +1,126 @@
+"""
+Memory and speed benchmark for the array storage backends.
+
+Transpiles one numeric TinyPy program with array_backend="list" and
+array_backend="array", runs each phase of the generated code and reports
+the peak traced memory and best wall time per phase:
+    allocate  declare an int and a float array of n elements
+    fill      write n distinct values through indexing
+    sum       iterate the filled array with a foreach loop
+    read      read elements with enter() into an array element
+
+Run from the repository root:
+    python -m benchmarks.bench_array_backend --size 1000000
+"""
+import argparse
+import io
+import sys
+import time
+import tracemalloc
+
+import transpile_options
+from file_transpiler import transpile_source
+
+PROGRAM = """
+int allocate(int n) {
+    int a[n];
+    float f[n];
+    ret 0;
+}
+int fill(int n) {
+    int a[n];
+    float f[n];
+    repeatFor(int i = 0; i < n; i++) {
+        a[i] = i * 3;
+        f[i] = i * 0.5;
+    }
+    ret 0;
+}
+int sum(int n) {
+    int a[n];
+    repeatFor(int i = 0; i < n; i++) {
+        a[i] = i;
+    }
+    int total = 0;
+    for(x : a) {
+        total = total + x;
+    }
+    ret total;
+}
+int read(int n) {
+    int a[n];
+    repeatFor(int i = 0; i < n; i++) {
+        enter("%i", a[i]);
+    }
+    ret 0;
+}
+"""
+
+PHASES = ("allocate", "fill", "sum", "read")
+
+def load(backend):
+    """
+    Transpiles PROGRAM with the given backend and returns its namespace.
+    """
+    namespace = {"__name__": "bench_program"}
+    exec(compile(transpile_source(PROGRAM, array_backend=backend), "<bench>", "exec"), namespace)
+    return namespace
+
+def run_phase(func, size, stdin_text):
+    if stdin_text is None:
+        return func(size)
+    saved = sys.stdin
+    sys.stdin = io.StringIO(stdin_text)
+    try:
+        return func(size)
+    finally:
+        sys.stdin = saved
+
+def measure(func, size, repeat, stdin_text=None):
+    """
+    Returns (best seconds, peak traced bytes) for func(size).
+    Memory is traced in a separate run so it does not skew the timings.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run_phase(func, size, stdin_text)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        run_phase(func, size, stdin_text)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare list and array.array storage for TinyPy arrays.")
+    parser.add_argument("--size", type=int, default=1000000, help="elements per array")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per phase (best is kept)")
+    args = parser.parse_args(argv)
+
+    input_size = min(args.size, 100000)
+    stdin_text = "".join(f"{i}\n" for i in range(input_size))
+    results = {}
+    for backend in transpile_options.CHOICES["array_backend"]:
+        namespace = load(backend)
+        for phase in PHASES:
+            if phase == "read":
+                results[backend, phase] = measure(namespace[phase], input_size, args.repeat, stdin_text)
+            else:
+                results[backend, phase] = measure(namespace[phase], args.size, args.repeat)
+
+    print(f"{'phase':10s} {'backend':8s} {'seconds':>10s} {'peak MiB':>10s}")
+    for phase in PHASES:
+        for backend in transpile_options.CHOICES["array_backend"]:
+            seconds, peak = results[backend, phase]
+            print(f"{phase:10s} {backend:8s} {seconds:10.4f} {peak / (1024 * 1024):10.2f}")
+        list_seconds, list_peak = results["list", phase]
+        array_seconds, array_peak = results["array", phase]
+        print(f"{'':10s} {'ratio':8s} {array_seconds / list_seconds:9.2f}x {array_peak / max(list_peak, 1):9.2f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Scaling benchmark for the thereBe/alas block index.
+
+Generates TinyPy programs with growing nesting depth and block length and
+reports the cost per source line of build_block_index and of a full
+transpile_file run. Both should stay flat as the input grows; the script
+exits with a non-zero status when the per-line cost of the largest input
+is more than MAX_GROWTH times that of the smallest one.
+
+Run from the repository root:
+    python -m benchmarks.bench_block_index
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from file_transpiler import build_block_index, transpile_file
+from tinypy_lexer import tokenize
+
+MAX_GROWTH = 3.0
+SHAPES = [(depth, length) for depth in (10, 40, 160) for length in (5, 50)]
+
+def generate_nested_program(depth, block_length):
+    """
+    Builds a main() holding `depth` nested thereBe{ blocks, each with
+    `block_length` statements, closed alternately with }if( and with a
+    closing brace followed by an if( line.
+    """
+    lines = ["int main() {"]
+    for level in range(depth):
+        lines.append("thereBe{")
+        lines.extend(f"x{level} = x{level} + {n};" for n in range(block_length))
+    for level in reversed(range(depth)):
+        if level % 2:
+            lines.append(f"}}if(x{level} > 0)")
+        else:
+            lines.append("}")
+            lines.append(f"if(x{level} == 0)")
+    lines.append("alas{")
+    lines.extend(f"y = y + {n};" for n in range(block_length))
+    lines.append("}")
+    lines.append("ret 0;")
+    lines.append("}")
+    return lines
+
+def time_per_line(func, line_count, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best / line_count * 1e6
+
+def main():
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        source_path = os.path.join(tmp, "nested.tpy")
+        output_path = os.path.join(tmp, "nested.py")
+        for depth, block_length in SHAPES:
+            lines = generate_nested_program(depth, block_length)
+            with open(source_path, "w") as f:
+                f.write("\n".join(lines))
+            tokens = list(tokenize(lines))
+
+            def run_transpile():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    transpile_file(source_path, output_path)
+
+            index_cost = time_per_line(lambda: build_block_index(tokens), len(lines))
+            file_cost = time_per_line(run_transpile, len(lines))
+            results.append((len(lines), index_cost, file_cost))
+            print(f"depth={depth:4d} block={block_length:3d} lines={len(lines):6d}  "
+                  f"index {index_cost:6.3f} us/line  transpile {file_cost:6.3f} us/line")
+
+    results.sort()
+    smallest, largest = results[0], results[-1]
+    growth = largest[1] / smallest[1]
+    print(f"index cost growth from {smallest[0]} to {largest[0]} lines: {growth:.2f}x")
+    if growth > MAX_GROWTH:
+        print("❌ block index does not scale linearly")
+        return 1
+    print("✅ block index scales linearly")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
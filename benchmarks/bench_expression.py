@@ -0,0 +1,61 @@
+"""
+Microbenchmark for the expression rewriter.
+
+Compares translate_expression with the eight-pass re.sub rewriter it
+replaced (kept here as LEGACY_PASSES for reference) on a set of typical
+TinyPy expressions, and reports the cost per expression.
+
+Run from the repository root:
+    python -m benchmarks.bench_expression
+"""
+import re
+import sys
+import timeit
+
+from expression_transpiler import translate_expression
+
+# The rewrite used by conditional_transpiler and loop_transpiler before the
+# single-pass translator: one re.sub per operator plus a whitespace clean-up.
+LEGACY_PASSES = [
+    (re.compile(r'\btrue\b'), 'True'),
+    (re.compile(r'\bfalse\b'), 'False'),
+    (re.compile(r'\&\&'), ' and '),
+    (re.compile(r'\|\|'), ' or '),
+    (re.compile(r'\!([^=])'), r' not \1'),
+    (re.compile(r'\!\='), ' != '),
+    (re.compile(r'\=\='), ' == '),
+    (re.compile(r'\s+'), ' '),
+]
+
+def legacy_translate(text):
+    for pattern, replacement in LEGACY_PASSES:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+EXPRESSIONS = [
+    "sum = sum + i",
+    "total = total + a[i] * 2",
+    "a > b && !(b == 0)",
+    "a == b || false",
+    "w < 3 && flags[0] != false",
+    "result = sum_upto(num)",
+    "x == \"a==b\" || done",
+    "counter = square(3)",
+]
+
+def per_expression_cost(func, number):
+    timer = timeit.Timer(lambda: [func(text) for text in EXPRESSIONS])
+    best = min(timer.repeat(repeat=5, number=number))
+    return best / (number * len(EXPRESSIONS)) * 1e9
+
+def main():
+    number = 20000
+    legacy = per_expression_cost(legacy_translate, number)
+    single = per_expression_cost(translate_expression, number)
+    print(f"legacy 8-pass rewrite   {legacy:8.0f} ns/expression")
+    print(f"translate_expression    {single:8.0f} ns/expression")
+    print(f"speedup                 {legacy / single:8.2f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Benchmark for large array and dict initializers.
+
+Transpiles programs holding one huge initializer literal and reports the
+time per element and the peak memory traced with tracemalloc while
+transpiling (as a multiple of the literal's own size). The literals cover
+every path of the initializer parser: plain numbers, quoted strings
+without and with commas inside them, a dyn array with booleans, and a
+dict. With --legacy the element splitter is also timed against the
+character-by-character one it replaced.
+
+Run from the repository root:
+    python -m benchmarks.bench_initializers --sizes 100000,1000000 --legacy
+    python -m benchmarks.bench_initializers --sizes 10000000 --no-memory
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+
+from datastructure_transpiler import split_preserving_quotes
+from file_transpiler import transpile_source
+
+def elements(kind, n):
+    if kind == "int":
+        return ", ".join(str(i) for i in range(n))
+    if kind == "string":
+        return ", ".join(f'"s{i}"' for i in range(n))
+    if kind == "string-commas":
+        return ", ".join(f'"s,{i}"' for i in range(n))
+    if kind == "dyn":
+        return ", ".join(("true", f'"s{i}"', str(i), "false")[i % 4] for i in range(n))
+    return ", ".join(f'"k{i}": {i}' for i in range(n))
+
+def declaration(kind, n):
+    if kind == "dict":
+        return f"dict d <string,int>[{n}] = {{{elements(kind, n)}}};"
+    array_type = {"int": "int", "dyn": "dyn"}.get(kind, "string")
+    return f"{array_type} a[{n}] = {{{elements(kind, n)}}};"
+
+def legacy_split(text):
+    """
+    The element splitter initializers used before, kept for comparison.
+    """
+    parts = []
+    current = ""
+    in_quotes = False
+    quote_char = None
+    for char in text:
+        if char in ['"', "'"] and not in_quotes:
+            in_quotes = True
+            quote_char = char
+            current += char
+        elif char == quote_char and in_quotes:
+            in_quotes = False
+            quote_char = None
+            current += char
+        elif char == ',' and not in_quotes:
+            if current.strip():
+                parts.append(current.strip())
+            current = ""
+        else:
+            current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+def best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time and trace memory of transpiling huge initializers.")
+    parser.add_argument("--sizes", default="100000,1000000", help="comma-separated element counts")
+    parser.add_argument("--kinds", default="int,string,string-commas,dyn,dict",
+                        help="comma-separated literal kinds: int, string, string-commas, dyn, dict")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; the best time is reported")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the peak memory pass (tracing 10^7 elements needs several GB)")
+    parser.add_argument("--legacy", action="store_true",
+                        help="also time the old character-by-character splitter (slow)")
+    args = parser.parse_args(argv)
+
+    kinds = args.kinds.split(",")
+    print(f"{'kind':14s} {'elements':>10s} {'literal':>9s} {'transpile':>10s} {'ns/elem':>8s} "
+          f"{'peak':>9s} {'x literal':>9s}" + (f" {'split':>8s} {'legacy':>8s}" if args.legacy else ""))
+    for size in [int(size) for size in args.sizes.split(",")]:
+        for kind in kinds:
+            line = declaration(kind, size)
+            source = "int main() {\n    " + line + "\n    ret 0;\n}\n"
+            seconds, _ = best_time(lambda: transpile_source(source), args.repeat)
+
+            row = f"{kind:14s} {size:10d} {len(line) / 2**20:7.1f}MB {seconds:9.3f}s {seconds / size * 1e9:8.0f}"
+            if args.no_memory:
+                row += f" {'-':>9s} {'-':>9s}"
+            else:
+                tracemalloc.start()
+                try:
+                    transpile_source(source)
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+                row += f" {peak / 2**20:7.1f}MB {peak / len(line):8.1f}x"
+            if args.legacy:
+                text = line[line.index("{") + 1:line.rindex("}")]
+                split_seconds, parts = best_time(lambda: split_preserving_quotes(text), args.repeat)
+                legacy_seconds, legacy_parts = best_time(lambda: legacy_split(text), 1)
+                if parts != legacy_parts:
+                    print(f"❌ {kind}: the splitters disagree")
+                    return 1
+                row += f" {split_seconds:7.3f}s {legacy_seconds:7.3f}s"
+            print(row)
+            sys.stdout.flush()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
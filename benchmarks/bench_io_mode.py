@@ -0,0 +1,99 @@
+"""
+Benchmark for the buffered I/O mode.
+
+Transpiles one TinyPy program that reads values with every enter()
+format (into variables, array elements and dict elements) and prints a
+line per value, runs it with io_mode="standard" and io_mode="buffered"
+on the same generated stdin, checks both print the same output and
+reports the run times.
+
+Run from the repository root:
+    python -m benchmarks.bench_io_mode --values 1000000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from file_transpiler import transpile_source
+
+PROGRAM = """
+int main() {
+    int n;
+    enter("%i", n);
+    int total = 0;
+    float ftotal = 0.0;
+    int a[4];
+    dict names <string,string>[1];
+    repeatFor(int i = 0; i < n; i++) {
+        int v;
+        float f;
+        bool b;
+        char c;
+        string s;
+        dyn d;
+        enter("%i", v);
+        enter("%f", f);
+        enter("%b", b);
+        enter("%c", c);
+        enter("%s", s);
+        enter("%dy", d);
+        enter("%i", a[2]);
+        enter("%s", names["last"]);
+        total = total + v + a[2];
+        ftotal = ftotal + f;
+        disp << "Got" << v << f << b << c << s << d << total;
+    }
+    disp << "Done" << total << ftotal;
+    ret 0;
+}
+"""
+
+# Values consumed by one loop iteration, in enter() order
+RECORD = "{k}\n{k}.25\n{b}\nx{k}\nword {k}\r\n{k}\n-{k}\nname{k}\n"
+
+def write_input(path, count):
+    with open(path, "w", newline="") as f:
+        f.write(f"{count}\n")
+        for k in range(count):
+            f.write(RECORD.format(k=k, b="true" if k % 3 else "0"))
+
+def run(source, directory, input_path, io_mode):
+    path = os.path.join(directory, f"{io_mode}.py")
+    with open(path, "w") as f:
+        f.write(source)
+    with open(input_path, "rb") as stdin:
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, path], stdin=stdin, capture_output=True)
+        seconds = time.perf_counter() - start
+    if process.returncode:
+        raise RuntimeError(process.stderr.decode())
+    return seconds, process.stdout
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare standard and buffered I/O in generated code.")
+    parser.add_argument("--values", type=int, default=200000, help="loop iterations (8 values read, 1 line printed each)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "input.txt")
+        write_input(input_path, args.values)
+        for io_mode in ("standard", "buffered"):
+            results[io_mode] = run(transpile_source(PROGRAM, io_mode=io_mode), tmp, input_path, io_mode)
+
+    standard_seconds, standard_output = results["standard"]
+    buffered_seconds, buffered_output = results["buffered"]
+    print(f"standard   {standard_seconds:8.2f}s")
+    print(f"buffered   {buffered_seconds:8.2f}s")
+    print(f"speedup    {standard_seconds / buffered_seconds:8.2f}x")
+    if standard_output != buffered_output:
+        print("❌ Outputs differ")
+        return 1
+    print("✅ Outputs match")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
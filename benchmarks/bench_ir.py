@@ -0,0 +1,98 @@
+"""
+Memory and throughput benchmark for the intermediate representation.
+
+Parses synthetic programs from benchmarks.corpus into IR and reports the
+number of nodes per source line, the memory the whole tree holds per node
+(traced with tracemalloc, including every string the parser created), the
+instance size of each node class next to what the same fields would cost
+without __slots__, and parse and emit throughput.
+
+Run from the repository root:
+    python -m benchmarks.bench_ir --sizes 1000,10000,100000
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+
+import tinypy_ir
+from benchmarks.corpus import generate_program
+from file_transpiler import parse_tokens
+from python_emitter import PythonEmitter
+from tinypy_lexer import tokenize
+
+def iter_objects(node):
+    """
+    Yields node and every IR object reachable from it, including the Expr
+    and Param nodes held in fields.
+    """
+    yield node
+    for cls in type(node).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            value = getattr(node, name)
+            if isinstance(value, tinypy_ir.Node):
+                yield from iter_objects(value)
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, tinypy_ir.Node):
+                        yield from iter_objects(item)
+
+def class_sizes(objects):
+    """
+    Returns {class name: (count, bytes with __slots__, bytes as a plain
+    object with a __dict__)} for the given IR objects.
+    """
+    sizes = {}
+    for obj in objects:
+        cls = type(obj)
+        if cls.__name__ not in sizes:
+            fields = {name: getattr(obj, name) for klass in cls.__mro__
+                      for name in getattr(klass, "__slots__", ())}
+            plain = type("Plain" + cls.__name__, (), {})()
+            plain.__dict__.update(fields)
+            sizes[cls.__name__] = [0, sys.getsizeof(obj), sys.getsizeof(plain) + sys.getsizeof(plain.__dict__)]
+        sizes[cls.__name__][0] += 1
+    return sizes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure IR size per node and parse/emit throughput.")
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="comma-separated line counts of the generated programs")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for size in [int(size) for size in args.sizes.split(",")]:
+        source = generate_program(size, seed=args.seed)
+        tokens = list(tokenize(source))
+
+        tracemalloc.start()
+        try:
+            body = list(parse_tokens(tokens))
+            ir_bytes = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+        # Timed untraced; tracing slows allocation down considerably
+        start = time.perf_counter()
+        body = list(parse_tokens(tokens))
+        parse_seconds = time.perf_counter() - start
+
+        emitter = PythonEmitter()
+        start = time.perf_counter()
+        for node in body:
+            emitter.emit(node)
+        emit_seconds = time.perf_counter() - start
+
+        objects = [obj for node in body for obj in iter_objects(node)]
+        print(f"{len(source):9d} lines  {len(objects):9d} IR objects  "
+              f"{len(objects) / len(source):5.2f} per line  {ir_bytes / len(objects):6.1f} bytes each  "
+              f"parse {len(source) / parse_seconds:10,.0f} lines/s  emit {len(source) / emit_seconds:10,.0f} lines/s")
+
+    print()
+    print(f"{'node':16s} {'count':>9s} {'__slots__':>10s} {'__dict__':>10s}")
+    for name, (count, slotted, plain) in sorted(class_sizes(objects).items()):
+        print(f"{name:16s} {count:9d} {slotted:9d}B {plain:9d}B")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
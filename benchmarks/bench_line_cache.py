@@ -0,0 +1,78 @@
+"""
+Benchmark for the line cache.
+
+Transpiles a set of generated TinyPy files in one process, the way a batch
+worker does, first with the line cache off and then with several sizes.
+Checks that every output is identical to the uncached one under each
+code-generation option set, and reports the time, hit rate and evictions
+for each size. Generated lines mostly carry their own random numbers, so
+the files are drawn from --seeds distinct programs: with as many seeds as
+files almost every line is new, with a few seeds the files repeat each
+other the way helpers copied across a project do.
+
+Run from the repository root:
+    python -m benchmarks.bench_line_cache --files 20 --lines 20000 --seeds 20,3
+"""
+import argparse
+import sys
+import time
+from itertools import product
+
+import line_cache
+from benchmarks.corpus import generate_program
+from file_transpiler import transpile_source
+
+OPTION_SETS = {
+    "default": {},
+    "numpy": {"array_backend": "numpy"},
+    "array+localize": {"array_backend": "array", "localize_names": True},
+    "buffered": {"io_mode": "buffered"},
+}
+
+def transpile_all(sources, size, options):
+    """
+    Transpiles sources with a fresh cache of the given size; returns
+    (seconds, outputs, cache stats).
+    """
+    line_cache.configure(0)  # start from an empty cache
+    line_cache.configure(size)
+    cache = line_cache.shared()
+    before = cache.counters() if cache is not None else (0, 0, 0)
+    start = time.perf_counter()
+    outputs = [transpile_source(source, **options) for source in sources]
+    seconds = time.perf_counter() - start
+    after = cache.counters() if cache is not None else (0, 0, 0)
+    stats = line_cache.summarize([tuple(count - base for count, base in zip(after, before))])
+    return seconds, outputs, stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare transpiling many files with and without the line cache.")
+    parser.add_argument("--files", type=int, default=20, help="generated files per run")
+    parser.add_argument("--lines", type=int, default=20000, help="lines per generated file")
+    parser.add_argument("--sizes", default="1024,4096,65536", help="comma-separated cache sizes to compare")
+    parser.add_argument("--seeds", default="20,3", help="comma-separated counts of distinct programs to compare")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    size_setting = line_cache.configured_size()
+    mismatches = 0
+    try:
+        for seeds, (name, options) in product([int(seeds) for seeds in args.seeds.split(",")], OPTION_SETS.items()):
+            programs = ["\n".join(generate_program(args.lines, seed=seed)) for seed in range(min(seeds, args.files))]
+            sources = [programs[n % len(programs)] for n in range(args.files)]
+            base_seconds, expected, _ = transpile_all(sources, 0, options)
+            print(f"📊 {name}: {args.files} files of {args.lines} lines from {len(programs)} programs, "
+                  f"no cache {base_seconds:.2f}s")
+            for size in sizes:
+                seconds, outputs, stats = transpile_all(sources, size, options)
+                same = outputs == expected
+                mismatches += not same
+                print(f"{'✅' if same else '❌'} size {size:6d} {seconds:6.2f}s ({base_seconds / seconds:.2f}x), "
+                      f"{stats['hit_rate']:.0%} hit rate, {stats['evictions']} evicted")
+                sys.stdout.flush()
+    finally:
+        line_cache.configure(size_setting)
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
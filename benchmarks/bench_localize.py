@@ -0,0 +1,102 @@
+"""
+Benchmark for hot-name localization.
+
+Transpiles a few loop-heavy TinyPy programs (nested loops calling a helper
+function, printing in a loop, and a while loop converting values) with and
+without localize_names, runs both versions, checks they print the same
+output and reports the run times.
+
+Run from the repository root:
+    python -m benchmarks.bench_localize --scale 2
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from file_transpiler import transpile_source
+
+PROGRAMS = {
+    "calls": """
+int LIMIT = {n};
+int square(int x) {{
+    ret x * x;
+}}
+int main() {{
+    int total = 0;
+    repeatFor(int i = 0; i < LIMIT; i++) {{
+        repeatFor(int j = 0; j < LIMIT; j++) {{
+            total = total + square(i - j) % 7;
+        }}
+    }}
+    disp << total;
+    ret 0;
+}}
+""",
+    "print": """
+int main() {{
+    repeatFor(int i = 0; i < {n}; i++) {{
+        repeatFor(int j = 0; j < 100; j++) {{
+            disp << i << j;
+        }}
+    }}
+    ret 0;
+}}
+""",
+    "while": """
+int main() {{
+    int k = 0;
+    float total = 0.0;
+    string digits = "";
+    repeatWhile(k < {n} * 100) {{
+        total = total + float(k) / 3;
+        digits = str(int(total) % 10);
+        k++;
+    }}
+    disp << total << digits;
+    ret 0;
+}}
+""",
+}
+
+# Work size of each program at --scale 1
+SIZES = {"calls": 2500, "print": 2000, "while": 20000}
+
+def run(source, directory, name, repeat):
+    """
+    Runs generated Python; returns (best seconds, stdout).
+    """
+    path = os.path.join(directory, name)
+    with open(path, "w") as f:
+        f.write(source)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, path], capture_output=True)
+        best = min(best, time.perf_counter() - start)
+        if process.returncode:
+            raise RuntimeError(process.stderr.decode())
+    return best, process.stdout
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare generated code with and without localize_names.")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplies the work size of every program")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per version; the best time is reported")
+    args = parser.parse_args(argv)
+
+    mismatches = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, template in PROGRAMS.items():
+            program = template.format(n=int(SIZES[name] * args.scale))
+            global_seconds, global_output = run(transpile_source(program), tmp, "global.py", args.repeat)
+            local_seconds, local_output = run(transpile_source(program, localize_names=True), tmp, "local.py", args.repeat)
+            status = "✅" if global_output == local_output else "❌"
+            mismatches += global_output != local_output
+            print(f"{status} {name:8s} globals {global_seconds:7.2f}s   localized {local_seconds:7.2f}s   "
+                  f"speedup {global_seconds / local_seconds:5.2f}x")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
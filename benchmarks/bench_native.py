@@ -0,0 +1,173 @@
+"""
+Benchmark for native functions.
+
+Transpiles numeric kernels with and without native_functions: sum_upto
+from testfile.tpy, a prime count by trial division (nested loops and %),
+Euclid's gcd over many pairs, a sieve over a bool array, a float series
+and naive recursive Fibonacci. Runs both versions, checks they print the
+same output and reports the run time of each (the native build time is
+reported separately; it is paid once per transpile).
+
+Needs gcc and the Python headers. Run from the repository root:
+    python -m benchmarks.bench_native
+    python -m benchmarks.bench_native --kernels sum_upto,sieve --scale 10
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from file_transpiler import transpile_file
+
+SUM_UPTO = """
+int sum_upto(int n) {
+    int sum = 0;
+    repeatFor(int i = 1; i < n; i++) {
+        sum = sum + i;
+    }
+    ret sum;
+}
+"""
+
+PRIME_COUNT = """
+int prime_count(int n) {
+    int count = 0;
+    repeatFor(int k = 2; k < n; k++) {
+        bool prime = true;
+        int d = 2;
+        repeatWhile(prime && d * d <= k) {
+            thereBe{
+                prime = false;
+            }if(k % d == 0)
+            d++;
+        }
+        thereBe{
+            count++;
+        }if(prime)
+    }
+    ret count;
+}
+"""
+
+GCD_SUM = """
+int gcd(int a, int b) {
+    repeatWhile(b != 0) {
+        int t = a % b;
+        a = b;
+        b = t;
+    }
+    ret a;
+}
+
+int gcd_sum(int n) {
+    int total = 0;
+    repeatFor(int i = 1; i < n; i++) {
+        total = total + gcd(i, 1000003 % i + 1);
+    }
+    ret total;
+}
+"""
+
+SIEVE = """
+int sieve(int n) {
+    bool composite[n];
+    int count = 0;
+    repeatFor(int i = 2; i < n; i++) {
+        bool prime = !composite[i];
+        int j = n;
+        thereBe{
+            count++;
+            j = i * i;
+        }if(prime)
+        repeatWhile(j < n) {
+            composite[j] = true;
+            j = j + i;
+        }
+    }
+    ret count;
+}
+"""
+
+BASEL = """
+float basel(int n) {
+    float total = 0.0;
+    repeatFor(int i = 1; i < n; i++) {
+        float x = i;
+        total = total + 1.0 / (x * x);
+    }
+    ret total;
+}
+"""
+
+FIB = """
+int fib(int n) {
+    thereBe{
+        ret n;
+    }if(n < 2)
+    ret fib(n - 1) + fib(n - 2);
+}
+"""
+
+# name: (source, call with the problem size, default size)
+KERNELS = {
+    "sum_upto": (SUM_UPTO, "sum_upto", 30000000),
+    "prime_count": (PRIME_COUNT, "prime_count", 500000),
+    "gcd_sum": (GCD_SUM, "gcd_sum", 2000000),
+    "sieve": (SIEVE, "sieve", 10000000),
+    "basel": (BASEL, "basel", 20000000),
+    "fib": (FIB, "fib", 30),
+}
+
+def program(kernel, size):
+    source, function, _ = KERNELS[kernel]
+    return f"{source}\nint main() {{\n    int result = {function}({size});\n    disp << result;\n    ret 0;\n}}\n"
+
+def run(path, repeat):
+    """
+    Runs a generated program; returns (best seconds, stdout).
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, path], capture_output=True)
+        best = min(best, time.perf_counter() - start)
+        if process.returncode:
+            raise RuntimeError(process.stderr.decode())
+    return best, process.stdout
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare numeric kernels in Python and as native functions.")
+    parser.add_argument("--kernels", default=",".join(KERNELS), help="comma-separated kernels to run")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every problem size (fib: add)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per version; the best time is reported")
+    args = parser.parse_args(argv)
+
+    mismatches = 0
+    print(f"{'':2s}{'kernel':12s} {'size':>9s} {'python':>9s} {'native':>9s} {'speedup':>8s} {'build':>7s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        source_path = os.path.join(tmp, "kernel.tpy")
+        for kernel in args.kernels.split(","):
+            size = KERNELS[kernel][2]
+            size = size + int(args.scale) - 1 if kernel == "fib" else int(size * args.scale)
+            with open(source_path, "w") as f:
+                f.write(program(kernel, size))
+            python_path = transpile_file(source_path, os.path.join(tmp, "python.py"), verbose=False)
+            python_seconds, python_output = run(python_path, args.repeat)
+
+            start = time.perf_counter()
+            native_path = transpile_file(source_path, os.path.join(tmp, "native.py"), verbose=False,
+                                         native_functions=True)
+            build_seconds = time.perf_counter() - start
+            native_seconds, native_output = run(native_path, args.repeat)
+
+            status = "✅" if python_output == native_output else "❌"
+            mismatches += python_output != native_output
+            print(f"{status} {kernel:12s} {size:9d} {python_seconds:8.3f}s {native_seconds:8.3f}s "
+                  f"{python_seconds / native_seconds:7.1f}x {build_seconds:6.2f}s")
+            sys.stdout.flush()
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Benchmark for the native runner and precompiled bytecode.
+
+Builds main.c with gcc against this Python (as compile_tpy.sh does),
+transpiles generated programs of several sizes with --bytecode and times
+launching each through the runner with its .pyc, with the .pyc stale (the
+.py changed after it was written, so the runner compiles the source) and
+with no .pyc at all. The generated main() only calls its first function,
+so the time is almost all start-up: compiling the source or unmarshalling
+the code object. Checks every launch prints the same output.
+
+Run from the repository root (Linux or macOS):
+    python -m benchmarks.bench_runner --sizes 1000,10000,100000
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import sysconfig
+import tempfile
+import time
+
+from benchmarks.corpus import write_program
+from bytecode_output import bytecode_path
+from file_transpiler import transpile_file
+
+RUNNER_SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.c")
+# enter() lines in the generated main() path read from here
+STDIN = b"3\n" * 1000
+
+def build_runner(path):
+    """
+    Compiles main.c, embedding the Python running this script.
+    """
+    libdir = sysconfig.get_config_var("LIBDIR")
+    command = [os.environ.get("CC", "gcc"), "-O2", "-I", sysconfig.get_paths()["include"], RUNNER_SOURCE,
+               "-o", path, f"-L{libdir}", f"-Wl,-rpath,{libdir}",
+               f"-lpython{sysconfig.get_config_var('LDVERSION')}",
+               *(sysconfig.get_config_var("LIBS") or "").split(), *(sysconfig.get_config_var("SYSLIBS") or "").split()]
+    subprocess.run(command, check=True)
+
+def run(runner, path, repeat):
+    """
+    Launches a program through the runner; returns (best seconds, stdout).
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.run([runner, path], input=STDIN, capture_output=True)
+        best = min(best, time.perf_counter() - start)
+        if process.returncode:
+            raise RuntimeError(process.stderr.decode())
+    return best, process.stdout
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare runner start-up with and without precompiled bytecode.")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated program sizes in lines")
+    parser.add_argument("--repeat", type=int, default=5, help="launches per version; the best time is reported")
+    args = parser.parse_args(argv)
+    if shutil.which(os.environ.get("CC", "gcc")) is None:
+        print("❌ gcc not found (set $CC to another compiler)")
+        return 1
+
+    mismatches = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        runner = os.path.join(tmp, "runner")
+        build_runner(runner)
+        print(f"{'':2s}{'lines':>7s} {'.pyc':>9s} {'stale':>9s} {'source':>9s} {'speedup':>8s} {'.py':>9s} {'.pyc':>9s}")
+        for size in [int(size) for size in args.sizes.split(",")]:
+            source_path = os.path.join(tmp, "prog.tpy")
+            output_path = os.path.join(tmp, "prog.py")
+            write_program(source_path, size)
+            transpile_file(source_path, output_path, verbose=False, write_bytecode=True)
+            pyc_path = bytecode_path(output_path)
+            pyc_size = os.path.getsize(pyc_path)
+            bytecode_seconds, bytecode_output = run(runner, output_path, args.repeat)
+
+            with open(output_path, "a") as f:
+                f.write("\n# edited after the pyc was written\n")
+            stale_seconds, stale_output = run(runner, output_path, args.repeat)
+            os.remove(pyc_path)
+            source_seconds, source_output = run(runner, output_path, args.repeat)
+
+            same = bytecode_output == stale_output == source_output
+            mismatches += not same
+            print(f"{'✅' if same else '❌'} {size:7d} {bytecode_seconds:8.3f}s {stale_seconds:8.3f}s "
+                  f"{source_seconds:8.3f}s {source_seconds / bytecode_seconds:7.1f}x "
+                  f"{os.path.getsize(output_path) / 2**20:7.2f}MB {pyc_size / 2**20:7.2f}MB")
+            sys.stdout.flush()
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Latency benchmark for the warm execution server.
+
+Runs short TinyPy programs the classic way (transpile with
+tinypy_compiler.py, then start a fresh interpreter on the output, as
+compile_tpy.bat does minus the C build) and through a tinypy_server
+started for the benchmark: from Python with tinypy_client.run_program and
+through the tinypy_client.py command line. Checks every route prints the
+same output and reports milliseconds per program, plus the throughput of
+several concurrent clients.
+
+POSIX only. Run from the repository root:
+    python -m benchmarks.bench_server --runs 50 --workers 4
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tinypy_client import run_program
+
+PROGRAMS = {
+    "sum": ("""
+int sum_upto(int n) {
+    int sum = 0;
+    repeatFor(int i = 1; i < n; i++) {
+        sum = sum + i;
+    }
+    ret sum;
+}
+int main() {
+    int num;
+    enter("%i", num);
+    int result = sum_upto(num);
+    disp << "Sum from 1 to" << num << "is" << result;
+    ret 0;
+}
+""", "1000\n"),
+    "arrays": ("""
+int main() {
+    int a[5] = {5, 3, 9, 1, 7};
+    int best = a[0];
+    for(v : a) {
+        thereBe{
+            best = v;
+        }if(v > best)
+    }
+    dict names <string,int>[2] = {"x": 1, "y": 2};
+    forDict(k, v : names) {
+        disp << k << v;
+    }
+    disp << "max" << best;
+    ret 0;
+}
+""", ""),
+}
+
+def wait_for_server(path, seconds=30):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(path)
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"server did not start on {path}")
+
+def per_program_ms(func, runs):
+    start = time.perf_counter()
+    for k in range(runs):
+        output = func(k)
+    return (time.perf_counter() - start) * 1000 / runs, output
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare per-program latency with and without the execution server.")
+    parser.add_argument("--runs", type=int, default=30, help="runs per program and route")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients for the throughput test")
+    args = parser.parse_args(argv)
+
+    repository = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    mismatches = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, "server.sock")
+        server = subprocess.Popen([sys.executable, os.path.join(repository, "tinypy_server.py"),
+                                   "--socket", socket_path, "--workers", str(args.workers)],
+                                  stdout=subprocess.DEVNULL)
+        try:
+            wait_for_server(socket_path)
+            for name, (source, stdin) in PROGRAMS.items():
+                source_path = os.path.join(tmp, f"{name}.tpy")
+                with open(source_path, "w") as f:
+                    f.write(source)
+
+                def classic(k):
+                    subprocess.run([sys.executable, os.path.join(repository, "tinypy_compiler.py"), source_path],
+                                   check=True, capture_output=True)
+                    return subprocess.run([sys.executable, os.path.join(tmp, f"{name}.py")], input=stdin,
+                                          capture_output=True, text=True, check=True).stdout
+
+                def client_cli(k):
+                    return subprocess.run([sys.executable, os.path.join(repository, "tinypy_client.py"), source_path,
+                                           "--socket", socket_path], input=stdin,
+                                          capture_output=True, text=True, check=True).stdout
+
+                def warm_repeated(k):
+                    return run_program(source, stdin=stdin, socket_path=socket_path)["stdout"]
+
+                def warm_unique(k):
+                    # A distinct source every run, so nothing is served from the worker caches
+                    return run_program(source + f"// run {k}\n", stdin=stdin, socket_path=socket_path)["stdout"]
+
+                results = {}
+                for route, func in (("classic", classic), ("client cli", client_cli),
+                                    ("warm, repeated", warm_repeated), ("warm, unique", warm_unique)):
+                    results[route] = per_program_ms(func, args.runs)
+                expected = results["classic"][1]
+                for route, (ms, output) in results.items():
+                    status = "✅" if output == expected else "❌"
+                    mismatches += output != expected
+                    print(f"{status} {name:8s} {route:15s} {ms:8.2f} ms/program")
+
+            source, stdin = PROGRAMS["sum"]
+            requests = args.runs * args.clients
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.clients) as pool:
+                outputs = list(pool.map(
+                    lambda k: run_program(source + f"// run {k}\n", stdin=stdin, socket_path=socket_path)["stdout"],
+                    range(requests)))
+            seconds = time.perf_counter() - start
+            mismatches += len(set(outputs)) != 1
+            print(f"{args.clients} concurrent clients, {args.workers} workers: {requests / seconds:,.0f} programs/s")
+        finally:
+            server.terminate()
+            server.wait()
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Benchmark for sidecar data.
+
+Transpiles programs holding one large initializer (an int array, a float
+array or a string->int dict) with and without sidecar_data, runs both
+versions, checks they print the same output and reports the time to start
+the program and load the data (a fresh interpreter, compiling the .py and
+running the declaration) along with the size of the generated files.
+
+Run from the repository root:
+    python -m benchmarks.bench_sidecar --sizes 10000,100000,1000000
+    python -m benchmarks.bench_sidecar --backends list,array,numpy
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from file_transpiler import transpile_file
+from sidecar_data import sidecar_path
+
+def declaration(kind, n):
+    if kind == "int":
+        return f"int a[{n}] = {{{', '.join(str(i * 7919 % 1000003) for i in range(n))}}};"
+    if kind == "float":
+        return f"float a[{n}] = {{{', '.join(f'{i * 0.37:.2f}' for i in range(n))}}};"
+    return f"dict a <string,int>[{n}] = {{{', '.join(f'{chr(34)}k{i}{chr(34)}: {i}' for i in range(n))}}};"
+
+def program(kind, n):
+    # Prints a few elements, so a wrong load shows up in the output
+    probe = '"k1"' if kind == "dict" else "1"
+    last = f'"k{n - 1}"' if kind == "dict" else str(n - 1)
+    return (f"int main() {{\n    {declaration(kind, n)}\n    float first = a[{probe}];\n"
+            f"    float final = a[{last}];\n    disp << first << final;\n    ret 0;\n}}\n")
+
+def run(path, repeat):
+    """
+    Runs a generated program; returns (best seconds, stdout).
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, path], capture_output=True)
+        best = min(best, time.perf_counter() - start)
+        if process.returncode:
+            raise RuntimeError(process.stderr.decode())
+    return best, process.stdout
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare load times of literal initializers and sidecar data.")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma-separated element counts")
+    parser.add_argument("--kinds", default="int,float,dict", help="comma-separated initializers: int, float, dict")
+    parser.add_argument("--backends", default="list", help="comma-separated array backends")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per version; the best time is reported")
+    args = parser.parse_args(argv)
+
+    mismatches = 0
+    print(f"{'':2s}{'kind':6s} {'backend':7s} {'elements':>9s} {'literal':>9s} {'sidecar':>9s} {'speedup':>8s} "
+          f"{'.py':>9s} {'.py+.tpyd':>10s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        source_path = os.path.join(tmp, "prog.tpy")
+        for size in [int(size) for size in args.sizes.split(",")]:
+            for kind in args.kinds.split(","):
+                with open(source_path, "w") as f:
+                    f.write(program(kind, size))
+                backends = ["list"] if kind == "dict" else args.backends.split(",")
+                for backend in backends:
+                    literal_path = os.path.join(tmp, "literal.py")
+                    transpile_file(source_path, literal_path, verbose=False, array_backend=backend)
+                    literal_seconds, literal_output = run(literal_path, args.repeat)
+
+                    sidecar_output_path = os.path.join(tmp, "sidecar.py")
+                    transpile_file(source_path, sidecar_output_path, verbose=False, array_backend=backend,
+                                   sidecar_data=True)
+                    sidecar_seconds, sidecar_output = run(sidecar_output_path, args.repeat)
+
+                    status = "✅" if literal_output == sidecar_output else "❌"
+                    mismatches += literal_output != sidecar_output
+                    sidecar_size = os.path.getsize(sidecar_output_path)
+                    if os.path.exists(sidecar_path(sidecar_output_path)):
+                        sidecar_size += os.path.getsize(sidecar_path(sidecar_output_path))
+                    print(f"{status} {kind:6s} {backend:7s} {size:9d} {literal_seconds:8.3f}s {sidecar_seconds:8.3f}s "
+                          f"{literal_seconds / sidecar_seconds:7.1f}x "
+                          f"{os.path.getsize(literal_path) / 2**20:7.2f}MB {sidecar_size / 2**20:8.2f}MB")
+                    sys.stdout.flush()
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
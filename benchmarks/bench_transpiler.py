@@ -0,0 +1,176 @@
+"""
+Transpiler throughput benchmark suite.
+
+Measures lines/sec and peak traced memory of transpile_file and of each
+construct module on synthetic corpora from benchmarks.corpus, and writes
+the results as JSON. Passing --compare with an earlier results file
+reports every benchmark whose throughput dropped by more than the
+tolerance and exits with a non-zero status.
+
+Run from the repository root:
+    python -m benchmarks.bench_transpiler --sizes 1000,10000,100000
+    python -m benchmarks.bench_transpiler --sizes 1000000 --compare old.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.corpus import generate_program, write_program
+from conditional_transpiler import transpile_conditional
+from datastructure_transpiler import transpile_datastructure
+from file_transpiler import transpile_file
+from function_transpiler import transpile_function
+from io_transpiler import transpile_io
+from line_transpiler import transpile_line
+from loop_transpiler import transpile_loop
+from tinypy_lexer import tokenize
+from variable_transpiler import transpile_variable
+
+# Construct benchmarks: entry point and the corpus mix that exercises it
+CONSTRUCT_BENCHMARKS = {
+    "function_transpiler": (transpile_function, {"declaration": 1}, {"function_size": 4}),
+    "datastructure_transpiler": (transpile_datastructure, {"array": 1, "dict": 1}, {}),
+    "loop_transpiler": (transpile_loop, {"for": 1, "while": 1, "foreach": 1, "fordict": 1}, {}),
+    "variable_transpiler": (transpile_variable, {"declaration": 1}, {}),
+    "io_transpiler": (transpile_io, {"io": 1}, {}),
+    "conditional_transpiler": (transpile_conditional, {"conditional": 1}, {}),
+    "line_transpiler": (transpile_line, None, {}),
+}
+
+def statements(lines):
+    """
+    Strips lines the way transpile_line does before dispatching.
+    """
+    result = []
+    for line in lines:
+        line = line.strip()
+        if line.endswith(";"):
+            line = line[:-1]
+        result.append(line)
+    return result
+
+def measure(func, repeat, memory):
+    """
+    Returns (best seconds, peak traced bytes or None) for func().
+    Memory is traced in a separate run so it does not skew the timings.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+def run_benchmarks(sizes, repeat=3, memory=True, seed=0, initializer_size=16):
+    results = []
+
+    def record(name, lines, seconds, peak):
+        result = {
+            "benchmark": name,
+            "lines": lines,
+            "seconds": seconds,
+            "lines_per_sec": lines / seconds if seconds else None,
+            "peak_bytes": peak,
+        }
+        results.append(result)
+        peak_text = f"{peak / 1024:10.0f} KiB" if peak is not None else ""
+        print(f"{name:26s} {lines:9d} lines  {result['lines_per_sec']:14,.0f} lines/s {peak_text}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source_path = os.path.join(tmp, "corpus.tpy")
+        output_path = os.path.join(tmp, "corpus.py")
+        for size in sizes:
+            line_count = write_program(source_path, size, seed=seed, initializer_size=initializer_size)
+            seconds, peak = measure(lambda: transpile_file(source_path, output_path, verbose=False),
+                                    repeat, memory)
+            record("transpile_file", line_count, seconds, peak)
+
+            source = generate_program(size, seed=seed, initializer_size=initializer_size)
+            seconds, peak = measure(lambda: list(tokenize(source)), repeat, memory)
+            record("tinypy_lexer", len(source), seconds, peak)
+
+            for name, (entry, mix, options) in CONSTRUCT_BENCHMARKS.items():
+                lines = statements(generate_program(size, mix=mix, seed=seed,
+                                                    initializer_size=initializer_size, **options))
+
+                def run(lines=lines, entry=entry):
+                    for line in lines:
+                        entry(line)
+
+                seconds, peak = measure(run, repeat, memory)
+                record(name, len(lines), seconds, peak)
+
+    return results
+
+def compare(results, baseline, tolerance):
+    """
+    Returns the benchmarks whose throughput fell more than tolerance below
+    the baseline run for the same benchmark and size.
+    """
+    previous = {(r["benchmark"], r["lines"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get((result["benchmark"], result["lines"]))
+        if not old or not old["lines_per_sec"] or not result["lines_per_sec"]:
+            continue
+        ratio = result["lines_per_sec"] / old["lines_per_sec"]
+        if ratio < 1 - tolerance:
+            regressions.append((result["benchmark"], result["lines"], ratio))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark TinyPy transpiler throughput.")
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="comma separated corpus sizes in lines (up to 1000000)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark (best is kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--initializer-size", type=int, default=16,
+                        help="elements per generated array/dict initializer")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory pass")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the JSON results")
+    parser.add_argument("--compare", metavar="JSON", help="earlier results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed throughput drop against --compare (fraction)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = run_benchmarks(sizes, repeat=args.repeat, memory=not args.no_memory,
+                             seed=args.seed, initializer_size=args.initializer_size)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, lines, ratio in regressions:
+            print(f"❌ {name} at {lines} lines: {ratio:.0%} of baseline throughput")
+        if regressions:
+            return 1
+        print("✅ No throughput regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
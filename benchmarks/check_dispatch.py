@@ -0,0 +1,96 @@
+"""
+Equivalence check for the keyword-indexed parser table.
+
+parse_line only calls the parsers registered for a line's leading keyword.
+This check runs randomly assembled lines through it and through the full
+cascade the table replaced (every parser in the old priority order), and
+the Python line emitted for each must be identical. Lines are taken from
+the benchmark corpus and then mangled: keywords glued to or spaced from
+what follows, stray whitespace around the trailing semicolon, closing
+braces written as `} ;`, comments and blank lines.
+
+Run from the repository root:
+    python -m benchmarks.check_dispatch --lines 200000
+"""
+import argparse
+import random
+import sys
+
+from benchmarks.corpus import generate_program
+from line_transpiler import parse_line
+from python_emitter import emit_line
+from tinypy_ir import Expr, Statement
+from function_transpiler import parse_function
+from variable_transpiler import parse_variable, parse_increment
+from io_transpiler import parse_io
+from datastructure_transpiler import parse_array, parse_dictionary
+from loop_transpiler import parse_for_loop, parse_while_loop, parse_foreach_loop, parse_fordict_loop
+
+# The cascade before the table, in its priority order
+CASCADE = (parse_function, parse_array, parse_dictionary, parse_for_loop, parse_while_loop,
+           parse_foreach_loop, parse_fordict_loop, parse_variable, parse_increment, parse_io)
+
+# Lines that appear in real files but not in the corpus
+EXTRA_LINES = ["}", "} ;", "}  ;", "}\t;", "};", "// a comment", "", "   ", ";",
+               "int main() {", "ret 0 ;", "disp<<x;", "enter(%i)>>x;", "x = y ? 1 : 2;"]
+
+def cascade_line(line):
+    """
+    Emits a line as the full cascade did: blank lines, comments and closing
+    braces produce no code.
+    """
+    line = line.strip()
+    if not line or line.startswith("//"):
+        return ""
+    if line.endswith(";"):
+        line = line[:-1]
+    if line.rstrip() == "}":
+        return ""
+    for parser in CASCADE:
+        node = parser(line)
+        if node is not None:
+            return emit_line(node)
+    return emit_line(Statement(Expr(line)))
+
+def table_line(line):
+    node = parse_line(line)
+    return "" if node is None else emit_line(node)
+
+def mangle(rng, line):
+    """
+    Returns a variant of a corpus line with its spacing disturbed.
+    """
+    choice = rng.random()
+    if choice < 0.2 and line.endswith(";"):
+        return line[:-1] + rng.choice([" ;", "  ;", "\t;", "; ", " ; "])
+    if choice < 0.35:
+        return line.replace(" ", "", 1)
+    if choice < 0.5:
+        return line.replace(" ", "  ", 1)
+    if choice < 0.6:
+        return rng.choice(EXTRA_LINES)
+    return line
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that the parser table matches the full cascade.")
+    parser.add_argument("--lines", type=int, default=200000, help="random lines to check")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    corpus = [line.strip() for line in generate_program(20000, seed=args.seed)] + EXTRA_LINES
+    mismatches = 0
+    for _ in range(args.lines):
+        line = mangle(rng, rng.choice(corpus))
+        expected = cascade_line(line)
+        result = table_line(line)
+        if result != expected:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"❌ {line!r}: {result!r} instead of {expected!r}")
+    status = "✅" if not mismatches else "❌"
+    print(f"{status} {args.lines} random lines, {mismatches} mismatches against the full cascade")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
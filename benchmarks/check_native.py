@@ -0,0 +1,338 @@
+"""
+Differential check for native functions.
+
+Generates random TinyPy files of int/float/bool functions (mixed-type
+arithmetic, division and modulo, comparisons, thereBe/alas, repeatFor and
+repeatWhile loops, arrays indexed out of range, calls between functions,
+early returns) plus a few recursive and edge-case kernels. Each file is transpiled as
+plain Python and with native_functions, and every function is called in
+both with ordinary and hostile arguments: int64 limits, ints beyond them,
+NaN, infinities, -0.0 and values of the wrong type. Results (or the
+exception raised) must be identical.
+
+Needs gcc and the Python headers. Run from the repository root:
+    python -m benchmarks.check_native --programs 100
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+from file_transpiler import transpile_file
+
+TYPES = ("int", "float", "bool")
+
+ARGUMENTS = {
+    "int": ["0", "1", "-1", "7", "-13", "100", "3", "-2"],
+    "float": ["0.0", "-0.0", "1.5", "-2.5", "0.1", "7.0"],
+    "bool": ["True", "False"],
+}
+# Passed a quarter of the time: extremes and values of the wrong type
+HOSTILE_ARGUMENTS = {
+    "int": ["2**31", "2**53 + 1", "2**62", "2**63 - 1", "-2**63", "2**64", "True", "3.0"],
+    "float": ["1e308", "-1e-310", "float('inf')", "float('nan')", "3"],
+    "bool": ["1", "None"],
+}
+
+INT_LITERALS = ["0", "1", "2", "3", "-4", "7", "10", "-1", "5", "12", "1000000007", "9223372036854775807",
+                "4611686018427387904", "9007199254740993"]
+FLOAT_LITERALS = ["0.0", "0.5", "1.5", "-2.25", "3.0", "1e300", "0.1", "9007199254740992.0"]
+
+# Kernels that recurse, some deeper than Python allows, and that sit on
+# the edge of exact int/float conversion
+KERNELS = """
+int fib(int n) {
+    thereBe{
+        ret n;
+    }if(n < 2)
+    ret fib(n - 1) + fib(n - 2);
+}
+int depth(int n) {
+    thereBe{
+        ret 0;
+    }if(n <= 0)
+    ret depth(n - 1) + 1;
+}
+bool is_even(int n) {
+    bool done = n == 0;
+    thereBe{
+        ret done;
+    }if(done)
+    ret is_odd(n - 1);
+}
+bool is_odd(int n) {
+    bool done = n != 0;
+    thereBe{
+        ret is_even(n - 1);
+    }if(done)
+    ret done;
+}
+bool same(int a, float b) {
+    bool r = a == b;
+    ret r;
+}
+float ratio(int a, int b) {
+    float r = a / b;
+    ret r;
+}
+"""
+KERNEL_CASES = [("fib", "20"), ("fib", "-3"), ("depth", "500"), ("depth", "5000"), ("depth", "100000"),
+                ("is_even", "600"), ("is_odd", "5000"), ("fib", "2.0"), ("same", "2**53 + 1, 2.0**53"),
+                ("same", "2**53, 2.0**53"), ("same", "-2**63, -2.0**63"), ("ratio", "2**53 + 1, 3"),
+                ("ratio", "10**18, 7"), ("ratio", "1, 0")]
+
+class FunctionWriter:
+    """
+    Writes one random function; variables are declared up front so every
+    expression has names of each type to draw from.
+    """
+
+    def __init__(self, rng, name, callees):
+        self.rng = rng
+        self.name = name
+        self.callees = callees
+        self.return_type = rng.choice(TYPES)
+        self.params = [(rng.choice(TYPES), f"p{k}") for k in range(rng.randint(1, 3))]
+        self.variables = {kind: [name for param_type, name in self.params if param_type == kind] for kind in TYPES}
+        self.arrays = {}
+        self.counters = 0
+
+    def literal(self, kind):
+        if kind == "int":
+            return self.rng.choice(INT_LITERALS)
+        if kind == "float":
+            return self.rng.choice(FLOAT_LITERALS)
+        return self.rng.choice(["true", "false"])
+
+    def expression(self, kind, depth=0):
+        rng = self.rng
+        choice = rng.random()
+        if depth >= 3 or choice < 0.25:
+            if self.variables[kind] and rng.random() < 0.7:
+                return rng.choice(self.variables[kind])
+            return self.literal(kind)
+        if kind == "bool":
+            if choice < 0.6:
+                operand = rng.choice(("int", "float", "int"))
+                return (f"({self.expression(operand, depth + 1)} {rng.choice(['<', '<=', '>', '>=', '==', '!='])} "
+                        f"{self.expression(rng.choice((operand, 'int', 'float')), depth + 1)})")
+            if choice < 0.8:
+                return f"({self.expression('bool', depth + 1)} {rng.choice(['&&', '||'])} {self.expression('bool', depth + 1)})"
+            return f"(!({self.expression('bool', depth + 1)}))"
+        if choice < 0.65:
+            operator = rng.choice(["+", "-", "*", "+", "-", "*", "//", "%"] if kind == "int" else ["+", "-", "*", "/"])
+            other = "float" if kind == "float" and rng.random() < 0.5 else "int"
+            right = self.expression(other, depth + 1)
+            if operator in ("//", "%", "/") and rng.random() < 0.7:
+                # Mostly nonzero divisors, so more calls get past the division
+                right = rng.choice(["3", "-7", "10", "2.5"] if other == "float" else ["3", "-7", "10", "1000000007"])
+            return f"({self.expression(kind, depth + 1)} {operator} {right})"
+        if choice < 0.69 and kind == "int":
+            return f"({rng.choice('-~')}{self.expression(rng.choice(('int', 'bool')), depth + 1)})"
+        if choice < 0.72 and self.arrays:
+            array, (array_kind, size) = rng.choice(list(self.arrays.items()))
+            if array_kind == kind:
+                return f"{array}[{self.index(size)}]"
+        if choice < 0.82:
+            builtin = rng.choice(["abs", "min", "max", "int" if kind == "int" else "float"])
+            if builtin in ("min", "max"):
+                return f"{builtin}({self.expression(kind, depth + 1)}, {self.expression(kind, depth + 1)})"
+            source = rng.choice(TYPES) if builtin in ("int", "float") else kind
+            return f"{builtin}({self.expression(source, depth + 1)})"
+        callees = [callee for callee in self.callees if callee.return_type == kind]
+        if callees and choice < 0.95:
+            callee = rng.choice(callees)
+            args = ", ".join(self.expression(param_type, depth + 1) for param_type, _ in callee.params)
+            return f"{callee.name}({args})"
+        return self.literal(kind)
+
+    def index(self, size):
+        rng = self.rng
+        if rng.random() < 0.8:
+            return str(rng.randint(-size - 1, size) if rng.random() < 0.1 else rng.randint(-size, size - 1))
+        return self.expression("int", 2)
+
+    def statement(self):
+        rng = self.rng
+        kind = rng.choice(TYPES)
+        choice = rng.random()
+        if choice < 0.2 and self.arrays:
+            array, (array_kind, size) = rng.choice(list(self.arrays.items()))
+            return f"{array}[{self.index(size)}] = {self.expression(array_kind)};"
+        if choice < 0.3 and self.variables["int"]:
+            return f"{rng.choice(self.variables['int'])}++;"
+        if self.variables[kind]:
+            return f"{rng.choice(self.variables[kind])} = {self.expression(kind)};"
+        return f"{self.expression(kind)} == {self.expression(kind)};"
+
+    def block(self, indent, depth=0):
+        rng = self.rng
+        lines = []
+        for _ in range(rng.randint(1, 4)):
+            choice = rng.random()
+            if choice < 0.15 and depth < 2:
+                counter = f"c{self.counters}"
+                self.counters += 1
+                limit = rng.choice(["4", "0", "-2", f"min({self.expression('int', 2)}, 5)"])
+                lines.append(f"{indent}repeatFor(int {counter} = {rng.choice(['0', '1', '-3'])}; "
+                             f"{counter} {rng.choice(['<', '!='])} {limit}; {counter}++) {{")
+                self.variables["int"].append(counter)
+                lines.extend(self.block(indent + "    ", depth + 1))
+                self.variables["int"].remove(counter)
+                lines.append(f"{indent}}}")
+            elif choice < 0.25 and depth < 2:
+                counter = f"w{self.counters}"
+                self.counters += 1
+                lines.append(f"{indent}int {counter} = 0;")
+                lines.append(f"{indent}repeatWhile({counter} < {rng.randint(0, 4)}) {{")
+                lines.append(f"{indent}    {counter} = {counter} + 1;")
+                lines.extend(self.block(indent + "    ", depth + 1))
+                lines.append(f"{indent}}}")
+            elif choice < 0.45:
+                lines.append(f"{indent}thereBe{{")
+                lines.append(f"{indent}    {self.statement()}")
+                if rng.random() < 0.3:
+                    lines.append(f"{indent}    ret r;")
+                lines.append(f"{indent}}}if({self.expression('bool')})")
+                if rng.random() < 0.4:
+                    lines.append(f"{indent}alas{{")
+                    lines.append(f"{indent}    {self.statement()}")
+                    lines.append(f"{indent}}}")
+            else:
+                lines.append(f"{indent}{self.statement()}")
+        return lines
+
+    def lines(self):
+        rng = self.rng
+        params = ", ".join(f"{param_type} {name}" for param_type, name in self.params)
+        lines = [f"{self.return_type} {self.name}({params}) {{"]
+        for k in range(rng.randint(1, 4)):
+            kind = rng.choice(TYPES)
+            value = self.expression(kind)
+            lines.append(f"    {kind} v{k} = {value};")
+            self.variables[kind].append(f"v{k}")
+        if rng.random() < 0.5:
+            kind = rng.choice(TYPES)
+            size = rng.randint(1, 6)
+            if rng.random() < 0.5:
+                lines.append(f"    {kind} a0[{size}];")
+            else:
+                values = ", ".join(self.literal(kind) for _ in range(size))
+                lines.append(f"    {kind} a0[{size}] = {{{values}}};")
+            self.arrays["a0"] = (kind, size)
+        # ret values are emitted as written, so results go through a variable
+        lines.append(f"    {self.return_type} r = {self.expression(self.return_type)};")
+        self.variables[self.return_type].append("r")
+        lines.extend(self.block("    "))
+        lines.append("    ret r;")
+        lines.append("}")
+        return lines
+
+def random_file(rng, functions):
+    writers = []
+    lines = []
+    for k in range(functions):
+        writer = FunctionWriter(rng, f"f{k}", writers[-3:])
+        lines.extend(writer.lines())
+        writers.append(writer)
+    cases = []
+    for writer in writers:
+        for _ in range(8):
+            args = ", ".join(rng.choice(HOSTILE_ARGUMENTS[param_type] if rng.random() < 0.25 else ARGUMENTS[param_type])
+                             for param_type, _ in writer.params)
+            cases.append((writer.name, args))
+    return lines, cases
+
+# Runs every case in a fresh interpreter; a call "fell back" when any
+# Python code of the native file ran during it
+HARNESS = """
+import runpy, sys
+sys.setrecursionlimit(1000)
+native = runpy.run_path({native!r}, run_name="native")
+python = runpy.run_path({python!r}, run_name="python")
+entered = []
+def profile(frame, event, arg):
+    if event == "call" and frame.f_code.co_filename == {native!r}:
+        entered.append(1)
+def call(module, name, args):
+    try:
+        return repr(module[name](*args))
+    except Exception as e:
+        return type(e).__name__
+for name, args in {cases!r}:
+    args = eval("(" + args + ",)")
+    built = type(native[name]).__name__ == "builtin_function_or_method"
+    entered.clear()
+    sys.setprofile(profile)
+    result = call(native, name, args)
+    sys.setprofile(None)
+    expected = call(python, name, args)
+    print(name, built, built and not entered, result == expected, expected)
+"""
+
+def check(source, cases, directory):
+    """
+    Returns (native functions, calls run natively, mismatching calls) for one file.
+    """
+    source_path = os.path.join(directory, "prog.tpy")
+    with open(source_path, "w") as f:
+        f.write(source)
+    python_path = transpile_file(source_path, os.path.join(directory, "python.py"), verbose=False)
+    native_path = transpile_file(source_path, os.path.join(directory, "native.py"), verbose=False,
+                                 native_functions=True)
+    harness = HARNESS.format(native=native_path, python=python_path, cases=cases)
+    process = subprocess.run([sys.executable, "-c", harness], capture_output=True, text=True)
+    if process.returncode:
+        return 0, 0, [f"harness failed: {process.stderr.strip()[-500:]}"]
+    native = set()
+    native_calls = 0
+    mismatches = []
+    for line, (name, args) in zip(process.stdout.splitlines(), cases):
+        _, built, ran_natively, same, result = line.split(" ", 4)
+        if built == "True":
+            native.add(name)
+        native_calls += ran_natively == "True"
+        if same != "True":
+            mismatches.append(f"{name}({args}): Python gives {result}")
+    return len(native), native_calls, mismatches
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check native functions against the Python they replace.")
+    parser.add_argument("--programs", type=int, default=50)
+    parser.add_argument("--functions", type=int, default=6, help="functions per random file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    failures = 0
+    native_total = native_calls = calls_total = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        native, calls, mismatches = check(KERNELS, KERNEL_CASES, tmp)
+        native_total += native
+        native_calls += calls
+        calls_total += len(KERNEL_CASES)
+        for mismatch in mismatches:
+            failures += 1
+            print(f"❌ kernels: {mismatch}")
+        for number in range(args.programs):
+            lines, cases = random_file(rng, args.functions)
+            native, calls, mismatches = check("\n".join(lines) + "\n", cases, tmp)
+            native_total += native
+            native_calls += calls
+            calls_total += len(cases)
+            if mismatches:
+                failures += 1
+                print(f"❌ program {number} (seed {args.seed}):")
+                for mismatch in mismatches[:5]:
+                    print(f"    {mismatch}")
+    print(f"{native_total} native functions of {args.programs * args.functions + 6}; "
+          f"{native_calls} of {calls_total} calls ran natively, the rest fell back to Python")
+    if failures:
+        return 1
+    print("✅ Native functions agree with Python")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
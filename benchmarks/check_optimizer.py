@@ -0,0 +1,251 @@
+"""
+Differential check for the optimization passes.
+
+Generates random TinyPy files built around what the passes rewrite: brick
+constants (numbers, strings, expressions of other bricks) read in
+functions and at top level, constant expressions, code after ret, and
+counted repeatWhile loops. It also mixes in the cases they must leave
+alone: bricks rebound later, declared universal, shadowed by locals or
+parameters or read before they are declared; loops whose variable is
+changed in the body, read after the loop, compared with a variable or
+left early; divisions by zero. Each file is run transpiled at -O0, with
+every pass on its own, and at -O1 and -O2. The output (and the exception
+raised, if any) must be identical, and each pass must have changed the
+code of some files.
+
+Run from the repository root:
+    python -m benchmarks.check_optimizer --programs 300
+"""
+import argparse
+import contextlib
+import io
+import random
+import signal
+import sys
+
+from file_transpiler import transpile_source
+from optimizer import PASSES, LEVELS, level_options
+
+CONFIGURATIONS = {"-O0": level_options(0)}
+CONFIGURATIONS.update({name: {option: option == name for option in PASSES} for name in PASSES})
+CONFIGURATIONS.update({f"-O{level}": level_options(level) for level in LEVELS if level})
+
+class ProgramWriter:
+    """
+    Writes one random program; names are numbered so generated code never
+    clashes by accident, only where a hostile case asks for it.
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.bricks = []
+        self.functions = []
+        self.lines = []
+
+    def number(self):
+        return str(self.rng.choice([0, 1, 2, 3, 5, 7, 10, 12, -4, 100]))
+
+    def brick_value(self):
+        rng = self.rng
+        kind = rng.random()
+        if kind < 0.15:
+            return rng.choice(['"tiny"', '"py"', "2.5", "0.1", "true"])
+        if self.bricks and kind < 0.6:
+            return f"{rng.choice(self.bricks)} {rng.choice(['+', '*', '-', '%', '//'])} {self.number()}"
+        return self.number()
+
+    def add_brick(self):
+        name = f"B{len(self.bricks)}"
+        self.lines.append(f"brick {name} = {self.brick_value()};")
+        self.bricks.append(name)
+
+    def term(self, names):
+        rng = self.rng
+        choice = rng.random()
+        if choice < 0.4 and names:
+            return rng.choice(names)
+        if choice < 0.6 and self.bricks:
+            return rng.choice(self.bricks)
+        return self.number()
+
+    def expression(self, names, depth=0):
+        rng = self.rng
+        if depth > 2 or rng.random() < 0.3:
+            return self.term(names)
+        operator = rng.choice(["+", "-", "*", "*", "%", "//", "/", "**"])
+        left = self.expression(names, depth + 1)
+        right = self.expression(names, depth + 1)
+        if operator == "**":
+            right = str(rng.randint(0, 3))
+        elif operator in ("%", "//", "/") and rng.random() < 0.8:
+            right = f"({right} * {right} + 1)"
+        if rng.random() < 0.3:
+            return f"({left} {operator} {right})"
+        return f"{left} {operator} {right}"
+
+    def loop(self, indent, names, depth, counter):
+        """
+        A repeatWhile loop over counter, counted or not.
+        """
+        rng = self.rng
+        pad = "    " * indent
+        limit = rng.choice([str(rng.randint(0, 6)), rng.choice(self.bricks or ["3"]), "n", "3 + 2"])
+        if limit.lstrip("-").isdigit() is False and limit not in ("n", "3 + 2") and rng.random() < 0.5:
+            limit = f"{limit} % 7"  # keep brick limits small
+        elif limit == "n":
+            limit = "n % 7"
+        comparison = rng.choice(["<", "<="])
+        lines = [f"{pad}int {counter} = {rng.randint(-2, 2)};",
+                 f"{pad}repeatWhile({counter} {comparison} {limit}) {{"]
+        body = self.block(indent + 1, names + [counter], depth + 1)
+        hostile = rng.random()
+        if hostile < 0.1:
+            body.insert(rng.randint(0, len(body)), f"{pad}    {counter} = {counter} + 1;")
+        elif hostile < 0.15:
+            body += [f"{pad}    thereBe{{", f"{pad}        break;", f"{pad}    }}if({counter} == 2)"]
+        if hostile > 0.9:
+            lines += body + [f"{pad}    {counter}++;", f"{pad}    {counter} = {counter};"]
+        else:
+            lines += body + [f"{pad}    {counter}++;"]
+        lines.append(f"{pad}}}")
+        if rng.random() < 0.5:
+            lines.append(f"{pad}total = total + {counter};")  # read after the loop
+        return lines
+
+    def block(self, indent, names, depth=0):
+        rng = self.rng
+        pad = "    " * indent
+        lines = []
+        for _ in range(rng.randint(1, 3)):
+            choice = rng.random()
+            if choice < 0.45:
+                lines.append(f"{pad}total = total + {self.expression(names)};")
+            elif choice < 0.6 and depth < 2:
+                lines += self.loop(indent, names, depth, f"i{depth}")
+            elif choice < 0.75:
+                lines += [f"{pad}thereBe{{", f"{pad}    total = total - {self.term(names)};"]
+                if rng.random() < 0.3:
+                    lines += [f"{pad}    ret total;", f"{pad}    total = 0;"]
+                lines.append(f"{pad}}}if(total > {self.expression(names)})")
+            elif choice < 0.85 and self.bricks:
+                lines.append(f"{pad}disp << {rng.choice(self.bricks)};")
+            else:
+                lines.append(f"{pad}total = total % 1000003;")
+        return lines
+
+    def add_function(self):
+        rng = self.rng
+        name = f"f{len(self.functions)}"
+        param = "n"
+        if self.bricks and rng.random() < 0.1:
+            param = rng.choice(self.bricks)  # a parameter shadowing a brick
+        lines = [f"int {name}(int {param}) {{", "    int total = 0;"]
+        if param != "n":
+            lines.append(f"    int n = {param};")
+        local = None
+        if self.bricks and rng.random() < 0.1:
+            local = rng.choice(self.bricks)
+            lines.append(f"    int {local} = 4;")  # a local shadowing a brick
+        if self.bricks and rng.random() < 0.05:
+            brick = rng.choice(self.bricks)
+            if brick not in (param, local):
+                lines += [f"    universal {brick};", f"    {brick} = {brick} + 1;"]
+        lines += self.block(1, ["n"])
+        lines.append("    ret total;")
+        if rng.random() < 0.5:
+            lines += ["    disp << total;", "    total = 1;"]  # dead code
+        lines.append("}")
+        self.lines += lines
+        self.functions.append(name)
+
+    def program(self):
+        rng = self.rng
+        for _ in range(rng.randint(1, 4)):
+            self.add_brick()
+        if rng.random() < 0.2:
+            later = [f"B{len(self.bricks) + n}" for n in range(rng.randint(1, 2))]
+            declared = self.bricks
+            self.bricks = declared + later
+            self.add_function()  # reads bricks declared after it
+            self.bricks = declared
+            for _ in later:
+                self.add_brick()
+        for _ in range(rng.randint(0, 3)):
+            self.add_brick()
+        for _ in range(rng.randint(1, 4)):
+            self.add_function()
+        if self.bricks and rng.random() < 0.1:
+            self.lines.append(f"{rng.choice(self.bricks)} = 3;")  # a brick rebound at top level
+        self.lines.append(f"int top = {self.expression([])};")
+        self.lines += ["int main() {"]
+        for function in self.functions:
+            self.lines += [f"    int r_{function} = {function}({rng.randint(0, 6)});", f"    disp << r_{function};"]
+        self.lines += ["    disp << top;", "    ret 0;", "}"]
+        return "\n".join(self.lines) + "\n"
+
+# Seconds a generated program may run; a miscompiled loop can spin forever
+TIMEOUT = 5
+
+class Timeout(Exception):
+    pass
+
+def expire(signum, frame):
+    raise Timeout(f"still running after {TIMEOUT}s")
+
+def run(code):
+    """
+    Runs generated code; returns its output and the exception it raised.
+    """
+    output = io.StringIO()
+    error = None
+    alarm = hasattr(signal, "SIGALRM")
+    if alarm:
+        signal.signal(signal.SIGALRM, expire)
+        signal.alarm(TIMEOUT)
+    with contextlib.redirect_stdout(output):
+        try:
+            exec(compile(code, "<generated>", "exec"), {"__name__": "__main__"})
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            if alarm:
+                signal.alarm(0)
+    return output.getvalue(), error
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check optimized programs against the literal translation.")
+    parser.add_argument("--programs", type=int, default=200, help="random programs to check")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--show", action="store_true", help="print the first mismatching program")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    mismatches = 0
+    changed = dict.fromkeys(CONFIGURATIONS, 0)
+    for program in range(args.programs):
+        source = ProgramWriter(rng).program()
+        baseline = transpile_source(source, **CONFIGURATIONS["-O0"])
+        expected = run(baseline)
+        for name, options in CONFIGURATIONS.items():
+            code = transpile_source(source, **options)
+            changed[name] += code != baseline
+            result = run(code)
+            if result != expected:
+                mismatches += 1
+                print(f"❌ program {program} (seed {args.seed}) differs with {name}: {expected} != {result}")
+                if args.show and mismatches == 1:
+                    print(source)
+                    print(code)
+
+    status = "✅" if not mismatches else "❌"
+    print(f"{status} {args.programs} random programs, {mismatches} mismatches against -O0")
+    for name in CONFIGURATIONS:
+        if name != "-O0":
+            print(f"📊 {name:20s} changed {changed[name]} programs")
+    unused = [name for name in PASSES if not changed[name]]
+    if unused:
+        print(f"❌ passes that never changed a program: {', '.join(unused)}")
+    return 1 if mismatches or unused else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
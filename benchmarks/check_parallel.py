@@ -0,0 +1,116 @@
+"""
+Determinism check for parallel transpilation of a single file.
+
+Generates random TinyPy files made of many top-level functions mixed with
+the constructs that make cutting a file at function boundaries unsafe:
+thereBe{ blocks whose condition comes after a function, alas{ blocks and
+functions left unclosed, stray closing braces and if( lines after a
+closing brace. Each file is transpiled serially and on a process pool with
+several worker counts, and the Python output and the source map must be
+byte-identical. The random files are cut into small chunks so that many
+chunks are in flight at once. Also reports the time of both paths on a large file.
+
+Run from the repository root:
+    python -m benchmarks.check_parallel --programs 50 --workers 2,4,8
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from benchmarks.corpus import generate_program
+from file_transpiler import (transpile_tokens, transpile_tokens_parallel, split_points,
+                             CHUNK_TOKENS)
+from tinypy_lexer import tokenize
+
+def function(rng, n):
+    lines = [f"int f{n}(int x) {{", f"    int y{n} = x + {rng.randint(0, 9)};"]
+    if rng.random() < 0.3:
+        lines += ["    thereBe{", f"        y{n} = y{n} * 2;", f"    }}if(y{n} > 3)"]
+    if rng.random() < 0.2:
+        lines += [f"    repeatWhile(y{n} > 100) {{", f"        y{n} = y{n} - 7;", "    }"]
+    lines += [f"    ret y{n};", "}"]
+    return lines
+
+def hostile(rng, n):
+    """
+    A top-level fragment that leaves the block structure unsettled for a while.
+    """
+    kind = rng.choice(["open thereBe", "bare thereBe", "alas", "stray", "unclosed", "else if", "global"])
+    if kind == "open thereBe":
+        # The condition only comes after the next function
+        return ["thereBe{", f"    disp << {n};"] + function(rng, n + 100000) + ["}if(1 > 0)"]
+    if kind == "bare thereBe":
+        return ["thereBe{", f"    disp << {n};", "}", "if(1 > 0)"]
+    if kind == "alas":
+        return ["alas{", f"    disp << {n};"] + (["}"] if rng.random() < 0.7 else [])
+    if kind == "stray":
+        return ["}"]
+    if kind == "unclosed":
+        return [f"int g{n}() {{", f"    ret {n};"]
+    if kind == "else if":
+        return ["thereBe{", f"    disp << {n};", f"}}else if({n} > 1)"]
+    return [f"int G{n} = {n};"]
+
+def random_file(rng, functions):
+    lines = []
+    for n in range(functions):
+        if rng.random() < 0.1:
+            lines += hostile(rng, n)
+        lines += function(rng, n)
+    if rng.random() < 0.5:
+        lines += ["int main() {", "    disp << f0(1);", "    ret 0;", "}"]
+    return lines
+
+def transpile(lines, workers, chunk_size=CHUNK_TOKENS):
+    line_map = []
+    if workers == 1:
+        py_lines = transpile_tokens(tokenize(lines), line_map=line_map)
+    else:
+        py_lines = transpile_tokens_parallel(tokenize(lines), workers, line_map, chunk_size)
+    return "\n".join(py_lines), line_map
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that parallel transpilation matches the serial path.")
+    parser.add_argument("--programs", type=int, default=30, help="random files to check")
+    parser.add_argument("--functions", type=int, default=200, help="top-level functions per random file")
+    parser.add_argument("--workers", default="2,4", help="comma-separated worker counts to compare")
+    parser.add_argument("--chunk-tokens", type=int, default=64,
+                        help="chunk size for the random files, small so they span many chunks")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lines", type=int, default=500000, help="size of the timed corpus file")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    worker_counts = [int(workers) for workers in args.workers.split(",")]
+    mismatches = 0
+    points = 0
+    for program in range(args.programs):
+        lines = random_file(rng, args.functions)
+        points += len(split_points(list(tokenize(lines))))
+        expected = transpile(lines, 1)
+        for workers in worker_counts:
+            if transpile(lines, workers, args.chunk_tokens) != expected:
+                mismatches += 1
+                print(f"❌ program {program} (seed {args.seed}) differs with {workers} workers")
+    status = "✅" if not mismatches else "❌"
+    print(f"{status} {args.programs} random files, {points} split points, "
+          f"{mismatches} mismatches against the serial output")
+
+    lines = generate_program(args.lines, seed=args.seed, function_size=20)
+    start = time.perf_counter()
+    expected = transpile(lines, 1)
+    serial_seconds = time.perf_counter() - start
+    print(f"📊 {len(lines)} lines: serial {serial_seconds:.2f}s (cores: {os.cpu_count()})")
+    for workers in worker_counts:
+        start = time.perf_counter()
+        result = transpile(lines, workers)
+        seconds = time.perf_counter() - start
+        mismatches += result != expected
+        print(f"{'✅' if result == expected else '❌'} {workers} workers {seconds:.2f}s "
+              f"({serial_seconds / seconds:.2f}x)")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
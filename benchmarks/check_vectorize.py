@@ -0,0 +1,161 @@
+"""
+Differential check for the NumPy loop vectorizer.
+
+Generates random TinyPy programs built from fills, element-wise maps and
+running sums over int/float/bool arrays (including empty, negative and
+out-of-range loop bounds), transpiles each one with the numpy backend with
+and without vectorization, runs both and requires identical stdout and the
+same exception, if any. Also reports how many loops were vectorized and
+the speedup on a large numeric kernel.
+
+Needs NumPy. Run from the repository root:
+    python -m benchmarks.check_vectorize --programs 200
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from file_transpiler import transpile_source
+
+ARRAY_TYPES = ("int", "float", "bool")
+
+def random_literal(rng, array_type):
+    if array_type == "int":
+        return str(rng.randint(-50, 50))
+    if array_type == "float":
+        return rng.choice(["0.1", "0.2", "0.3", "1.5", "2.25", "1000000.7", "3.3"])
+    return rng.choice(["true", "false"])
+
+def random_expression(rng, arrays, scalars, depth=0):
+    choice = rng.random()
+    if depth < 2 and choice < 0.45:
+        left = random_expression(rng, arrays, scalars, depth + 1)
+        right = random_expression(rng, arrays, scalars, depth + 1)
+        expression = f"{left} {rng.choice('+-*')} {right}"
+        return f"({expression})" if rng.random() < 0.5 else expression
+    if choice < 0.75:
+        return f"{rng.choice(arrays)}[i]"
+    if choice < 0.83:
+        return "i"
+    if choice < 0.93 and scalars:
+        return rng.choice(scalars)
+    return random_literal(rng, rng.choice(("int", "float")))
+
+def random_loop(rng, arrays, scalars, size):
+    start = rng.choice(["0", "0", "1", "2", "-1"])
+    limit = rng.choice(["n", "n", str(size), str(max(size - 2, 0)), str(size + 3), "0"])
+    kind = rng.random()
+    if kind < 0.3:
+        body = f"{rng.choice(arrays)}[i] = {random_literal(rng, rng.choice(ARRAY_TYPES))};"
+    elif kind < 0.65:
+        body = f"{rng.choice(arrays)}[i] = {random_expression(rng, arrays, scalars)};"
+    else:
+        total = rng.choice(scalars)
+        term = random_expression(rng, arrays, scalars, depth=1)
+        if " + " in term or " - " in term:
+            term = f"({term})"
+        body = f"{total} = {total} {rng.choice('+-')} {term};"
+    return [f"    repeatFor(int i = {start}; i < {limit}; i++) {{", f"        {body}", "    }"]
+
+def random_program(rng):
+    size = rng.randint(1, 12)
+    lines = ["int main() {", f"    int n = {size};"]
+    arrays = []
+    for k in range(rng.randint(1, 4)):
+        array_type = rng.choice(ARRAY_TYPES)
+        name = f"{array_type[0]}{k}"
+        if rng.random() < 0.5:
+            values = ", ".join(random_literal(rng, array_type) for _ in range(size))
+            lines.append(f"    {array_type} {name}[{size}] = {{{values}}};")
+        else:
+            lines.append(f"    {array_type} {name}[n];")
+        arrays.append(name)
+    scalars = ["si", "sf"]
+    lines.append(f"    int si = {rng.randint(-5, 5)};")
+    lines.append(f"    float sf = {random_literal(rng, 'float')};")
+    for _ in range(rng.randint(1, 6)):
+        lines.extend(random_loop(rng, arrays, scalars, size))
+    for name in arrays + scalars:
+        lines.append(f"    disp << {name};")
+    lines.append("    ret 0;")
+    lines.append("}")
+    return "\n".join(lines)
+
+def run(source, directory, name):
+    """
+    Runs generated Python; returns (stdout, exception line or "").
+    """
+    path = os.path.join(directory, name)
+    with open(path, "w") as f:
+        f.write(source)
+    process = subprocess.run([sys.executable, path], capture_output=True, text=True)
+    error = ""
+    if process.returncode:
+        error = process.stderr.strip().splitlines()[-1].split(":")[0]
+    return process.stdout, error
+
+KERNEL = """
+int main() {
+    int n = 2000000;
+    float x[n];
+    float y[n];
+    repeatFor(int i = 0; i < n; i++) {
+        x[i] = i * 0.5;
+    }
+    repeatFor(int i = 0; i < n; i++) {
+        y[i] = x[i] * 2.0 + 1.0;
+    }
+    float total = 0.0;
+    repeatFor(int i = 0; i < n; i++) {
+        total = total + x[i] * y[i];
+    }
+    disp << total;
+    ret 0;
+}
+"""
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check vectorized loops against the scalar loops they replace.")
+    parser.add_argument("--programs", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    vectorized_loops = 0
+    total_loops = 0
+    mismatches = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for number in range(args.programs):
+            program = random_program(rng)
+            vector_source = transpile_source(program, array_backend="numpy", vectorize=True)
+            scalar_source = transpile_source(program, array_backend="numpy", vectorize=False)
+            total_loops += program.count("repeatFor")
+            vectorized_loops += vector_source.count("_tpy_vector_span(_tpy_range")
+            if run(vector_source, tmp, "vector.py") != run(scalar_source, tmp, "scalar.py"):
+                mismatches += 1
+                print(f"❌ program {number} differs:\n{program}")
+
+        timings = {}
+        for vectorize in (False, True):
+            source = transpile_source(KERNEL, array_backend="numpy", vectorize=vectorize)
+            start = time.perf_counter()
+            output = run(source, tmp, "kernel.py")
+            timings[vectorize] = (time.perf_counter() - start, output)
+
+    print(f"{vectorized_loops} of {total_loops} loops vectorized in {args.programs} programs")
+    if timings[False][1] != timings[True][1]:
+        mismatches += 1
+        print("❌ kernel output differs")
+    print(f"kernel: scalar {timings[False][0]:.2f}s, vectorized {timings[True][0]:.2f}s "
+          f"({timings[False][0] / timings[True][0]:.1f}x)")
+    if mismatches:
+        return 1
+    print("✅ Vectorized and scalar loops agree")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
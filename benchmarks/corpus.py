@@ -0,0 +1,156 @@
+"""
+Synthetic TinyPy program generator for the benchmark suite.
+
+Programs are built from construct snippets picked according to a weighted
+mix, so a corpus can be skewed towards loops, conditionals, initializers
+or I/O. Output is deterministic for a given seed.
+"""
+import random
+
+CONSTRUCTS = ("declaration", "for", "while", "foreach", "fordict",
+              "conditional", "array", "dict", "io")
+
+DEFAULT_MIX = {
+    "declaration": 4,
+    "for": 2,
+    "while": 2,
+    "foreach": 1,
+    "fordict": 1,
+    "conditional": 2,
+    "array": 1,
+    "dict": 1,
+    "io": 2,
+}
+
+def declaration_snippet(rng, n, initializer_size):
+    return [
+        f"int v{n} = {rng.randint(0, 100)};",
+        f"float f{n} = {rng.randint(0, 100)}.5;",
+        f"bool b{n} = true;",
+        f"v{n}++;",
+    ]
+
+def for_snippet(rng, n, initializer_size):
+    return [
+        f"repeatFor(int i{n} = 0; i{n} < {rng.randint(2, 50)}; i{n}++) {{",
+        f"    total = total + i{n} * {rng.randint(1, 9)};",
+        "}",
+    ]
+
+def while_snippet(rng, n, initializer_size):
+    return [
+        f"int w{n} = 0;",
+        f"repeatWhile(w{n} < {rng.randint(2, 50)} && w{n} != 99) {{",
+        f"    w{n}++;",
+        "}",
+    ]
+
+def foreach_snippet(rng, n, initializer_size):
+    return [
+        f"string names{n}[2] = {{\"ann\", \"bob\"}};",
+        f"for(name{n} : names{n}) {{",
+        f"    disp << name{n};",
+        "}",
+    ]
+
+def fordict_snippet(rng, n, initializer_size):
+    return [
+        f"dict ages{n} <string,int>[2] = {{\"ann\" : {rng.randint(1, 90)}, \"bob\" : {rng.randint(1, 90)}}};",
+        f"forDict(key{n}, value{n} : ages{n}) {{",
+        f"    disp << key{n} << value{n};",
+        "}",
+    ]
+
+def conditional_snippet(rng, n, initializer_size):
+    return [
+        f"int c{n} = {rng.randint(0, 10)};",
+        "thereBe{",
+        f"    disp << \"big\" << c{n};",
+        f"}}if(c{n} > 5 && !(c{n} == 7))",
+        "thereBe{",
+        f"    c{n} = c{n} + 1;",
+        f"}}else if(c{n} == 5 || false)",
+        "alas{",
+        f"    c{n}--;",
+        "}",
+    ]
+
+def array_snippet(rng, n, initializer_size):
+    values = ", ".join(str(rng.randint(-1000, 1000)) for _ in range(initializer_size))
+    return [
+        f"int a{n}[{initializer_size}] = {{{values}}};",
+        f"float z{n}[{initializer_size}];",
+        f"total = total + a{n}[0];",
+    ]
+
+def dict_snippet(rng, n, initializer_size):
+    pairs = ", ".join(f"\"k{k}\" : {rng.randint(0, 1000)}" for k in range(initializer_size))
+    return [
+        f"dict d{n} <string,int>[{initializer_size}] = {{{pairs}}};",
+        f"total = total + d{n}[\"k0\"];",
+    ]
+
+def io_snippet(rng, n, initializer_size):
+    return [
+        f"int in{n};",
+        f"disp << \"Enter value\" << {n};",
+        f"enter(\"%i\", in{n});",
+        f"disp << \"Got\" << in{n} << total;",
+    ]
+
+SNIPPETS = {
+    "declaration": declaration_snippet,
+    "for": for_snippet,
+    "while": while_snippet,
+    "foreach": foreach_snippet,
+    "fordict": fordict_snippet,
+    "conditional": conditional_snippet,
+    "array": array_snippet,
+    "dict": dict_snippet,
+    "io": io_snippet,
+}
+
+def generate_program(target_lines, mix=None, seed=0, function_size=60, initializer_size=16):
+    """
+    Generates roughly target_lines lines of TinyPy spread over functions of
+    about function_size lines each, picking snippets by the weights in mix
+    (defaults to DEFAULT_MIX). Every function takes an int and returns an
+    accumulated total, and a main() calls the first one.
+    Returns a list of source lines.
+    """
+    rng = random.Random(seed)
+    weights = mix or DEFAULT_MIX
+    kinds = [kind for kind in CONSTRUCTS if weights.get(kind)]
+    kind_weights = [weights[kind] for kind in kinds]
+
+    lines = []
+    function_count = 0
+    snippet_count = 0
+    while len(lines) < target_lines:
+        lines.append(f"int work{function_count}(int n) {{")
+        lines.append("    int total = 0;")
+        body_start = len(lines)
+        while len(lines) - body_start < function_size and len(lines) < target_lines:
+            kind = rng.choices(kinds, kind_weights)[0]
+            for line in SNIPPETS[kind](rng, snippet_count, initializer_size):
+                lines.append("    " + line)
+            snippet_count += 1
+        lines.append("    ret total;")
+        lines.append("}")
+        function_count += 1
+
+    lines.append("int main() {")
+    lines.append("    int result = work0(3);")
+    lines.append("    disp << \"Result\" << result;")
+    lines.append("    ret 0;")
+    lines.append("}")
+    return lines
+
+def write_program(path, target_lines, **options):
+    """
+    Writes a generated program to path and returns its line count.
+    """
+    lines = generate_program(target_lines, **options)
+    with open(path, "w") as f:
+        f.write("\n".join(lines))
+    return len(lines)
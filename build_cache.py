@@ -0,0 +1,249 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import time
+from transpile_options import options_key, get as get_option
+from sidecar_data import sidecar_path, remove_sidecar
+from c_backend import native_module_path, remove_native_module
+from source_map import source_map_path
+from bytecode_output import write_bytecode
+
+DEFAULT_CACHE_DIR = ".tinypy_cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60
+STATS_FILE = "stats.json"
+
+# Modules besides the *_transpiler.py ones that shape the generated code
+CODEGEN_MODULES = ("tinypy_lexer.py", "tinypy_ir.py", "python_emitter.py", "name_localizer.py", "source_map.py",
+                   "sidecar_data.py", "c_backend.py", "line_cache.py",
+                   "optimizer.py")
+
+_fingerprint = None
+
+def transpiler_fingerprint():
+    """
+    Hashes the source of every module that takes part in code generation,
+    so editing the transpiler invalidates all cached outputs.
+    Computed once per process.
+    """
+    global _fingerprint
+    if _fingerprint is None:
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        paths = sorted(glob.glob(os.path.join(package_dir, "*_transpiler.py")))
+        for name in CODEGEN_MODULES:
+            paths.append(os.path.join(package_dir, name))
+        digest = hashlib.sha256()
+        for path in paths:
+            with open(path, "rb") as f:
+                digest.update(os.path.basename(path).encode())
+                digest.update(f.read())
+        _fingerprint = digest.hexdigest()
+    return _fingerprint
+
+def output_fingerprint():
+    """
+    Fingerprint of everything that decides the generated code: the
+    transpiler sources plus any non-default code-generation options.
+    """
+    key = options_key()
+    if not key:
+        return transpiler_fingerprint()
+    return hashlib.sha256(f"{transpiler_fingerprint()}:{key}".encode()).hexdigest()
+
+class BuildCache:
+    """
+    On-disk cache of transpiled outputs keyed by source content, the
+    transpiler fingerprint and the code-generation options. Entries are
+    plain .py files sharded by the first two hex digits of their key, with
+    the source map next to them once one was asked for and the sidecar data
+    file and native module when the output has them; their mtime records
+    the last use so eviction can drop the least recently used ones first.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, source_bytes):
+        digest = hashlib.sha256(output_fingerprint().encode())
+        digest.update(source_bytes)
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".py")
+
+    def lookup(self, key, output_path, source_map=False):
+        """
+        Materializes a cached output (and its source map, if asked for,
+        sidecar data and native module) at output_path. Returns False on a miss. An output that
+        already holds the cached bytes is left untouched so its mtime does
+        not change.
+        """
+        entry = self.entry_path(key)
+        cached_data = None
+        cached_native = None
+        try:
+            with open(entry, "rb") as f:
+                cached = f.read()
+            if source_map:
+                with open(source_map_path(entry), "rb") as f:
+                    cached_map = f.read()
+            if get_option("sidecar_data") and os.path.exists(sidecar_path(entry)):
+                with open(sidecar_path(entry), "rb") as f:
+                    cached_data = f.read()
+            if get_option("native_functions") and os.path.exists(native_module_path(entry)):
+                with open(native_module_path(entry), "rb") as f:
+                    cached_native = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+
+        os.utime(entry)
+        self.hits += 1
+        if source_map:
+            materialize(cached_map, source_map_path(output_path))
+        if cached_data is not None:
+            materialize(cached_data, sidecar_path(output_path))
+        elif get_option("sidecar_data"):
+            remove_sidecar(sidecar_path(output_path))
+        if cached_native is not None:
+            # A loaded module must be replaced, not written over
+            materialize(cached_native, native_module_path(output_path), replace=True)
+        elif get_option("native_functions"):
+            remove_native_module(native_module_path(output_path))
+        materialize(cached, output_path)
+        # The pyc names its output path, so it is compiled here rather than cached
+        if get_option("write_bytecode"):
+            write_bytecode(output_path)
+        return True
+
+    def store(self, key, output_path, source_map=False):
+        """
+        Copies a freshly transpiled output (and its source map, sidecar
+        data and native module) into the cache atomically.
+        """
+        entry = self.entry_path(key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        paths = [(output_path, entry)]
+        # Companions go in first, so a visible entry never lacks them
+        if source_map:
+            paths.insert(0, (source_map_path(output_path), source_map_path(entry)))
+        if get_option("sidecar_data") and os.path.exists(sidecar_path(output_path)):
+            paths.insert(0, (sidecar_path(output_path), sidecar_path(entry)))
+        if get_option("native_functions") and os.path.exists(native_module_path(output_path)):
+            paths.insert(0, (native_module_path(output_path), native_module_path(entry)))
+        for source_path, target_path in paths:
+            temp_path = f"{target_path}.{os.getpid()}.tmp"
+            shutil.copyfile(source_path, temp_path)
+            os.replace(temp_path, target_path)
+
+    def evict(self):
+        """
+        Drops entries unused for longer than max_age, then the least recently
+        used ones until the cache fits in max_bytes.
+        Returns the number of entries removed.
+        """
+        now = time.time()
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, "??", "*.py")):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            size = stat.st_size
+            for companion in (source_map_path(path), sidecar_path(path), native_module_path(path)):
+                try:
+                    size += os.path.getsize(companion)
+                except FileNotFoundError:
+                    pass
+            entries.append((stat.st_mtime, size, path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age and total <= self.max_bytes:
+                break
+            for entry_file in (path, source_map_path(path), sidecar_path(path), native_module_path(path)):
+                try:
+                    os.remove(entry_file)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            removed += 1
+
+        self.evictions += removed
+        return removed
+
+    def record(self, hits=0, misses=0):
+        """
+        Adds counts gathered elsewhere (e.g. in batch workers).
+        """
+        self.hits += hits
+        self.misses += misses
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def save_stats(self):
+        """
+        Accumulates this run's counters into the cache's stats.json.
+        """
+        path = os.path.join(self.cache_dir, STATS_FILE)
+        totals = {"hits": 0, "misses": 0, "evictions": 0}
+        try:
+            with open(path) as f:
+                totals.update(json.load(f))
+        except (FileNotFoundError, ValueError):
+            pass
+        for name in ("hits", "misses", "evictions"):
+            totals[name] += getattr(self, name)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(totals, f, indent=2)
+
+def materialize(data, path, replace=False):
+    """
+    Writes data to path unless the file already holds exactly that. With
+    replace, the data goes to a new file moved over the old one.
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return
+    except FileNotFoundError:
+        pass
+    target_path = f"{path}.{os.getpid()}.tmp" if replace else path
+    with open(target_path, "wb") as f:
+        f.write(data)
+    if replace:
+        os.replace(target_path, path)
+
+def cached_transpile(transpile, source_path, output_path, cache, source_map=False):
+    """
+    Runs transpile(source_path, output_path[, source_map]) unless the cache
+    already holds the output for this exact source. Returns True on a
+    cache hit.
+    """
+    with open(source_path, "rb") as f:
+        key = cache.key(f.read())
+    if cache.lookup(key, output_path, source_map):
+        return True
+    if source_map:
+        transpile(source_path, output_path, source_map)
+    else:
+        transpile(source_path, output_path)
+    cache.store(key, output_path, source_map)
+    return False
@@ -0,0 +1,75 @@
+import importlib.util
+import marshal
+import os
+
+# Bytecode is written next to its output as <stem>.pyc, e.g. prog.pyc for
+# prog.py, where the native runner (main.c) looks for it
+BYTECODE_SUFFIX = ".pyc"
+# PEP 552 flags: validated against a hash of the source, checked on every load
+CHECKED_HASH_FLAGS = 0b11
+HEADER_SIZE = 16
+
+def bytecode_path(output_path):
+    return os.path.splitext(output_path)[0] + BYTECODE_SUFFIX
+
+def bytecode_header(source_bytes):
+    """
+    Returns the 16-byte pyc header for source_bytes: the interpreter's
+    magic number, the checked-hash flags and the source hash.
+    """
+    return (importlib.util.MAGIC_NUMBER + CHECKED_HASH_FLAGS.to_bytes(4, "little")
+            + importlib.util.source_hash(source_bytes))
+
+def is_current(path, source_bytes):
+    """
+    Tells whether the pyc at path was compiled from source_bytes by this
+    Python version.
+    """
+    try:
+        with open(path, "rb") as f:
+            return f.read(HEADER_SIZE) == bytecode_header(source_bytes)
+    except FileNotFoundError:
+        return False
+
+def remove_bytecode(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+def store_pyc(path, header, code):
+    """
+    Writes a pyc (header followed by the marshalled code object) atomically,
+    so readers never see a partial file. Raises OSError if it cannot be
+    written.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(header)
+            f.write(marshal.dumps(code))
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def write_bytecode(output_path):
+    """
+    Compiles a transpiled output and writes its code object atomically to
+    bytecode_path(output_path). The code keeps output_path as its file
+    name, so tracebacks still show the .py lines. A pyc that already
+    matches the output is left untouched. Outputs that do not compile get
+    no pyc (a stale one is removed), so runners fall back to the source and
+    report the error from there. Returns True when a current pyc is in place.
+    """
+    path = bytecode_path(output_path)
+    with open(output_path, "rb") as f:
+        source_bytes = f.read()
+    if is_current(path, source_bytes):
+        return True
+    try:
+        code = compile(source_bytes, output_path, "exec", dont_inherit=True)
+    except (SyntaxError, ValueError) as error:
+        print(f"⚠️  {output_path} does not compile, no bytecode written: {error}")
+        remove_bytecode(path)
+        return False
+    store_pyc(path, bytecode_header(source_bytes), code)
+    return True
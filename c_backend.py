@@ -0,0 +1,866 @@
+import ast
+import hashlib
+import math
+import os
+import subprocess
+import sys
+import sysconfig
+import tempfile
+from importlib.machinery import EXTENSION_SUFFIXES
+from tinypy_ir import (FunctionDef, VarDeclaration, ArrayDeclaration, DictDeclaration, Statement, Constant, Global,
+                       Input, ForRange, ForEachLoop, ForDictLoop, walk)
+from vector_transpiler import ASSIGNED_NAME_PATTERN
+from name_localizer import IDENTIFIER_PATTERN
+
+# Native functions of prog.py are built into prog.native<extension suffix>,
+# e.g. prog.native.cpython-311-x86_64-linux-gnu.so, found next to the .py
+NATIVE_SUFFIX = ".native"
+NATIVE_MODULE = "_tpy_native"
+# Bumped whenever the generated C changes meaning, so modules built by an
+# older transpiler are never bound to newer Python code
+NATIVE_VERSION = "1"
+
+# TinyPy types a native function can take and return, and their C types
+NATIVE_TYPES = {"int": "int64_t", "float": "double", "bool": "int"}
+RESULT_CONVERSIONS = {"int": "PyLong_FromLongLong", "float": "PyFloat_FromDouble", "bool": "PyBool_FromLong"}
+ARGUMENT_CONVERSIONS = {"int": "tpy_int_arg", "float": "tpy_float_arg", "bool": "tpy_bool_arg"}
+# Builtins a native function may call, unless the module rebinds them
+NATIVE_BUILTINS = ("abs", "min", "max", "int", "float")
+
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+CFLAGS = ["-O2", "-shared", "-fPIC", "-fno-strict-aliasing", "-ffp-contract=off", "-w"]
+
+C_OPERATORS = {
+    ast.Add: "+", ast.Sub: "-", ast.Mult: "*", ast.BitAnd: "&", ast.BitOr: "|", ast.BitXor: "^",
+    ast.Eq: "==", ast.NotEq: "!=", ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">=",
+}
+# Checked int64 arithmetic: each helper returns nonzero when the exact
+# result does not fit or Python would raise
+CHECKED_INT_OPERATIONS = {
+    ast.Add: "__builtin_add_overflow", ast.Sub: "__builtin_sub_overflow", ast.Mult: "__builtin_mul_overflow",
+    ast.FloorDiv: "tpy_floordiv", ast.Mod: "tpy_mod",
+}
+
+# Runtime shared by every generated module. A native function returns 0
+# with its result, 1 to bail out (the Python function is called instead,
+# so overflow, division by zero, bad indexes and deep recursion behave
+# exactly as in Python) or -1 with a Python exception set.
+C_RUNTIME = r"""#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <math.h>
+
+/* ints up to 2**53 convert to double exactly */
+#define TPY_EXACT_LIMIT 9007199254740992LL
+/* native calls nest at most this deep; deeper recursion runs in Python */
+#define TPY_MAX_DEPTH 20000
+#define TPY_DEPTH_MARGIN 50
+#define TPY_MAX_ELEMENTS ((int64_t)(PY_SSIZE_T_MAX / 16))
+/* loop iterations between checks for Ctrl+C */
+#define TPY_TICK_INTERVAL 1048576
+#define TPY_TICK() if (++tpy_ticks >= TPY_TICK_INTERVAL) { tpy_ticks = 0; if (PyErr_CheckSignals()) goto tpy_error; }
+
+static unsigned long tpy_ticks = 0;
+
+static int tpy_floordiv(int64_t a, int64_t b, int64_t *result)
+{
+    int64_t q;
+    if (b == 0 || (a == INT64_MIN && b == -1))
+        return 1;
+    q = a / b;
+    if (a % b != 0 && ((a < 0) != (b < 0)))
+        q--;
+    *result = q;
+    return 0;
+}
+
+static int tpy_mod(int64_t a, int64_t b, int64_t *result)
+{
+    int64_t m;
+    if (b == 0)
+        return 1;
+    if (b == -1) {
+        *result = 0;
+        return 0;
+    }
+    m = a % b;
+    if (m != 0 && ((m < 0) != (b < 0)))
+        m += b;
+    *result = m;
+    return 0;
+}
+
+static int tpy_int_div(int64_t a, int64_t b, double *result)
+{
+    if (b == 0 || a > TPY_EXACT_LIMIT || a < -TPY_EXACT_LIMIT || b > TPY_EXACT_LIMIT || b < -TPY_EXACT_LIMIT)
+        return 1;
+    *result = (double)a / (double)b;
+    return 0;
+}
+
+static int tpy_float_div(double a, double b, double *result)
+{
+    if (b == 0.0)
+        return 1;
+    *result = a / b;
+    return 0;
+}
+
+static int tpy_float_to_int(double x, int64_t *result)
+{
+    if (!(x >= -9223372036854775808.0 && x < 9223372036854775808.0))
+        return 1;
+    *result = (int64_t)x;
+    return 0;
+}
+
+static int tpy_depth_budget(void)
+{
+    int frames = 0, budget;
+    PyFrameObject *frame = PyEval_GetFrame();
+    Py_XINCREF(frame);
+    while (frame != NULL) {
+        PyFrameObject *back = PyFrame_GetBack(frame);
+        Py_DECREF(frame);
+        frame = back;
+        frames++;
+    }
+    budget = Py_GetRecursionLimit() - frames - TPY_DEPTH_MARGIN;
+    return budget < TPY_MAX_DEPTH ? budget : TPY_MAX_DEPTH;
+}
+
+static int tpy_int_arg(PyObject *value, int64_t *result)
+{
+    int overflow;
+    long long x;
+    if (!PyLong_CheckExact(value))
+        return 1;
+    x = PyLong_AsLongLongAndOverflow(value, &overflow);
+    if (overflow)
+        return 1;
+    *result = x;
+    return 0;
+}
+
+static int tpy_float_arg(PyObject *value, double *result)
+{
+    if (!PyFloat_CheckExact(value))
+        return 1;
+    *result = PyFloat_AS_DOUBLE(value);
+    return 0;
+}
+
+static int tpy_bool_arg(PyObject *value, int *result)
+{
+    if (value != Py_True && value != Py_False)
+        return 1;
+    *result = value == Py_True;
+    return 0;
+}
+"""
+
+C_MODULE_TEMPLATE = r"""
+static PyObject *tpy_fallbacks[{count}];
+static const char *tpy_names[{count}] = {{{names}}};
+static const char *tpy_fingerprints[{count}] = {{{fingerprints}}};
+
+static PyObject *tpy_fallback(int index, PyObject *const *args, Py_ssize_t nargs, PyObject *kwnames)
+{{
+    if (tpy_fallbacks[index] == NULL) {{
+        PyErr_Format(PyExc_RuntimeError, "native function %s is not bound", tpy_names[index]);
+        return NULL;
+    }}
+    return PyObject_Vectorcall(tpy_fallbacks[index], args, nargs, kwnames);
+}}
+
+{wrappers}
+
+static PyObject *tpy_bind(PyObject *module, PyObject *args)
+{{
+    PyObject *function;
+    const char *name, *fingerprint;
+    int i;
+    if (!PyArg_ParseTuple(args, "Oss", &function, &name, &fingerprint))
+        return NULL;
+    for (i = 0; i < {count}; i++) {{
+        if (strcmp(name, tpy_names[i]) == 0 && strcmp(fingerprint, tpy_fingerprints[i]) == 0) {{
+            Py_INCREF(function);
+            Py_XSETREF(tpy_fallbacks[i], function);
+            return PyObject_GetAttrString(module, name);
+        }}
+    }}
+    Py_INCREF(function);
+    return function;
+}}
+
+static PyMethodDef tpy_methods[] = {{
+    {{"bind", tpy_bind, METH_VARARGS, "bind(function, name, fingerprint): the native twin of a Python function"}},
+{methods}
+    {{NULL, NULL, 0, NULL}}
+}};
+
+static struct PyModuleDef tpy_module = {{
+    PyModuleDef_HEAD_INIT, "{module}", NULL, -1, tpy_methods
+}};
+
+PyMODINIT_FUNC PyInit_{module}(void)
+{{
+    return PyModule_Create(&tpy_module);
+}}
+"""
+
+C_WRAPPER_TEMPLATE = r"""static PyObject *nw_{name}(PyObject *self, PyObject *const *args, Py_ssize_t nargs, PyObject *kwnames)
+{{
+{declarations}    {result_type} result;
+    int status;
+    if (kwnames != NULL || nargs != {arity})
+        goto fallback;
+{conversions}    status = nf_{name}({budget}{arguments}&result);
+    if (status == 0)
+        return {convert}(result);
+    if (status < 0)
+        return NULL;
+fallback:
+    return tpy_fallback({index}, args, nargs, kwnames);
+}}
+"""
+
+# Python prelude: binds each eligible function to its native twin, if the
+# module was built for this interpreter; otherwise functions stay as they are
+NATIVE_IMPORTS = [
+    "import importlib.util as _tpy_importlib_util",
+    "import os as _tpy_os",
+    "from importlib.machinery import EXTENSION_SUFFIXES as _tpy_extension_suffixes",
+]
+NATIVE_PRELUDE = [
+    "_tpy_native = None",
+    "",
+    "def _tpy_native_bind(function, name, fingerprint):",
+    "    global _tpy_native",
+    "    if _tpy_native is None:",
+    "        _tpy_native = False",
+    "        script = globals().get('__file__')",
+    "        if script:",
+    f"            path = _tpy_os.path.splitext(_tpy_os.path.abspath(script))[0] + '{NATIVE_SUFFIX}' + _tpy_extension_suffixes[0]",
+    "            if _tpy_os.path.exists(path):",
+    "                try:",
+    f"                    spec = _tpy_importlib_util.spec_from_file_location('{NATIVE_MODULE}', path)",
+    "                    _tpy_native = _tpy_importlib_util.module_from_spec(spec)",
+    "                    spec.loader.exec_module(_tpy_native)",
+    "                except ImportError:",
+    "                    _tpy_native = False",
+    "    return _tpy_native.bind(function, name, fingerprint) if _tpy_native else function",
+]
+
+def native_module_path(output_path):
+    return os.path.splitext(output_path)[0] + NATIVE_SUFFIX + EXTENSION_SUFFIXES[0]
+
+def remove_native_module(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+def is_native_signature(node):
+    """
+    Tells whether a def takes and returns only int, float and bool values.
+    """
+    return (node.return_type in NATIVE_TYPES and node.name.isascii()
+            and all(param.param_type in NATIVE_TYPES and param.name.isascii() for param in node.params))
+
+class NotNative(Exception):
+    """
+    Raised for code outside the subset native functions are built from.
+    """
+
+class FunctionTranslator:
+    """
+    Translates the Python code of one def to a C function, typing every
+    local from its first assignment. Works on the Python the emitter
+    generated rather than on the TinyPy source, so the C follows exactly
+    the code it stands in for. Raises NotNative for anything else: other
+    types, names that change type, globals, I/O, dicts, strings, calls
+    other than to native functions and a few builtins.
+    """
+
+    def __init__(self, name, params, return_type, signatures, module_names):
+        self.name = name
+        self.params = params
+        self.return_type = return_type
+        self.signatures = signatures
+        self.module_names = module_names
+        self.types = {}
+        self.calls = set()
+        self.temps = 0
+
+    def translate(self, tree):
+        """
+        Returns the C definition of the function in tree, an ast.FunctionDef.
+        """
+        args = tree.args
+        if (tree.decorator_list or args.vararg or args.kwarg or args.kwonlyargs or args.defaults
+                or args.posonlyargs or [arg.arg for arg in args.args] != [name for name, _ in self.params]):
+            raise NotNative("unsupported signature")
+        self.locals = {name for name, _ in self.params}
+        for node in ast.walk(ast.Module(tree.body, [])):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+                self.locals.add(node.id)
+            elif isinstance(node, (ast.Global, ast.Nonlocal, ast.FunctionDef, ast.Lambda, ast.Break, ast.Continue)):
+                raise NotNative(type(node).__name__)
+        if not all(name.isascii() for name in self.locals):
+            raise NotNative("non-ASCII name")
+        for name, param_type in self.params:
+            self.types[name] = param_type
+
+        body = []
+        self.block(tree.body, set(self.types), body, 1)
+        lines = [f"static int nf_{self.name}({self.signature()})", "{", "    int tpy_status = 0;"]
+        arrays = []
+        for name, var_type in self.types.items():
+            if name in dict(self.params):
+                continue
+            if type(var_type) is tuple:
+                lines.append(f"    {NATIVE_TYPES[var_type[1]]} *v_{name} = NULL;")
+                lines.append(f"    int64_t n_{name} = 0;")
+                arrays.append(name)
+            else:
+                lines.append(f"    {NATIVE_TYPES[var_type]} v_{name} = 0;")
+        lines.extend(body)
+        # Falling off the end returns None, which only Python can do
+        lines.extend(["    goto tpy_bail;", "tpy_bail:", "    tpy_status = 1;", "    goto tpy_done;",
+                      "tpy_error:", "    tpy_status = -1;", "tpy_done:"])
+        lines.extend(f"    free(v_{name});" for name in arrays)
+        lines.extend(["    return tpy_status;", "}"])
+        return "\n".join(lines)
+
+    def signature(self):
+        params = ", ".join(f"{NATIVE_TYPES[param_type]} v_{name}" for name, param_type in self.params)
+        return f"int depth, {params + ', ' if params else ''}{NATIVE_TYPES[self.return_type]} *tpy_result"
+
+    def temp(self):
+        self.temps += 1
+        return f"_t{self.temps}"
+
+    def checked(self, c_type, helper, *operands):
+        """
+        Calls a helper that takes the operands and a pointer to its result
+        and returns nonzero to bail out.
+        """
+        temp = self.temp()
+        arguments = "".join(f"{operand}, " for operand in operands)
+        return f"({{ {c_type} {temp}; if ({helper}({arguments}&{temp})) goto tpy_bail; {temp}; }})"
+
+    # Statements
+
+    def block(self, statements, defined, out, level):
+        """
+        Appends the C for statements to out. defined holds the locals bound
+        at this point on every path; returns the names bound after the
+        block, or None when every path through it returns.
+        """
+        defined = set(defined)
+        indent = "    " * level
+        for statement in statements:
+            kind = type(statement)
+            if kind is ast.Return:
+                if statement.value is None:
+                    raise NotNative("bare return")
+                value_type, code = self.expression(statement.value, defined)
+                if value_type != self.return_type:
+                    raise NotNative("return type")
+                out.append(f"{indent}*tpy_result = {code};")
+                out.append(f"{indent}goto tpy_done;")
+                return None
+            if kind is ast.Assign:
+                if len(statement.targets) != 1:
+                    raise NotNative("chained assignment")
+                self.assign(statement.targets[0], statement.value, defined, out, indent)
+            elif kind is ast.AugAssign:
+                self.augmented_assign(statement, defined, out, indent)
+            elif kind is ast.Expr:
+                _, code = self.expression(statement.value, defined)
+                out.append(f"{indent}(void)({code});")
+            elif kind is ast.If:
+                _, test = self.truth(statement.test, defined)
+                out.append(f"{indent}if ({test}) {{")
+                after_body = self.block(statement.body, defined, out, level + 1)
+                out.append(f"{indent}}} else {{")
+                after_else = self.block(statement.orelse, defined, out, level + 1)
+                out.append(f"{indent}}}")
+                if after_body is None and after_else is None:
+                    return None
+                if after_body is None or after_else is None:
+                    defined = after_else if after_body is None else after_body
+                else:
+                    defined = after_body & after_else
+            elif kind is ast.While:
+                if statement.orelse:
+                    raise NotNative("while-else")
+                _, test = self.truth(statement.test, defined)
+                out.append(f"{indent}while ({test}) {{")
+                out.append(f"{indent}    TPY_TICK()")
+                self.block(statement.body, defined, out, level + 1)
+                out.append(f"{indent}}}")
+            elif kind is ast.For:
+                self.range_loop(statement, defined, out, level)
+            elif kind is not ast.Pass:
+                raise NotNative(kind.__name__)
+        return defined
+
+    def assign(self, target, value, defined, out, indent):
+        if type(target) is ast.Subscript:
+            array, index = self.element(target, defined)
+            value_type, code = self.expression(value, defined)
+            if value_type != self.types[target.value.id][1]:
+                raise NotNative("element type")
+            out.append(f"{indent}{{ {NATIVE_TYPES[value_type]} _v = {code}; {array}[{index}] = _v; }}")
+            return
+        if type(target) is not ast.Name:
+            raise NotNative("assignment target")
+        name = target.id
+        if type(value) is ast.Constant and value.value is None:
+            # `int x;` declares x without a value; it must be assigned before use
+            defined.discard(name)
+            return
+        new_list = self.list_value(value, defined)
+        if new_list is not None:
+            element_type, code = new_list
+            self.bind(name, ("list", element_type))
+            c_type = NATIVE_TYPES[element_type]
+            out.append(f"{indent}{{ {c_type} *_p; int64_t _n; {code}")
+            out.append(f"{indent}  free(v_{name}); v_{name} = _p; n_{name} = _n; }}")
+        else:
+            value_type, code = self.expression(value, defined)
+            self.bind(name, value_type)
+            out.append(f"{indent}v_{name} = {code};")
+        defined.add(name)
+
+    def bind(self, name, value_type):
+        if self.types.setdefault(name, value_type) != value_type:
+            raise NotNative(f"{name} changes type")
+
+    def list_value(self, value, defined):
+        """
+        For [x] * n and [a, b, ...], returns the element type and C code
+        that sets _p and _n to a fresh buffer and its length; None for
+        other values.
+        """
+        if type(value) is ast.BinOp and type(value.op) is ast.Mult and type(value.left) is ast.List:
+            if len(value.left.elts) != 1:
+                raise NotNative("repeated list")
+            element_type, fill = self.expression(value.left.elts[0], defined)
+            count_type, count = self.expression(value.right, defined)
+            if count_type == "float":
+                raise NotNative("list size")
+            c_type = NATIVE_TYPES[element_type]
+            return element_type, (
+                f"{c_type} _x = {fill}; _n = {count}; if (_n < 0) _n = 0; if (_n > TPY_MAX_ELEMENTS) goto tpy_bail; "
+                f"_p = malloc(_n ? _n * sizeof({c_type}) : 1); if (_p == NULL) goto tpy_bail; "
+                f"for (int64_t _i = 0; _i < _n; _i++) _p[_i] = _x;")
+        if type(value) is not ast.List:
+            return None
+        elements = [self.expression(element, defined) for element in value.elts]
+        if not elements or len({element_type for element_type, _ in elements}) != 1:
+            raise NotNative("list literal")
+        element_type = elements[0][0]
+        c_type = NATIVE_TYPES[element_type]
+        stores = " ".join(f"_p[{i}] = {code};" for i, (_, code) in enumerate(elements))
+        return element_type, (f"_n = {len(elements)}; _p = malloc(_n * sizeof({c_type})); "
+                              f"if (_p == NULL) goto tpy_bail; {stores}")
+
+    def augmented_assign(self, statement, defined, out, indent):
+        target = statement.target
+        right = self.expression(statement.value, defined)
+        if type(target) is ast.Name:
+            if target.id not in defined or type(self.types[target.id]) is tuple:
+                raise NotNative("augmented assignment")
+            target_type = self.types[target.id]
+            value_type, code = self.binary(statement.op, (target_type, f"v_{target.id}"), right)
+            if value_type != target_type:
+                raise NotNative(f"{target.id} changes type")
+            out.append(f"{indent}v_{target.id} = {code};")
+            return
+        if type(target) is not ast.Subscript:
+            raise NotNative("augmented assignment target")
+        array, index = self.element(target, defined)
+        element_type = self.types[target.value.id][1]
+        value_type, code = self.binary(statement.op, (element_type, f"{array}[_k]"), right)
+        if value_type != element_type:
+            raise NotNative("element type")
+        out.append(f"{indent}{{ int64_t _k = {index}; {array}[_k] = {code}; }}")
+
+    def range_loop(self, statement, defined, out, level):
+        indent = "    " * level
+        target, call = statement.target, statement.iter
+        if (statement.orelse or type(target) is not ast.Name or type(call) is not ast.Call
+                or type(call.func) is not ast.Name or call.func.id != "range" or call.keywords
+                or not 1 <= len(call.args) <= 3 or "range" in self.locals or "range" in self.module_names):
+            raise NotNative("for loop")
+        bounds = []
+        for arg in call.args:
+            arg_type, code = self.expression(arg, defined)
+            if arg_type == "float":
+                raise NotNative("range of float")
+            bounds.append(code)
+        if len(bounds) == 1:
+            bounds.insert(0, "0")
+        if len(bounds) == 2:
+            bounds.append("1")
+        self.bind(target.id, "int")
+        # A hidden counter drives the loop, so assigning to the loop
+        # variable in the body does not change the iteration, as in Python
+        out.append(f"{indent}{{")
+        out.append(f"{indent}    int64_t _start = {bounds[0]}, _stop = {bounds[1]}, _step = {bounds[2]};")
+        out.append(f"{indent}    if (_step == 0) goto tpy_bail;")
+        out.append(f"{indent}    for (int64_t _k = _start; _step > 0 ? _k < _stop : _k > _stop; ) {{")
+        out.append(f"{indent}        v_{target.id} = _k;")
+        out.append(f"{indent}        TPY_TICK()")
+        self.block(statement.body, defined | {target.id}, out, level + 2)
+        out.append(f"{indent}        if (__builtin_add_overflow(_k, _step, &_k)) break;")
+        out.append(f"{indent}    }}")
+        out.append(f"{indent}}}")
+
+    # Expressions
+
+    def expression(self, node, defined):
+        """
+        Returns (type, C code) for an expression of int, float or bool type.
+        """
+        kind = type(node)
+        if kind is ast.Constant:
+            value = node.value
+            if value is True or value is False:
+                return "bool", str(int(value))
+            if type(value) is int and INT64_MIN < value <= INT64_MAX:
+                return "int", f"INT64_C({value})"
+            if type(value) is float and math.isfinite(value):
+                return "float", value.hex()
+            raise NotNative("constant")
+        if kind is ast.Name:
+            if node.id not in defined or type(self.types[node.id]) is tuple:
+                raise NotNative(f"name {node.id}")
+            return self.types[node.id], f"v_{node.id}"
+        if kind is ast.BinOp:
+            return self.binary(node.op, self.expression(node.left, defined), self.expression(node.right, defined))
+        if kind is ast.UnaryOp:
+            return self.unary(node.op, self.expression(node.operand, defined))
+        if kind is ast.BoolOp:
+            values = [self.expression(value, defined) for value in node.values]
+            if any(value_type != "bool" for value_type, _ in values):
+                raise NotNative("and/or of non-bools")
+            joiner = " && " if type(node.op) is ast.And else " || "
+            return "bool", "(" + joiner.join(code for _, code in values) + ")"
+        if kind is ast.Compare:
+            if len(node.ops) != 1 or type(node.ops[0]) not in C_OPERATORS:
+                raise NotNative("comparison")
+            return self.compare(node.ops[0], self.expression(node.left, defined),
+                                self.expression(node.comparators[0], defined))
+        if kind is ast.Subscript:
+            array, index = self.element(node, defined)
+            return self.types[node.value.id][1], f"{array}[{index}]"
+        if kind is ast.Call:
+            return self.call(node, defined)
+        raise NotNative(kind.__name__)
+
+    def truth(self, node, defined):
+        value_type, code = self.expression(node, defined)
+        if value_type == "bool":
+            return "bool", code
+        return "bool", f"(({code}) != 0)"
+
+    def element(self, node, defined):
+        """
+        Returns the C array and checked index for a[i]; negative indexes
+        count from the end and out-of-range ones bail out, as IndexError.
+        """
+        array = node.value
+        if (type(array) is not ast.Name or array.id not in defined
+                or type(self.types[array.id]) is not tuple):
+            raise NotNative("subscript")
+        index_type, index = self.expression(node.slice, defined)
+        if index_type == "float":
+            raise NotNative("float index")
+        temp = self.temp()
+        return f"v_{array.id}", (f"({{ int64_t {temp} = {index}; if ({temp} < 0) {temp} += n_{array.id}; "
+                                 f"if ({temp} < 0 || {temp} >= n_{array.id}) goto tpy_bail; {temp}; }})")
+
+    def binary(self, op, left, right):
+        (left_type, a), (right_type, b) = left, right
+        kind = type(op)
+        if kind in (ast.BitAnd, ast.BitOr, ast.BitXor):
+            if "float" in (left_type, right_type):
+                raise NotNative("bitwise float")
+            result_type = "bool" if left_type == right_type == "bool" else "int"
+            return result_type, f"({self.as_int(left)} {C_OPERATORS[kind]} {self.as_int(right)})"
+        if "float" in (left_type, right_type):
+            a, b = self.as_float(left), self.as_float(right)
+            if kind in (ast.Add, ast.Sub, ast.Mult):
+                return "float", f"({a} {C_OPERATORS[kind]} {b})"
+            if kind is ast.Div:
+                return "float", self.checked("double", "tpy_float_div", a, b)
+            raise NotNative(f"float {kind.__name__}")
+        a, b = self.as_int(left), self.as_int(right)
+        if kind is ast.Div:
+            return "float", self.checked("double", "tpy_int_div", a, b)
+        if kind not in CHECKED_INT_OPERATIONS:
+            raise NotNative(kind.__name__)
+        return "int", self.checked("int64_t", CHECKED_INT_OPERATIONS[kind], a, b)
+
+    def unary(self, op, operand):
+        operand_type, code = operand
+        kind = type(op)
+        if kind is ast.Not:
+            truth = code if operand_type == "bool" else f"(({code}) != 0)"
+            return "bool", f"(!{truth})"
+        if operand_type == "float":
+            if kind is ast.USub:
+                return "float", f"(-{code})"
+            if kind is ast.UAdd:
+                return "float", code
+            raise NotNative("~ of float")
+        if kind is ast.USub:
+            return "int", self.checked("int64_t", "__builtin_sub_overflow", "(int64_t)0", self.as_int(operand))
+        if kind is ast.UAdd:
+            return "int", self.as_int(operand)
+        return "int", f"(~{self.as_int(operand)})"
+
+    def compare(self, op, left, right):
+        operator = C_OPERATORS[type(op)]
+        if (left[0] == "float") == (right[0] == "float"):
+            return "bool", f"({left[1]} {operator} {right[1]})"
+        # Python compares ints with floats exactly; only small ints convert exactly
+        a, b = (self.exact_float(side) if side[0] != "float" else side[1] for side in (left, right))
+        return "bool", f"({a} {operator} {b})"
+
+    def exact_float(self, operand):
+        temp = self.temp()
+        return (f"({{ int64_t {temp} = {self.as_int(operand)}; "
+                f"if ({temp} > TPY_EXACT_LIMIT || {temp} < -TPY_EXACT_LIMIT) goto tpy_bail; (double){temp}; }})")
+
+    def call(self, node, defined):
+        if type(node.func) is not ast.Name or node.keywords:
+            raise NotNative("call")
+        name = node.func.id
+        if name in self.locals:
+            raise NotNative(f"call of local {name}")
+        args = [self.expression(arg, defined) for arg in node.args]
+        if name in self.signatures:
+            params, return_type = self.signatures[name]
+            if [arg_type for arg_type, _ in args] != [param_type for _, param_type in params]:
+                raise NotNative(f"arguments of {name}")
+            self.calls.add(name)
+            temp, status = self.temp(), self.temp()
+            arguments = "".join(f"{code}, " for _, code in args)
+            return return_type, (f"({{ {NATIVE_TYPES[return_type]} {temp}; int {status}; "
+                                 f"if (depth <= 0) goto tpy_bail; "
+                                 f"{status} = nf_{name}(depth - 1, {arguments}&{temp}); "
+                                 f"if ({status} < 0) goto tpy_error; if ({status}) goto tpy_bail; {temp}; }})")
+        if name not in NATIVE_BUILTINS or name in self.module_names:
+            raise NotNative(f"call of {name}")
+        if name in ("min", "max"):
+            if len(args) != 2 or args[0][0] != args[1][0]:
+                raise NotNative(name)
+            # Python keeps the first argument unless the second is strictly better
+            value_type, c_type = args[0][0], NATIVE_TYPES[args[0][0]]
+            a, b = self.temp(), self.temp()
+            operator = "<" if name == "min" else ">"
+            return value_type, (f"({{ {c_type} {a} = {args[0][1]}; {c_type} {b} = {args[1][1]}; "
+                                f"{b} {operator} {a} ? {b} : {a}; }})")
+        if len(args) != 1:
+            raise NotNative(name)
+        value_type, code = args[0]
+        if name == "float":
+            return "float", self.as_float(args[0])
+        if name == "int":
+            if value_type == "float":
+                return "int", self.checked("int64_t", "tpy_float_to_int", code)
+            return "int", self.as_int(args[0])
+        if value_type == "float":
+            return "float", f"fabs({code})"
+        temp = self.temp()
+        return "int", (f"({{ int64_t {temp} = {self.as_int(args[0])}; if ({temp} == INT64_MIN) goto tpy_bail; "
+                       f"{temp} < 0 ? -{temp} : {temp}; }})")
+
+    @staticmethod
+    def as_int(operand):
+        return f"((int64_t){operand[1]})" if operand[0] == "bool" else operand[1]
+
+    @staticmethod
+    def as_float(operand):
+        return operand[1] if operand[0] == "float" else f"((double){operand[1]})"
+
+def fingerprint(python_code):
+    return hashlib.sha1(f"{NATIVE_VERSION}\n{python_code}".encode()).hexdigest()[:16]
+
+def compile_extension(c_path, module_path):
+    """
+    Builds a C file into an extension module with the local compiler ($CC,
+    default gcc). Returns None on success, else the compiler's complaint.
+    """
+    command = [os.environ.get("CC", "gcc"), *CFLAGS, "-I", sysconfig.get_paths()["include"], c_path,
+               "-o", module_path]
+    if sys.platform == "darwin":
+        command += ["-undefined", "dynamic_lookup"]
+    elif sys.platform == "win32":
+        version = f"{sys.version_info.major}{sys.version_info.minor}"
+        command += [f"-L{os.path.join(sys.base_prefix, 'libs')}", f"-lpython{version}"]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True)
+    except OSError as e:
+        return str(e)
+    if result.returncode:
+        return (result.stderr.strip() or f"{command[0]} exited with status {result.returncode}").splitlines()[0]
+    return None
+
+class NativeBuilder:
+    """
+    Collects the top-level functions of one output that may run as native
+    code and, on commit(), compiles those in the supported subset into an
+    extension module at path. The emitter adds a binding line after every
+    def with an int/float/bool signature as it goes; which functions are
+    actually native is only settled once the whole file is seen, and bind()
+    leaves the others as Python.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.functions = {}
+        self.binding_counts = {}
+        self.universal_names = set()
+
+    def record(self, node):
+        """
+        Counts the module-level names a top-level node binds (code outside
+        functions binds them however deeply it is nested) and notes the
+        names functions declare universal, which they may rebind at run time.
+        """
+        if type(node) is FunctionDef:
+            self.count(node.name)
+            for child in walk(node):
+                if type(child) is Global:
+                    self.universal_names.update(IDENTIFIER_PATTERN.findall(child.source))
+            return
+        for child in walk(node):
+            child_type = type(child)
+            if child_type in (VarDeclaration, ArrayDeclaration, DictDeclaration):
+                self.count(child.name)
+            elif child_type is Statement or child_type is Constant:
+                source = child.expression.source if child_type is Statement else child.declaration.source
+                match = ASSIGNED_NAME_PATTERN.match(source)
+                if match:
+                    self.count(match.group(1))
+            elif child_type is Input and child.index is None:
+                self.count(child.target)
+            elif child_type is ForRange:
+                self.count(child.var)
+            elif child_type is ForEachLoop:
+                self.count(child.item)
+            elif child_type is ForDictLoop:
+                self.count(child.key)
+                self.count(child.value)
+
+    def count(self, name):
+        self.binding_counts[name] = self.binding_counts.get(name, 0) + 1
+
+    def add_function(self, node, lines):
+        """
+        Takes the Python lines of a top-level def; returns the line that
+        binds it to its native twin, or None when its signature rules it out.
+        """
+        if not is_native_signature(node):
+            return None
+        code = "\n".join(lines)
+        key = fingerprint(code)
+        self.functions[node.name] = (node, code, key)
+        return f'{node.name} = _tpy_native_bind({node.name}, "{node.name}", "{key}")'
+
+    def translate(self):
+        """
+        Returns {name: (C definition, fingerprint, translator)} for the
+        functions in the native subset whose callees are all native too.
+        """
+        module_names = set(self.binding_counts) | self.universal_names
+        # The module's own bind() takes that name
+        names = [name for name in self.functions if self.binding_counts.get(name) == 1
+                 and name not in self.universal_names and name != "bind"]
+        signatures = {}
+        for name in names:
+            node = self.functions[name][0]
+            signatures[name] = ([(param.name, param.param_type) for param in node.params], node.return_type)
+
+        translated = {}
+        for name in names:
+            node, code, key = self.functions[name]
+            params, return_type = signatures[name]
+            translator = FunctionTranslator(name, params, return_type, signatures, module_names)
+            try:
+                tree = ast.parse(code).body
+                if len(tree) != 1 or type(tree[0]) is not ast.FunctionDef:
+                    continue
+                translated[name] = (translator.translate(tree[0]), key, translator)
+            except (NotNative, SyntaxError, RecursionError):
+                continue
+
+        # Calls between native functions skip Python, so a function only
+        # stays native while everything it calls does
+        changed = True
+        while changed:
+            changed = False
+            for name in list(translated):
+                if not translated[name][2].calls <= translated.keys():
+                    del translated[name]
+                    changed = True
+        return translated
+
+    def module_source(self, translated):
+        names = list(translated)
+        prototypes = [f"static int nf_{name}({translated[name][2].signature()});" for name in names]
+        wrappers = []
+        methods = []
+        for index, name in enumerate(names):
+            translator = translated[name][2]
+            declarations = "".join(f"    {NATIVE_TYPES[param_type]} a{i};\n"
+                                   for i, (_, param_type) in enumerate(translator.params))
+            conversions = "".join(f"    if ({ARGUMENT_CONVERSIONS[param_type]}(args[{i}], &a{i}))\n        goto fallback;\n"
+                                  for i, (_, param_type) in enumerate(translator.params))
+            wrappers.append(C_WRAPPER_TEMPLATE.format(
+                name=name, declarations=declarations, result_type=NATIVE_TYPES[translator.return_type],
+                arity=len(translator.params), conversions=conversions,
+                budget="tpy_depth_budget(), " if translator.calls else "0, ",
+                arguments="".join(f"a{i}, " for i in range(len(translator.params))),
+                convert=RESULT_CONVERSIONS[translator.return_type], index=index))
+            methods.append(f'    {{"{name}", (PyCFunction)(void (*)(void))nw_{name}, METH_FASTCALL | METH_KEYWORDS, NULL}},')
+        module = C_MODULE_TEMPLATE.format(
+            count=len(names), names=", ".join(f'"{name}"' for name in names),
+            fingerprints=", ".join(f'"{translated[name][1]}"' for name in names),
+            wrappers="\n".join(wrappers), methods="\n".join(methods), module=NATIVE_MODULE)
+        return "\n\n".join([C_RUNTIME, "\n".join(prototypes), *(translated[name][0] for name in names), module])
+
+    def commit(self):
+        """
+        Builds the extension module and moves it into place; a module left
+        by an earlier run is removed when no function qualifies or the build
+        fails. Returns the names of the native functions.
+        """
+        translated = self.translate()
+        if not translated:
+            remove_native_module(self.path)
+            return []
+        built_path = self.path + ".tmp"
+        try:
+            with tempfile.TemporaryDirectory() as build_dir:
+                c_path = os.path.join(build_dir, NATIVE_MODULE + ".c")
+                with open(c_path, "w") as f:
+                    f.write(self.module_source(translated))
+                error = compile_extension(c_path, built_path)
+            if error is not None:
+                print(f"⚠️  Native build failed, functions stay in Python: {error}")
+                remove_native_module(self.path)
+                return []
+            # Replaced rather than overwritten, since a running program may have the old one loaded
+            os.replace(built_path, self.path)
+        finally:
+            if os.path.exists(built_path):
+                os.remove(built_path)
+        return list(translated)
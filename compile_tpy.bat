@@ -11,7 +11,7 @@ set full_dir=%~dp1
 set py_file=%full_dir%%base_name%.py
 
 echo Compiling %input_file% with tinypy compiler...
-python tinypy_compiler.py "%input_file%"
+python tinypy_compiler.py "%input_file%" --bytecode
 
 if errorlevel 1 (
     echo Error: Python compilation failed
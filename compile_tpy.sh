@@ -0,0 +1,40 @@
+#!/bin/sh
+# Linux/macOS counterpart of compile_tpy.bat: transpiles a .tpy file, builds
+# the runner from main.c and runs the program. The .pyc written next to the
+# .py lets the runner skip compiling the source on every launch.
+if [ -z "$1" ]; then
+    echo "Usage: ./compile_tpy.sh path/to/filename.tpy"
+    echo "Example: ./compile_tpy.sh hello.tpy"
+    exit 1
+fi
+
+input_file=$1
+base_name=$(basename "$input_file" .tpy)
+py_file="${input_file%.tpy}.py"
+# python3-config of the interpreter that runs the transpiler; set PYTHON to pick another
+PYTHON=${PYTHON:-python3}
+CC=${CC:-gcc}
+
+echo "Compiling $input_file with tinypy compiler..."
+if ! "$PYTHON" tinypy_compiler.py "$input_file" --bytecode; then
+    echo "Error: Python compilation failed"
+    exit 1
+fi
+
+echo "Compiling C code and linking..."
+python_config="$PYTHON-config"
+if ! command -v "$python_config" >/dev/null 2>&1; then
+    python_config=python3-config
+fi
+if ! $CC main.c $($python_config --includes) $($python_config --ldflags --embed) -o "$base_name"; then
+    echo "Error: GCC compilation failed"
+    exit 1
+fi
+
+echo "Successfully created $base_name"
+
+echo "Running $base_name with $py_file..."
+echo "================================"
+"./$base_name" "$py_file"
+echo "================================"
+echo "Program execution completed."
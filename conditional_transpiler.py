@@ -1,4 +1,4 @@
-import re
+from expression_transpiler import translate_expression
 
 def transpile_conditional(line):
     """
@@ -17,32 +17,10 @@ def transpile_conditional(line):
     
     # Apply conditional operator replacements to regular expressions
     original_line = line
-    line = replace_conditional_operators(line)
+    line = translate_expression(line)
     
     # Only return the modified line if changes were made
     if line != original_line:
         return line
     
-    return None
-
-def replace_conditional_operators(text):
-    """
-    Replace TinyPy conditional operators with Python equivalents.
-    """
-    # Replace boolean values
-    text = re.sub(r'\btrue\b', 'True', text)
-    text = re.sub(r'\bfalse\b', 'False', text)
-    
-    # Replace logical operators
-    text = re.sub(r'\&\&', ' and ', text)
-    text = re.sub(r'\|\|', ' or ', text)
-    text = re.sub(r'\!([^=])', r' not \1', text)  # ! but not !=
-    
-    # Replace comparison operators  
-    text = re.sub(r'\!\=', ' != ', text)
-    text = re.sub(r'\=\=', ' == ', text)
-    
-    # Clean up extra spaces
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    return text
\ No newline at end of file
+    return None
\ No newline at end of file
@@ -1,4 +1,20 @@
 import re
+from itertools import islice, repeat
+from operator import itemgetter
+from tinypy_ir import ArrayDeclaration, DictDeclaration
+from python_emitter import emit_line
+
+ARRAY_PATTERN = re.compile(r'^(int|bool|char|float|string|dyn)\s+(\w+)\[(\w+|\d+)\](\s*=\s*\{([^}]*)\})?$')
+DICT_PATTERN = re.compile(r'^dict\s+(\w+)\s*<(\w+)\s*,\s*(\w+)>\s*\[(\w+|\d+)\](\s*=\s*\{([^}]*)\})?$')
+# One initializer element: a run of text and quoted strings up to the next
+# comma outside quotes. A quote left open runs to the end of the text.
+ELEMENT_PATTERN = re.compile(r'(?:[^,"\']+|"[^"]*"?|\'[^\']*\'?)+')
+# A comma with the whitespace around it, and whitespace other than spaces
+SEPARATOR_PATTERN = re.compile(r'\s*,\s*')
+NON_SPACE_WHITESPACE_PATTERN = re.compile(r'[^\S ]')
+# Characters scanned, and elements built, per chunk of a long initializer
+SCAN_CHUNK_SIZE = 1 << 16
+ELEMENT_CHUNK_SIZE = 1 << 13
 
 def transpile_datastructure(line):
     """
@@ -26,35 +42,29 @@ def transpile_array(line):
     - int a[10] = {1,2,3,4,5,6,7,8,9,10};
     - dyn a[2] = {1,"S"};
     """
+    node = parse_array(line)
+    if node is None:
+        return None
+    return emit_line(node)
+
+def parse_array(line):
+    """
+    Parses an array declaration into an ArrayDeclaration node.
+    Returns None if the line is not one.
+    """
     
     # Pattern for array declaration with optional initialization
     # Matches: type name[size] or type name[size] = {values}
-    pattern = r'^(int|bool|char|float|string|dyn)\s+(\w+)\[(\w+|\d+)\](\s*=\s*\{([^}]*)\})?$'
-    match = re.match(pattern, line)
+    match = ARRAY_PATTERN.match(line)
     
     if match:
         array_type, var_name, size, assignment_part, values = match.groups()
         
         if assignment_part:  # Array with initialization
-            if values:
-                # Parse the values
-                value_list = parse_array_values(values, array_type)
-                return f"{var_name} = {value_list}"
-            else:
-                # Empty initialization
-                return f"{var_name} = []"
+            # Split by comma, handling quoted strings
+            return ArrayDeclaration(array_type, var_name, size, split_preserving_quotes(values))
         else:  # Array without initialization
-            if array_type == 'dyn':
-                # Dynamic array - just create empty list
-                return f"{var_name} = []"
-            else:
-                # Typed array - create list with default values based on size
-                default_value = get_default_value(array_type)
-                if size.isdigit():
-                    return f"{var_name} = [{default_value}] * {size}"
-                else:
-                    # Size is a variable
-                    return f"{var_name} = [{default_value}] * {size}"
+            return ArrayDeclaration(array_type, var_name, size, None)
     
     return None
 
@@ -63,164 +73,102 @@ def transpile_dictionary(line):
     Transpiles dictionary declarations.
     Format: dict var <key_type,value_type>[size] = { key : value, key : value }
     """
+    node = parse_dictionary(line)
+    if node is None:
+        return None
+    return emit_line(node)
+
+def parse_dictionary(line):
+    """
+    Parses a dictionary declaration into a DictDeclaration node.
+    Returns None if the line is not one.
+    """
     
     # Pattern for dictionary declaration
     # Matches: dict name <key_type,value_type>[size] = {key:value, key:value}
-    pattern = r'^dict\s+(\w+)\s*<(\w+)\s*,\s*(\w+)>\s*\[(\w+|\d+)\](\s*=\s*\{([^}]*)\})?$'
-    match = re.match(pattern, line)
+    match = DICT_PATTERN.match(line)
     
     if match:
         var_name, key_type, value_type, size, assignment_part, pairs = match.groups()
         
         if assignment_part:  # Dictionary with initialization
-            if pairs:
-                # Parse the key-value pairs
-                dict_content = parse_dict_pairs(pairs, key_type, value_type)
-                return f"{var_name} = {dict_content}"
-            else:
-                # Empty initialization
-                return f"{var_name} = {{}}"
+            # Split by comma, then by colon to get key and value; the
+            # elements are already stripped on the outside
+            key_values = []
+            for parts in iter_element_chunks(pairs):
+                key_values.extend((key_part.rstrip(), value_part.lstrip())
+                                  for key_part, colon, value_part in map(str.partition, parts, repeat(':'))
+                                  if colon)
+            return DictDeclaration(var_name, key_type, value_type, size, key_values)
         else:  # Dictionary without initialization
-            return f"{var_name} = {{}}"
+            return DictDeclaration(var_name, key_type, value_type, size, None)
     
     return None
 
-def parse_array_values(values_str, array_type):
-    """
-    Parse array values from string format to Python list format.
-    """
-    values = []
-    
-    # Split by comma, handling quoted strings
-    parts = split_preserving_quotes(values_str)
-    
-    for part in parts:
-        part = part.strip()
-        if not part:
-            continue
-        
-        # Convert value based on array type
-        if array_type == 'dyn':
-            # Dynamic type - keep as is but handle strings and booleans
-            values.append(convert_value(part))
-        elif array_type == 'string':
-            # String array - ensure all values are strings
-            if not (part.startswith('"') and part.endswith('"')):
-                part = f'"{part}"'
-            values.append(part)
-        elif array_type == 'bool':
-            # Boolean array
-            if part.lower() == 'true':
-                values.append('True')
-            elif part.lower() == 'false':
-                values.append('False')
-            else:
-                values.append(part)
-        else:
-            # Numeric types (int, float, char)
-            values.append(part)
-    
-    return '[' + ', '.join(values) + ']'
-
-def parse_dict_pairs(pairs_str, key_type, value_type):
-    """
-    Parse dictionary key-value pairs from string format to Python dict format.
-    """
-    pairs = {}
-    
-    # Split by comma, handling quoted strings and nested structures
-    parts = split_preserving_quotes(pairs_str)
-    
-    for part in parts:
-        part = part.strip()
-        if not part:
-            continue
-        
-        # Split by colon to get key and value
-        if ':' in part:
-            key_part, value_part = part.split(':', 1)
-            key = convert_value(key_part.strip())
-            value = convert_value(value_part.strip())
-            pairs[key] = value
-    
-    # Format as Python dictionary
-    pair_strings = []
-    for key, value in pairs.items():
-        pair_strings.append(f"{key}: {value}")
-    
-    return '{' + ', '.join(pair_strings) + '}'
-
 def split_preserving_quotes(text):
     """
     Split text by comma while preserving quoted strings.
+    Elements are stripped and blank ones dropped.
     """
-    parts = []
-    current = ""
-    in_quotes = False
-    quote_char = None
-    
-    for char in text:
-        if char in ['"', "'"] and not in_quotes:
-            in_quotes = True
-            quote_char = char
-            current += char
-        elif char == quote_char and in_quotes:
-            in_quotes = False
-            quote_char = None
-            current += char
-        elif char == ',' and not in_quotes:
-            if current.strip():
-                parts.append(current.strip())
-            current = ""
-        else:
-            current += char
-    
-    if current.strip():
-        parts.append(current.strip())
-    
+    chunks = iter_element_chunks(text)
+    parts = next(chunks, [])
+    for chunk in chunks:
+        parts.extend(chunk)
     return parts
 
-def convert_value(value_str):
-    """
-    Convert a string value to appropriate Python representation.
-    """
-    value_str = value_str.strip()
-    
-    # Handle boolean values
-    if value_str.lower() == 'true':
-        return 'True'
-    elif value_str.lower() == 'false':
-        return 'False'
-    
-    # Handle string literals (keep quotes)
-    if (value_str.startswith('"') and value_str.endswith('"')) or \
-       (value_str.startswith("'") and value_str.endswith("'")):
-        return value_str
-    
-    # Handle numeric values
-    if value_str.isdigit() or (value_str.startswith('-') and value_str[1:].isdigit()):
-        return value_str
-    
-    # Handle float values
-    try:
-        float(value_str)
-        return value_str
-    except ValueError:
-        pass
-    
-    # Default: treat as variable name or string
-    return value_str
+def iter_element_chunks(text):
+    """
+    Yields the elements of split_preserving_quotes a list at a time, so a
+    caller that turns them into something else never holds all of them.
+    Every comma separates elements unless one sits inside quotes, so the
+    text is only scanned element by element when that may happen.
+    """
+    double, single = '"' in text, "'" in text
+    if not (double or single) or (double != single and not has_quoted_comma(text, '"' if double else "'")):
+        # Chunks end at a comma, so each one splits on its own
+        start = 0
+        while start < len(text):
+            end = text.find(',', start + SCAN_CHUNK_SIZE)
+            if end < 0:
+                end = len(text)
+            yield split_commas(text[start:end])
+            start = end + 1
+        return
+    # Matches are stripped as they are found
+    parts = (part for part in map(str.strip, map(itemgetter(0), ELEMENT_PATTERN.finditer(text))) if part)
+    while True:
+        chunk = list(islice(parts, ELEMENT_CHUNK_SIZE))
+        if not chunk:
+            return
+        yield chunk
 
-def get_default_value(data_type):
-    """
-    Get default value for a given data type.
-    """
-    defaults = {
-        'int': '0',
-        'float': '0.0',
-        'bool': 'False',
-        'char': "''",
-        'string': '""',
-        'dyn': 'None'
-    }
-    return defaults.get(data_type, 'None')
\ No newline at end of file
+def has_quoted_comma(text, quote):
+    """
+    Tells whether a comma sits inside quotes in text that holds a single
+    kind of quote, where every other piece between quotes is quoted.
+    Scans in chunks so only a chunk's pieces are held at a time.
+    """
+    inside = False
+    for start in range(0, len(text), SCAN_CHUNK_SIZE):
+        pieces = text[start:start + SCAN_CHUNK_SIZE].split(quote)
+        if ',' in ''.join(pieces[0 if inside else 1::2]):
+            return True
+        inside = inside != (len(pieces) % 2 == 0)
+    return False
+
+def split_commas(text):
+    """
+    Splits text at every comma into stripped, non-blank elements, building
+    a single list. Text written as "a, b, c" or "a,b,c" is split as is;
+    other spacing is stripped by the split itself.
+    """
+    text = text.strip()
+    spaces = text.count(' ')
+    if (spaces == text.count(', ') and spaces in (0, text.count(','))
+            and not NON_SPACE_WHITESPACE_PATTERN.search(text)):
+        parts = text.split(', ' if spaces else ',')
+    else:
+        parts = SEPARATOR_PATTERN.split(text)
+    if '' in parts:
+        parts = [part for part in parts if part]
+    return parts
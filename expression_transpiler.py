@@ -0,0 +1,51 @@
+import re
+
+# A lone ! only counts as `not` when something other than = follows it
+OPERATOR = r'(?:&&|\|\||!=|==|!(?=[^=]))'
+OPERATOR_PATTERN = re.compile(r'&&|\|\||!=|==|!')
+
+# One pattern covers everything the expression rewrite touches. String
+# literals are matched first so nothing inside quotes is rewritten; runs of
+# adjacent operators swallow the whitespace around them so the result needs
+# no separate clean-up pass; single spaces are left alone to avoid callbacks.
+# The leading lookahead lets the scanner skip ordinary characters without
+# trying every alternative at each position.
+EXPRESSION_PATTERN = re.compile(
+    r'(?=[\s"\'&|!=tf])(?:'
+    r'(?P<string>"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')'
+    r'|(?P<operators>\s*' + OPERATOR + r'(?:\s*' + OPERATOR + r')*\s*)'
+    r'|(?P<boolean>(?<!\w)(?:true|false)(?!\w))'
+    r'|(?P<space>\s{2,}|[^\S ])'
+    r')'
+)
+
+OPERATORS = {
+    "&&": "and",
+    "||": "or",
+    "!=": "!=",
+    "==": "==",
+    "!": "not",
+}
+
+BOOLEANS = {
+    "true": "True",
+    "false": "False",
+}
+
+def replace_token(match):
+    kind = match.lastgroup
+    if kind == "operators":
+        return " " + " ".join([OPERATORS[op] for op in OPERATOR_PATTERN.findall(match.group())]) + " "
+    if kind == "boolean":
+        return BOOLEANS[match.group()]
+    if kind == "space":
+        return " "
+    return match.group()
+
+def translate_expression(text):
+    """
+    Translates a TinyPy expression to Python in a single pass:
+    true/false, &&, ||, !, != and == are rewritten, whitespace outside
+    string literals is collapsed, and quoted literals are left untouched.
+    """
+    return EXPRESSION_PATTERN.sub(replace_token, text).strip()
@@ -1,147 +1,602 @@
 import os
 import re
-from line_transpiler import transpile_line
-from function_transpiler import FUNC_DEF_PATTERN
-from conditional_transpiler import replace_conditional_operators
+import shutil
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+import line_cache
+import transpile_options
+import transpile_stats
+from line_transpiler import parse_line, PARSE_TABLE, GENERIC_PARSERS
+from python_emitter import PythonEmitter, prelude
+from sidecar_data import SidecarWriter, sidecar_path
+from c_backend import NativeBuilder, native_module_path
+from source_map import source_map_path, write_source_map
+from bytecode_output import write_bytecode
+from tinypy_ir import Module, Expr, Block, If, Else, BLOCK_NODES
+from tinypy_lexer import (tokenize, THEREBE, ALAS, IF_CLOSE, ELSE_IF_CLOSE, IF, ELSE_IF,
+                          FUNC_DEF, CLOSE, CONDITION_KINDS)
 
-def find_matching_condition(lines, start_index):
-    brace_count = 1
-    i = start_index + 1
+IF_CLOSE_PATTERN = re.compile(r'^}if\s*\(\s*(.+)\s*\)$')
+ELSE_IF_CLOSE_PATTERN = re.compile(r'^}else\s+if\s*\(\s*(.+)\s*\)$')
 
-    while i < len(lines) and brace_count > 0:
-        line = lines[i].strip()
+OUTPUT_BUFFER_SIZE = 1 << 16
 
-        if line.startswith("}if(") or line.startswith("}else if(") or line.startswith("alas{"):
-            return i, line
-        elif line == "}":
-            brace_count -= 1
-            if brace_count == 0 and i + 1 < len(lines):
-                next_line = lines[i + 1].strip()
-                if next_line.startswith("if(") or next_line.startswith("else if("):
-                    return i + 1, next_line
-        elif line.endswith("{"):
-            brace_count += 1
+# Files smaller than this are transpiled serially: below it, starting
+# worker processes costs more than splitting the file saves
+PARALLEL_MIN_BYTES = 1 << 20
+# Tokens per chunk handed to a worker; a chunk only ends at a split point
+CHUNK_TOKENS = 1 << 14
+# Chunks queued per worker, so chunks of uneven cost still balance while
+# the tokens and results held at once stay bounded
+CHUNKS_IN_FLIGHT = 2
 
-        i += 1
+class BlockIndexer:
+    """
+    Incrementally builds the block index as tokens are fed in order.
+    Maps every thereBe{ to the token holding its condition (}if(, }else if(,
+    alas{ or an if( line after its closing brace) and every alas{ to its
+    closing brace. Openers without a match are left out. Only scans that are
+    still open are kept, so its state grows with nesting depth, not input size.
+    """
 
-    return None, None
+    def __init__(self):
+        self.block_index = {}
+        self.unsettled = set()
+        self.count = 0
+        self.depth = 0
+        self.pending_blocks = []  # (thereBe index, depth at which its brace closes)
+        self.pending_alas = []
+        self.awaiting_next = []   # thereBe indices whose brace closed on the previous token
 
-def transpile_file(input_path, output_path=None):
-    if output_path is None:
-        output_path = os.path.splitext(input_path)[0] + ".py"
+    def feed(self, kind, line):
+        i = self.count
+        self.count += 1
+
+        # A thereBe closed by a bare brace matches only if this token is if( / else if(
+        for start_index in self.awaiting_next:
+            if kind == IF or kind == ELSE_IF:
+                self.block_index[start_index] = i
+            self.unsettled.discard(start_index)
+        self.awaiting_next = []
+
+        if kind == IF_CLOSE or kind == ELSE_IF_CLOSE or kind == ALAS:
+            # The first condition token closes every open thereBe scan
+            for start_index, _ in self.pending_blocks:
+                self.block_index[start_index] = i
+                self.unsettled.discard(start_index)
+            self.pending_blocks = []
+            if kind == ALAS:
+                self.pending_alas.append(i)
+                self.unsettled.add(i)
+            return
+
+        if kind == CLOSE:
+            for start_index in self.pending_alas:
+                self.block_index[start_index] = i
+                self.unsettled.discard(start_index)
+            self.pending_alas = []
+
+            self.depth -= 1
+            while self.pending_blocks and self.pending_blocks[-1][1] == self.depth:
+                self.awaiting_next.append(self.pending_blocks.pop()[0])
+            return
+
+        if line.endswith("{"):
+            self.depth += 1
+
+        if kind == THEREBE:
+            self.pending_blocks.append((i, self.depth - 1))
+            self.unsettled.add(i)
+
+    def finish(self):
+        """
+        Marks the end of input: every scan still open has no match.
+        """
+        self.unsettled.clear()
+        self.pending_blocks = []
+        self.pending_alas = []
+        self.awaiting_next = []
+
+def build_block_index(tokens):
+    """
+    Builds the block index for a tokenized file in a single pass.
+    """
+    indexer = BlockIndexer()
+    for kind, line in tokens:
+        indexer.feed(kind, line)
+    indexer.finish()
+    return indexer.block_index
+
+def parse_tokens(tokens, stats=None, flat=False):
+    """
+    Parses a token stream into IR, yielding every top-level node as soon as
+    it is complete. Tokens are pulled lazily; only the lookahead needed to
+    find the condition of an open thereBe{ or the end of an alas{ and the
+    top-level block being parsed are held in memory. With flat, every node
+    is instead yielded as a (depth, node) pair as soon as it is parsed, a
+    block at its header with an empty body and its children following one
+    level deeper, so not even the current block is held. When a TranspileStats
+    is given, reading, block matching and parsing are timed and every
+    construct parser call is counted. Repeated lines are parsed once per
+    process through the shared LineCache.
+    """
+    tokens = iter(tokens)
+    indexer = BlockIndexer()
+    block_index = indexer.block_index
+    window = deque()  # tokens from absolute index `base` onwards
+    base = 0
+    exhausted = False
 
-    with open(input_path, 'r') as f:
-        lines = f.readlines()
+    def pull():
+        nonlocal exhausted
+        if exhausted:
+            return False
+        if stats is None:
+            token = next(tokens, None)
+        else:
+            start = time.perf_counter()
+            token = next(tokens, None)
+            stats.add_phase("read", time.perf_counter() - start)
+        if token is None:
+            exhausted = True
+            indexer.finish()
+            return False
+        if stats is None:
+            indexer.feed(*token)
+        else:
+            start = time.perf_counter()
+            indexer.feed(*token)
+            stats.add_phase("block_matching", time.perf_counter() - start)
+        window.append(token)
+        return True
 
-    output_lines = []
-    indent_level = 0
+    cache = line_cache.shared()
+    if stats is None:
+        def parse(line, index):
+            return parse_line(line, lineno=index + 1, cache=cache)
+    else:
+        timed_dispatch = {
+            keyword: tuple(stats.timed(parser.__name__, parser) for parser in parsers)
+            for keyword, parsers in PARSE_TABLE.items()
+        }
+        timed_generic = tuple(stats.timed(parser.__name__, parser) for parser in GENERIC_PARSERS)
+
+        def parse(line, index):
+            start = time.perf_counter()
+            node = parse_line(line, timed_dispatch, timed_generic, index + 1, cache)
+            elapsed = time.perf_counter() - start
+            stats.add_phase("parse", elapsed)
+            stats.record_line(index + 1, line, elapsed)
+            return node
+
+    def settle(index):
+        while index in indexer.unsettled and pull():
+            pass
+        return block_index.pop(index, None)
+
+    def parse_flat(first, stop):
+        # If and Else bodies are parsed line by line, without nesting
+        body = []
+        for j in range(first, stop):
+            block_line = window[j - base][1]
+            if block_line and block_line != "}":
+                node = parse(block_line, j)
+                if node is not None:
+                    body.append(node)
+        return body
+
+    open_blocks = []  # innermost last; open_blocks[0] is the top-level block
     i = 0
 
-    while i < len(lines):
-        line = lines[i].strip()
-
-        # Handle thereBe{ ... }if(...) and }else if(...) and alas{
-        if line.startswith("thereBe{"):
-            condition_index, condition_line = find_matching_condition(lines, i)
-
-            if condition_index is not None and condition_line:
-                block_lines = []
-                j = i + 1
-                while j < condition_index:
-                    current_line = lines[j].strip()
-                    if current_line and current_line != "}":
-                        block_lines.append(lines[j])
-                    j += 1
-
-                if condition_line.startswith("}if("):
-                    match = re.match(r'^}if\s*\(\s*(.+)\s*\)$', condition_line)
-                    if match:
-                        condition = replace_conditional_operators(match.group(1))
-                        output_lines.append("    " * indent_level + f"if {condition}:")
-                        indent_level += 1
-                        for block_line in block_lines:
-                            py_line = transpile_line(block_line)
-                            if py_line:
-                                output_lines.append("    " * indent_level + py_line)
-                        indent_level -= 1
-                        i = condition_index + 1
-                        continue
-
-                elif condition_line.startswith("}else if("):
-                    match = re.match(r'^}else\s+if\s*\(\s*(.+)\s*\)$', condition_line)
-                    if match:
-                        condition = replace_conditional_operators(match.group(1))
-                        output_lines.append("    " * indent_level + f"elif {condition}:")
-                        indent_level += 1
-                        for block_line in block_lines:
-                            py_line = transpile_line(block_line)
-                            if py_line:
-                                output_lines.append("    " * indent_level + py_line)
-                        indent_level -= 1
-                        i = condition_index + 1
-                        continue
+    while True:
+        # Drop consumed tokens and make token i available
+        while base < i and window:
+            window.popleft()
+            block_index.pop(base, None)
+            base += 1
+        if not window and not pull():
+            break
+        kind, line = window[0]
 
-            i += 1
-            continue
+        # Handle thereBe{ ... }if(...) and }else if(...)
+        if kind == THEREBE:
+            condition_index = settle(i)
+            match = None
+            if condition_index is not None:
+                condition_kind, condition_line = window[condition_index - base]
+                if condition_kind == IF_CLOSE:
+                    match = IF_CLOSE_PATTERN.match(condition_line)
+                elif condition_kind == ELSE_IF_CLOSE:
+                    match = ELSE_IF_CLOSE_PATTERN.match(condition_line)
 
-        # Handle alas{
-        if line.startswith("alas{"):
-            output_lines.append("    " * indent_level + "else:")
-            indent_level += 1
-            j = i + 1
-            while j < len(lines):
-                current_line = lines[j].strip()
-                if current_line == "}":
-                    indent_level -= 1
-                    i = j + 1
-                    break
-                py_line = transpile_line(lines[j])
-                if py_line:
-                    output_lines.append("    " * indent_level + py_line)
-                j += 1
-            continue
+            if match is None:
+                # No usable condition: only the thereBe{ line is dropped
+                i += 1
+                continue
+            node = If(Expr(match.group(1)), parse_flat(i + 1, condition_index),
+                      condition_kind == ELSE_IF_CLOSE, condition_index + 1)
+            i = condition_index + 1
 
-        # Handle function definitions
-        if re.match(FUNC_DEF_PATTERN, line):
-            output_lines.append("    " * indent_level + transpile_line(lines[i]))
-            indent_level += 1
-            i += 1
-            continue
+        # Handle alas{
+        elif kind == ALAS:
+            close_index = settle(i)
+            if close_index is None:
+                # No closing brace: the block runs to the end of the input
+                close_index = base + len(window)
+            node = Else(parse_flat(i + 1, close_index), i + 1)
+            i = close_index + 1
 
-        # Handle line ending with '{' (like loops or custom blocks)
-        if line.endswith("{"):
-            py_line = transpile_line(line)
-            if py_line:
-                output_lines.append("    " * indent_level + py_line)
-            indent_level += 1
+        # Handle function definitions and lines ending with '{' (like loops
+        # or custom blocks); their body is filled in until the closing brace
+        elif kind == FUNC_DEF or line.endswith("{"):
+            header = parse(line, i)
+            node = header if type(header) in BLOCK_NODES else Block(header, lineno=i + 1)
+            if flat:
+                yield len(open_blocks), node
+            elif open_blocks:
+                open_blocks[-1].body.append(node)
+            open_blocks.append(node)
             i += 1
             continue
 
         # Handle closing brace
-        if line == "}" and indent_level > 0:
-            indent_level -= 1
+        elif kind == CLOSE:
             i += 1
+            if open_blocks:
+                node = open_blocks.pop()
+                if not open_blocks and not flat:
+                    yield node
             continue
 
         # Skip redundant TinyPy-style condition tokens
-        if line.startswith("}if(") or line.startswith("}else if(") or line.startswith("if(") or line.startswith("else if("):
+        elif kind in CONDITION_KINDS:
             i += 1
             continue
 
         # Normal line
-        py_line = transpile_line(lines[i])
-        if py_line:
-            output_lines.append("    " * indent_level + py_line)
-        i += 1
+        else:
+            node = parse(line, i)
+            i += 1
+            if node is None:
+                continue
+
+        if flat:
+            yield len(open_blocks), node
+        elif open_blocks:
+            open_blocks[-1].body.append(node)
+        else:
+            yield node
+
+    # Blocks left open run to the end of the input
+    if open_blocks and not flat:
+        yield open_blocks[0]
+
+def transpile_tokens(tokens, stats=None, line_map=None, sidecar=None, native=None):
+    """
+    Transpiles a token stream, yielding indented Python lines as each line
+    is parsed. Passes that work on whole top-level nodes (optimization,
+    native functions, loop vectorization) make it wait for each node to be
+    complete, and localize_names or propagate_constants for the whole file.
+    When a TranspileStats is given, emitting is timed as well. When
+    line_map is a list, the TinyPy line of every yielded line is appended
+    to it (before the line is yielded). With sidecar_data, large
+    initializers are written to the sidecar, a SidecarWriter, if one is given;
+    with native_functions, top-level defs go to native, a NativeBuilder.
+    """
+    emitter = PythonEmitter(stats, sidecar, native)
+    if emitter.streams():
+        for depth, node in parse_tokens(tokens, stats, flat=True):
+            yield from emitter.emit(node, depth, line_map)
+        return
+    nodes = parse_tokens(tokens, stats)
+    if emitter.localizer is not None or transpile_options.get("propagate_constants"):
+        # Which globals any function writes, and which bricks are never
+        # rebound, is only known once the whole file is parsed
+        nodes = list(nodes)
+        if emitter.localizer is not None:
+            emitter.localizer.scan_module(nodes)
+        if emitter.optimizer is not None:
+            emitter.optimizer.scan_module(nodes)
+    for node in nodes:
+        yield from emitter.emit(node, 0, line_map)
+
+def split_pieces(tokens):
+    """
+    Cuts a token stream at the tokens a file can be cut at, so that every
+    piece transpiles to exactly the lines it does within the whole file:
+    top-level function definitions reached with no block open, where no
+    thereBe{ or alas{ before them is still looking for its condition or
+    closing brace. Yields every piece as a list of tokens once the next cut
+    (or the end of input) is reached. Follows the walk of parse_tokens
+    without parsing lines, and holds only the piece being scanned.
+    """
+    indexer = BlockIndexer()
+    block_index = indexer.block_index
+    piece = []
+    start = 0  # index of piece[0] in the stream
+    walk = 0   # next token the walk of parse_tokens reaches
+    depth = 0  # blocks open in parse_tokens
+    for i, (kind, line) in enumerate(tokens):
+        if (kind == FUNC_DEF and i
+                and not (indexer.pending_blocks or indexer.pending_alas or indexer.awaiting_next)):
+            # Every scan before this token is settled, so the walk can follow up to it
+            while walk < i:
+                walk_kind, walk_line = piece[walk - start]
+                if walk_kind == THEREBE:
+                    condition_index = block_index.get(walk)
+                    match = None
+                    if condition_index is not None:
+                        condition_kind, condition_line = piece[condition_index - start]
+                        if condition_kind == IF_CLOSE:
+                            match = IF_CLOSE_PATTERN.match(condition_line)
+                        elif condition_kind == ELSE_IF_CLOSE:
+                            match = ELSE_IF_CLOSE_PATTERN.match(condition_line)
+                    walk = walk + 1 if match is None else condition_index + 1
+                elif walk_kind == ALAS:
+                    walk = block_index[walk] + 1
+                elif walk_kind == FUNC_DEF or walk_line.endswith("{"):
+                    depth += 1
+                    walk += 1
+                else:
+                    if walk_kind == CLOSE and depth:
+                        depth -= 1
+                    walk += 1
+            if depth == 0:
+                yield piece
+                piece = []
+                start = i
+                block_index.clear()
+        indexer.feed(kind, line)
+        piece.append((kind, line))
+    if piece:
+        yield piece
+
+def split_points(tokens):
+    """
+    Returns the indices of the tokens a file can be cut at (see split_pieces).
+    """
+    points = []
+    position = 0
+    for piece in split_pieces(tokens):
+        if position:
+            points.append(position)
+        position += len(piece)
+    return points
+
+def chunk_tokens(tokens, size):
+    """
+    Groups the pieces of a token stream into (start, tokens) chunks of at
+    least size tokens (the last one may be smaller), read lazily.
+    """
+    chunk = []
+    start = 0
+    for piece in split_pieces(tokens):
+        chunk.extend(piece)
+        if len(chunk) >= size:
+            yield start, chunk
+            start += len(chunk)
+            chunk = []
+    if chunk:
+        yield start, chunk
+
+def can_split(sidecar=None, native=None):
+    """
+    Tells whether the active options let pieces of a file be transpiled
+    apart. Localizing names and propagating constants need the whole file
+    scanned first, vectorizing loops tracks arrays from one function to the
+    next, sidecar data is written to one file in order and native functions
+    are built from every def in the file.
+    """
+    if (transpile_options.get("localize_names") or transpile_options.get("propagate_constants")
+            or sidecar is not None or native is not None):
+        return False
+    return not (transpile_options.get("array_backend") == "numpy" and transpile_options.get("vectorize"))
+
+def transpile_chunk(job):
+    """
+    Pool entry point: transpiles one (tokens, options, with_line_map) piece
+    of a file. Returns its Python lines and, if asked for, their TinyPy
+    lines counted from the start of the piece.
+    """
+    tokens, options, with_line_map = job
+    line_map = [] if with_line_map else None
+    with transpile_options.using(**options):
+        return list(transpile_tokens(tokens, line_map=line_map)), line_map
+
+def transpile_tokens_parallel(tokens, workers, line_map=None, chunk_size=CHUNK_TOKENS):
+    """
+    Transpiles a token stream on a process pool, cut at split points into
+    chunks of about chunk_size tokens, and yields the Python lines in file
+    order, as transpile_tokens would. Tokens are read lazily, at most
+    CHUNKS_IN_FLIGHT chunks per worker are queued, and each chunk's lines
+    are yielded as soon as it and every chunk before it are done, so memory
+    follows chunk size and worker count rather than file size. A file that
+    forms a single chunk is transpiled in this process.
+    """
+    chunks = chunk_tokens(tokens, chunk_size)
+    first = next(chunks, None)
+    second = next(chunks, None)
+    if second is None:
+        if first is not None:
+            yield from transpile_tokens(first[1], line_map=line_map)
+        return
+
+    options = transpile_options.current()
+    pending = deque()  # (start, future) in file order
+
+    def finish():
+        start, future = pending.popleft()
+        lines, origins = future.result()
+        if line_map is not None:
+            line_map.extend(lineno + start for lineno in origins)
+        return lines
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=line_cache.configure,
+                             initargs=(line_cache.configured_size(),)) as executor:
+        for start, chunk in chain((first, second), chunks):
+            if len(pending) >= workers * CHUNKS_IN_FLIGHT:
+                yield from finish()
+            pending.append((start, executor.submit(transpile_chunk, (chunk, options, line_map is not None))))
+        while pending:
+            yield from finish()
+
+def build_module(lines):
+    """
+    Parses an iterable of TinyPy source lines into a Module node.
+    """
+    return Module(list(parse_tokens(tokenize(lines))))
+
+def transpile_lines(lines, stats=None, line_map=None, sidecar=None, workers=1, native=None):
+    """
+    Transpiles an iterable of TinyPy source lines, yielding Python lines.
+    The main() call is appended when a `def main(` line has gone past.
+    line_map, sidecar and native work as for transpile_tokens; generated
+    lines map to 0.
+    With more than one worker, top-level functions are transpiled on a
+    process pool when the options allow it and no stats are collected; the
+    output is the same either way.
+    """
+    header = prelude()
+    if header:
+        if line_map is not None:
+            line_map.extend([0] * (len(header) + 1))
+        yield from header
+        yield ""
+
+    if workers > 1 and stats is None and can_split(sidecar, native):
+        py_lines = transpile_tokens_parallel(tokenize(lines), workers, line_map)
+    else:
+        py_lines = transpile_tokens(tokenize(lines), stats, line_map, sidecar, native)
+
+    has_main = False
+    for py_line in py_lines:
+        if not has_main and "def main(" in py_line:
+            has_main = True
+        yield py_line
 
     # Auto-insert main() call if main() is defined
-    if any("def main(" in l for l in output_lines):
-        output_lines.append("")
-        output_lines.append('if __name__ == "__main__":')
-        output_lines.append("    main()")
+    if has_main:
+        if line_map is not None:
+            line_map.extend([0, 0, 0])
+        yield ""
+        yield 'if __name__ == "__main__":'
+        yield "    main()"
+
+def transpile_source(source, line_map=None, **options):
+    """
+    Transpiles TinyPy source text held in memory and returns the Python source.
+    Keyword arguments override code-generation options for this call; pass
+    a list as line_map to have it filled as for transpile_lines. There is
+    no output file to put sidecar data or native code next to, so
+    initializers always stay literals and functions stay in Python.
+    """
+    with transpile_options.using(**options):
+        return "\n".join(transpile_lines(source.splitlines(), line_map=line_map))
 
-    with open(output_path, 'w') as f:
-        f.write("\n".join(output_lines))
+def write_with_stats(py_lines, target, input_path, stats):
+    """
+    Instrumented twin of the write loop in transpile_file.
+    """
+    stats.current_file = input_path
+    start = time.perf_counter()
+    separator = ""
+    count = 0
+    for py_line in py_lines:
+        write_start = time.perf_counter()
+        target.write(separator)
+        target.write(py_line)
+        stats.add_phase("write", time.perf_counter() - write_start)
+        separator = "\n"
+        count += 1
+    write_start = time.perf_counter()
+    target.flush()
+    stats.add_phase("write", time.perf_counter() - write_start)
+    elapsed = time.perf_counter() - start
+    stats.add_phase("total", elapsed)
+    stats.record_file(input_path, count, elapsed)
 
-    print(f"✅ Transpiled to {output_path}")
+def transpile_file(input_path, output_path=None, verbose=True, source_map=False, workers=1, **options):
+    """
+    Transpiles a .tpy file to output_path (default: next to it as .py).
+    With more than one worker, files of PARALLEL_MIN_BYTES or more are cut
+    at top-level functions and transpiled on up to workers processes. That
+    is faster on several cores, but memory then grows with the chunks in
+    flight instead of staying at block nesting depth, so it is opt-in.
+    """
+    if output_path is None:
+        output_path = os.path.splitext(input_path)[0] + ".py"
+    if workers is None:
+        workers = 1
+    if workers > 1 and os.path.getsize(input_path) < PARALLEL_MIN_BYTES:
+        workers = 1
+
+    with transpile_options.using(**options):
+        write_output(input_path, output_path, source_map, workers)
+
+    if verbose:
+        print(f"✅ Transpiled to {output_path}")
     return output_path
+
+def add_sidecar_loaders(temp_path, line_map=None):
+    """
+    Rewrites a finished output so it starts with the prelude that includes
+    the sidecar loaders, in place of the one it was written with. Only
+    outputs that moved initializers to a data file pay for the loaders and
+    the copy. line_map, if given, is shifted to match.
+    """
+    written = prelude()
+    header = prelude(sidecar_loaders=True)
+    skip = len(written) + 1 if written else 0
+    spliced_path = temp_path + ".prelude"
+    try:
+        with open(temp_path, 'r') as source, open(spliced_path, 'w', buffering=OUTPUT_BUFFER_SIZE) as target:
+            for _ in range(skip):
+                source.readline()
+            target.write("\n".join(header))
+            target.write("\n\n")
+            shutil.copyfileobj(source, target, OUTPUT_BUFFER_SIZE)
+        os.replace(spliced_path, temp_path)
+    finally:
+        if os.path.exists(spliced_path):
+            os.remove(spliced_path)
+    if line_map is not None:
+        line_map[:skip] = [0] * (len(header) + 1)
+
+def write_output(input_path, output_path, source_map=False, workers=1):
+    # Stream from the lazily read input straight into a buffered temporary
+    # file, so peak memory follows block lookahead rather than file size and
+    # a failed run never leaves a truncated output behind.
+    stats = transpile_stats.active()
+    line_map = [] if source_map else None
+    sidecar = SidecarWriter(sidecar_path(output_path)) if transpile_options.get("sidecar_data") else None
+    native = NativeBuilder(native_module_path(output_path)) if transpile_options.get("native_functions") else None
+    temp_path = output_path + ".tmp"
+    try:
+        with open(input_path, 'r') as source, open(temp_path, 'w', buffering=OUTPUT_BUFFER_SIZE) as target:
+            if stats is None:
+                separator = ""
+                for py_line in transpile_lines(source, line_map=line_map, sidecar=sidecar, workers=workers,
+                                               native=native):
+                    target.write(separator)
+                    target.write(py_line)
+                    separator = "\n"
+            else:
+                write_with_stats(transpile_lines(source, stats, line_map, sidecar, native=native), target,
+                                 input_path, stats)
+        # The data file and native module are in place before the code that loads them
+        if sidecar is not None and sidecar.commit():
+            add_sidecar_loaders(temp_path, line_map)
+        if source_map:
+            write_source_map(source_map_path(output_path), line_map)
+        if native is not None:
+            native.commit()
+        os.replace(temp_path, output_path)
+        if transpile_options.get("write_bytecode"):
+            write_bytecode(output_path)
+    finally:
+        if sidecar is not None:
+            sidecar.discard()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -1,43 +1,52 @@
 import re
+from tinypy_ir import FunctionDef, Param, Return
+from python_emitter import emit_line
 
 # Pattern for function definitions
 FUNC_DEF_PATTERN = r'^(int|bool|char|float|string|dyn)\s+(\w+)\((.*)\)\s*{'
+FUNC_DEF_RE = re.compile(FUNC_DEF_PATTERN)
+PARAM_PATTERN = re.compile(r'^(?:(int|bool|char|float|string|dyn)\s+)?(\w+)$')
 
 def transpile_function(line):
     """
     Transpiles function-related constructs (definitions and return statements).
     Returns None if the line is not a function-related construct.
     """
+    # Closing brace (function end)
+    if line == "}":
+        return ""
+
+    node = parse_function(line)
+    if node is None:
+        return None
+    return emit_line(node)
+
+def parse_function(line):
+    """
+    Parses a function definition or return statement into a FunctionDef or
+    Return node. Returns None if the line is neither.
+    """
     # Function definitions
-    match = re.match(FUNC_DEF_PATTERN, line)
+    match = FUNC_DEF_RE.match(line)
     if match:
         return_type, func_name, param_list = match.groups()
-        # Handle empty parameter list
-        if not param_list.strip():
-            return f'def {func_name}():'
-        # Split parameters and extract variable names
+        # Split parameters and extract types and variable names
         params = []
         for param in param_list.split(','):
             param = param.strip()
             if not param:
                 continue
             # Match parameter format: optional type followed by name
-            param_match = re.match(r'^(?:(int|bool|char|float|string|dyn)\s+)?(\w+)$', param)
+            param_match = PARAM_PATTERN.match(param)
             if param_match:
-                _, var_name = param_match.groups()
-                params.append(var_name)
+                params.append(Param(*param_match.groups()))
             else:
                 # Fallback: use the whole parameter
-                params.append(param)
-        py_param_list = ', '.join(params)
-        return f'def {func_name}({py_param_list}):'
+                params.append(Param(None, param))
+        return FunctionDef(return_type, func_name, params)
 
     # Return statements
     if line.startswith("ret "):
-        return "return " + line[4:]
-
-    # Closing brace (function end)
-    if line == "}":
-        return ""
+        return Return(line[4:])
 
-    return None
\ No newline at end of file
+    return None
@@ -0,0 +1,116 @@
+from collections import OrderedDict
+from tinypy_ir import BLOCK_NODES
+
+# Lines kept when the cache is turned on without a size
+DEFAULT_SIZE = 4096
+# Longer lines (mostly big initializers) rarely repeat and would pin a lot of memory
+MAX_LINE_LENGTH = 200
+
+_slot_names = {}
+
+def slot_names(cls):
+    names = _slot_names.get(cls)
+    if names is None:
+        names = _slot_names[cls] = tuple(name for klass in cls.__mro__
+                                         for name in getattr(klass, "__slots__", ()))
+    return names
+
+def clone(node, lineno):
+    """
+    Returns a shallow copy of a parsed node for another source line.
+    Field values are shared; the emitters only read them.
+    """
+    cls = type(node)
+    copy = cls.__new__(cls)
+    for name in slot_names(cls):
+        setattr(copy, name, getattr(node, name))
+    copy.lineno = lineno
+    return copy
+
+class LineCache:
+    """
+    Bounded LRU of parsed lines, keyed on the stripped line without its
+    trailing semicolon. Parsing only depends on the text of the line, so a
+    repeated line is served as a copy of the node parsed the first time
+    instead of going through the regex cascade again. Lines that open a
+    block are never cached: their node gets the body that follows them.
+    Emission still runs for every line, so the parts of the translation
+    that depend on context (vectorizing, sidecar data, localized names,
+    native functions) see each occurrence. A hit is about twice as fast as
+    parsing, a miss a little slower, so it pays off on repetitive code.
+    """
+
+    def __init__(self, size=DEFAULT_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, line, lineno):
+        """
+        Returns a copy of the cached node for line, or None on a miss.
+        """
+        node = self.entries.get(line)
+        if node is None:
+            return None
+        self.entries.move_to_end(line)
+        self.hits += 1
+        return clone(node, lineno)
+
+    def store(self, line, node):
+        """
+        Records the node parsed for line after a miss.
+        """
+        self.misses += 1
+        if len(line) > MAX_LINE_LENGTH or type(node) in BLOCK_NODES:
+            return
+        entries = self.entries
+        entries[line] = node
+        if len(entries) > self.size:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def resize(self, size):
+        self.size = size
+        while len(self.entries) > max(size, 0):
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def counters(self):
+        return self.hits, self.misses, self.evictions
+
+    def stats(self):
+        return {"size": self.size, "entries": len(self.entries), **summarize([self.counters()])}
+
+# One cache per process, shared by every file transpiled in it; off until configured
+_shared = LineCache(0)
+
+def shared():
+    """
+    Returns the process-wide cache, or None when it is turned off.
+    """
+    return _shared if _shared.size > 0 else None
+
+def configured_size():
+    return _shared.size
+
+def configure(size):
+    """
+    Sets the size of the process-wide cache; 0 turns it off.
+    """
+    _shared.resize(size)
+
+def summarize(counters):
+    """
+    Adds up (hits, misses, evictions) counters, e.g. from pool workers,
+    into the same dict as LineCache.stats() without the size fields.
+    """
+    hits = misses = evictions = 0
+    for job_hits, job_misses, job_evictions in counters:
+        hits += job_hits
+        misses += job_misses
+        evictions += job_evictions
+    lookups = hits + misses
+    return {"hits": hits, "misses": misses, "evictions": evictions,
+            "hit_rate": hits / lookups if lookups else 0.0}
@@ -1,34 +1,99 @@
-from function_transpiler import transpile_function
-from variable_transpiler import transpile_variable
-from io_transpiler import transpile_io
-from conditional_transpiler import transpile_conditional, replace_conditional_operators
-from datastructure_transpiler import transpile_datastructure
-from loop_transpiler import transpile_loop
+import re
+import line_cache
+from tinypy_ir import Expr, Statement
+from python_emitter import emit_line
+from function_transpiler import parse_function
+from variable_transpiler import parse_variable, parse_increment
+from io_transpiler import parse_io
+from datastructure_transpiler import parse_array, parse_dictionary
+from loop_transpiler import parse_for_loop, parse_while_loop, parse_foreach_loop, parse_fordict_loop
 
-def transpile_line(line):
+# Leading keyword of a line, including the character that has to follow it
+# for the construct pattern to apply. Lines without one are generic.
+KEYWORD_PATTERN = re.compile(
+    r'(?P<repeatFor>repeatFor\s*\()'
+    r'|(?P<repeatWhile>repeatWhile\s*\()'
+    r'|(?P<forDict>forDict\s*\()'
+    r'|(?P<foreach>for\s*\()'
+    r'|(?P<enter>enter\()'
+    r'|(?P<disp>disp\s*<<)'
+    r'|(?P<ret>ret )'
+    r'|(?P<brick>brick )'
+    r'|(?P<universal>universal )'
+    r'|(?P<dict>dict\s)'
+    r'|(?P<type>(?:int|bool|char|float|string|dyn)\s)'
+)
+
+# Parsers to try for each leading keyword, in priority order.
+# Functions are checked before arrays and arrays before plain declarations
+# since they have more specific patterns.
+PARSE_TABLE = {
+    "repeatFor": (parse_for_loop,),
+    "repeatWhile": (parse_while_loop,),
+    "forDict": (parse_fordict_loop,),
+    "foreach": (parse_foreach_loop,),
+    "enter": (parse_io,),
+    "disp": (parse_io,),
+    "ret": (parse_function,),
+    "brick": (parse_variable,),
+    "universal": (parse_variable,),
+    "dict": (parse_dictionary,),
+    "type": (parse_function, parse_array, parse_variable),
+}
+
+# Parsers for lines without a construct keyword (i++, legacy disp forms)
+GENERIC_PARSERS = (parse_increment, parse_io)
+
+def parse_line(line, dispatch=PARSE_TABLE, generic=GENERIC_PARSERS, lineno=None, cache=None):
     """
-    Transpiles a single line by delegating to specialized transpilers.
+    Parses a single line into an IR node by delegating to the parsers
+    registered for its leading keyword. Returns None for blank lines,
+    comments and closing braces, which produce no code. Given a LineCache,
+    lines parsed before are served from it.
     """
     line = line.strip()
 
     # Ignore empty lines and comments
     if not line or line.startswith("//"):
-        return ""
+        return None
 
     # Remove trailing semicolons
     if line.endswith(";"):
         line = line[:-1]
 
-    # Try each specialized transpiler in order
-    # Data structures should be checked before variables since they have more specific patterns
-    # Loops should be checked early since they have specific patterns too
-    for transpiler in [transpile_function, transpile_datastructure, transpile_loop, transpile_variable, transpile_io, transpile_conditional]:
-        result = transpiler(line)
-        if result is not None:
-            return result
-
-    # Apply conditional operator replacements to any remaining lines
-    line = replace_conditional_operators(line)
-    
-    # Default fallthrough: return the processed line
-    return line
\ No newline at end of file
+    # Closing braces only end blocks, also when written as `} ;`
+    if line.rstrip() == "}":
+        return None
+
+    if cache is not None:
+        node = cache.lookup(line, lineno)
+        if node is not None:
+            return node
+
+    node = parse_statement(line, dispatch, generic)
+    node.lineno = lineno
+    if cache is not None:
+        cache.store(line, node)
+    return node
+
+def parse_statement(line, dispatch=PARSE_TABLE, generic=GENERIC_PARSERS):
+    """
+    Runs the parser cascade on a stripped line that produces code.
+    """
+    match = KEYWORD_PATTERN.match(line)
+    for parser in (dispatch[match.lastgroup] if match else generic):
+        node = parser(line)
+        if node is not None:
+            return node
+
+    # Any remaining line is an expression statement
+    return Statement(Expr(line))
+
+def transpile_line(line):
+    """
+    Transpiles a single line on its own to Python.
+    """
+    node = parse_line(line, cache=line_cache.shared())
+    if node is None:
+        return ""
+    return emit_line(node)
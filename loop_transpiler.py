@@ -1,4 +1,12 @@
 import re
+from tinypy_ir import Expr, ForRange, WhileLoop, ForEachLoop, ForDictLoop
+from python_emitter import emit_line
+
+FOR_LOOP_PATTERN = re.compile(r'^repeatFor\s*\(\s*(int|bool|char|float|string|dyn)?\s*(\w+)\s*=\s*([^;]+)\s*;\s*([^;]+)\s*;\s*(\w+)\+\+\s*\)\s*\{$')
+FOR_CONDITION_PATTERN = re.compile(r'(\w+)\s*(<|<=|!=|>|>=)\s*(.+)')
+WHILE_LOOP_PATTERN = re.compile(r'^repeatWhile\s*\(\s*(.+)\s*\)\s*\{$')
+FOREACH_LOOP_PATTERN = re.compile(r'^for\s*\(\s*(\w+)\s*:\s*(\w+)\s*\)\s*\{$')
+FORDICT_LOOP_PATTERN = re.compile(r'^forDict\s*\(\s*(\w+)\s*,\s*(\w+)\s*:\s*(\w+)\s*\)\s*\{$')
 
 def transpile_loop(line):
     """
@@ -32,74 +40,73 @@ def transpile_for_loop(line):
     Transpiles for loops.
     Format: repeatFor(int i=0;i<10;i++){
     """
-    pattern = r'^repeatFor\s*\(\s*(int|bool|char|float|string|dyn)?\s*(\w+)\s*=\s*([^;]+)\s*;\s*([^;]+)\s*;\s*(\w+)\+\+\s*\)\s*\{$'
-    match = re.match(pattern, line)
+    node = parse_for_loop(line)
+    if node is None:
+        return None
+    return emit_line(node)
+
+def parse_for_loop(line):
+    """
+    Parses a repeatFor header into a ForRange node, or returns None.
+    """
+    match = FOR_LOOP_PATTERN.match(line)
 
     if match:
         var_type, var_name, start_value, condition, increment_var = match.groups()
 
-        condition_match = re.match(r'(\w+)\s*(<|<=|!=|>|>=)\s*(.+)', condition.strip())
+        operator = limit = None
+        condition_match = FOR_CONDITION_PATTERN.match(condition.strip())
         if condition_match:
             cond_var, operator, limit = condition_match.groups()
             limit = limit.strip()
 
-            if operator == '<':
-                return f"for {var_name} in range({start_value}, {limit}):"
-            elif operator == '<=':
-                return f"for {var_name} in range({start_value}, ({limit}) + 1):"
-            elif operator == '>':
-                return f"for {var_name} in range({start_value}, {limit}, -1):"
-            elif operator == '>=':
-                return f"for {var_name} in range({start_value}, ({limit}) - 1, -1):"
-            elif operator == '!=':
-                return f"for {var_name} in range({start_value}, {limit}):"  # May need refining
-
-        return f"for {var_name} in range({start_value}, {condition}):"
+        return ForRange(var_type, var_name, start_value, operator, limit, condition)
 
     return None
 
 
 def transpile_while_loop(line):
-    pattern = r'^repeatWhile\s*\(\s*(.+)\s*\)\s*\{$'
-    match = re.match(pattern, line)
+    node = parse_while_loop(line)
+    if node is None:
+        return None
+    return emit_line(node)
+
+def parse_while_loop(line):
+    match = WHILE_LOOP_PATTERN.match(line)
 
     if match:
-        condition = match.group(1)
-        condition = replace_conditional_operators(condition)
-        return f"while {condition}:"
+        return WhileLoop(Expr(match.group(1)))
 
     return None
 
 
 def transpile_foreach_loop(line):
-    pattern = r'^for\s*\(\s*(\w+)\s*:\s*(\w+)\s*\)\s*\{$'
-    match = re.match(pattern, line)
+    node = parse_foreach_loop(line)
+    if node is None:
+        return None
+    return emit_line(node)
+
+def parse_foreach_loop(line):
+    match = FOREACH_LOOP_PATTERN.match(line)
 
     if match:
         item_var, collection_var = match.groups()
-        return f"for {item_var} in {collection_var}:"
+        return ForEachLoop(item_var, collection_var)
 
     return None
 
 
 def transpile_fordict_loop(line):
-    pattern = r'^forDict\s*\(\s*(\w+)\s*,\s*(\w+)\s*:\s*(\w+)\s*\)\s*\{$'
-    match = re.match(pattern, line)
+    node = parse_fordict_loop(line)
+    if node is None:
+        return None
+    return emit_line(node)
+
+def parse_fordict_loop(line):
+    match = FORDICT_LOOP_PATTERN.match(line)
 
     if match:
         key_var, value_var, dict_var = match.groups()
-        return f"for {key_var}, {value_var} in {dict_var}.items():"
+        return ForDictLoop(key_var, value_var, dict_var)
 
     return None
-
-
-def replace_conditional_operators(text):
-    text = re.sub(r'\btrue\b', 'True', text)
-    text = re.sub(r'\bfalse\b', 'False', text)
-    text = re.sub(r'\&\&', ' and ', text)
-    text = re.sub(r'\|\|', ' or ', text)
-    text = re.sub(r'\!([^=])', r' not \1', text)
-    text = re.sub(r'\!\=', ' != ', text)
-    text = re.sub(r'\=\=', ' == ', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
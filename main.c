@@ -1,5 +1,121 @@
+#define PY_SSIZE_T_CLEAN
 #include <Python.h>
+#include <marshal.h>
 #include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+/* pyc header: magic number, flags, 8-byte source hash (PEP 552) */
+#define HEADER_SIZE 16
+#define HASH_BASED_FLAG 0x1
+
+/* Reads a whole file into a malloc'ed buffer; returns NULL if it cannot be read. */
+static char *read_file(const char *path, long *size) {
+    FILE *fp = fopen(path, "rb");
+    if (!fp) {
+        return NULL;
+    }
+    char *data = NULL;
+    if (fseek(fp, 0, SEEK_END) == 0 && (*size = ftell(fp)) >= 0 && fseek(fp, 0, SEEK_SET) == 0) {
+        data = malloc(*size > 0 ? *size : 1);
+        if (data && fread(data, 1, *size, fp) != (size_t)*size) {
+            free(data);
+            data = NULL;
+        }
+    }
+    fclose(fp);
+    return data;
+}
+
+/* prog.py -> prog.pyc, the file tinypy_compiler.py --bytecode writes */
+static char *bytecode_path_for(const char *filename) {
+    size_t length = strlen(filename);
+    const char *dot = strrchr(filename, '.');
+    const char *slash = strrchr(filename, '/');
+    const char *backslash = strrchr(filename, '\\');
+    if (backslash > slash) {
+        slash = backslash;
+    }
+    if (dot && dot > slash && dot != filename) {
+        length = dot - filename;
+    }
+    char *path = malloc(length + 5);
+    if (path) {
+        memcpy(path, filename, length);
+        strcpy(path + length, ".pyc");
+    }
+    return path;
+}
+
+/*
+ * Returns the code object in the pyc when its header matches this Python's
+ * magic number and the hash of the current source, or NULL when it is
+ * missing, stale or unreadable (without an exception set).
+ */
+static PyObject *load_bytecode(const char *pyc_path, const char *source, long source_size) {
+    long size;
+    char *data = read_file(pyc_path, &size);
+    if (!data) {
+        return NULL;
+    }
+    PyObject *code = NULL;
+    long magic = PyImport_GetMagicNumber();
+    unsigned char *header = (unsigned char *)data;
+    int valid = size > HEADER_SIZE && magic != -1;
+    for (int i = 0; valid && i < 4; i++) {
+        valid = header[i] == ((magic >> (8 * i)) & 0xff);
+    }
+    valid = valid && (header[4] & HASH_BASED_FLAG);
+    if (valid) {
+        /* The same hash importlib.util.source_hash() computes */
+        PyObject *hash = NULL;
+        PyObject *imp = PyImport_ImportModule("_imp");
+        if (imp) {
+            hash = PyObject_CallMethod(imp, "source_hash", "ly#", magic, source, (Py_ssize_t)source_size);
+            Py_DECREF(imp);
+        }
+        valid = hash && PyBytes_Check(hash) && PyBytes_GET_SIZE(hash) == 8
+                && memcmp(PyBytes_AS_STRING(hash), data + 8, 8) == 0;
+        Py_XDECREF(hash);
+    }
+    if (valid) {
+        code = PyMarshal_ReadObjectFromString(data + HEADER_SIZE, size - HEADER_SIZE);
+        if (code && !PyCode_Check(code)) {
+            Py_CLEAR(code);
+        }
+    }
+    PyErr_Clear();
+    free(data);
+    return code;
+}
+
+/* Runs code as __main__, the way PyRun_SimpleFile runs a source file. */
+static int run_code(PyObject *code, const char *filename, const char *pyc_path) {
+    PyObject *main_module = PyImport_AddModule("__main__");
+    if (!main_module) {
+        PyErr_Print();
+        return -1;
+    }
+    PyObject *globals = PyModule_GetDict(main_module);
+    PyObject *file = PyUnicode_DecodeFSDefault(filename);
+    PyObject *cached = PyUnicode_DecodeFSDefault(pyc_path);
+    if (!file || !cached || PyDict_SetItemString(globals, "__file__", file) < 0
+            || PyDict_SetItemString(globals, "__cached__", cached) < 0) {
+        Py_XDECREF(file);
+        Py_XDECREF(cached);
+        PyErr_Print();
+        return -1;
+    }
+    Py_DECREF(file);
+    Py_DECREF(cached);
+    PyObject *result = PyEval_EvalCode(code, globals, globals);
+    if (!result) {
+        PyErr_Print();
+        return -1;
+    }
+    Py_DECREF(result);
+    return 0;
+}
 
 int main(int argc, char *argv[]) {
     if (argc < 2) {
@@ -9,21 +125,43 @@ int main(int argc, char *argv[]) {
 
     const char *filename = argv[1];
 
-    FILE *fp = fopen(filename, "r");
-    if (!fp) {
+    long source_size;
+    char *source = read_file(filename, &source_size);
+    if (!source) {
         printf("Failed to open %s\n", filename);
         return 1;
     }
+    char *pyc_path = bytecode_path_for(filename);
 
     Py_Initialize();
 
-    PyRun_SimpleFile(fp, filename);
-    fclose(fp);
+    int status;
+    PyObject *code = pyc_path ? load_bytecode(pyc_path, source, source_size) : NULL;
+    if (code) {
+        status = run_code(code, filename, pyc_path);
+        Py_DECREF(code);
+    } else {
+        /* No pyc, or it does not match the source: compile the source */
+        FILE *fp = fopen(filename, "r");
+        if (fp) {
+            status = PyRun_SimpleFile(fp, filename);
+            fclose(fp);
+        } else {
+            printf("Failed to open %s\n", filename);
+            status = -1;
+        }
+    }
+    free(source);
+    free(pyc_path);
 
-    Py_Finalize();
+    if (Py_FinalizeEx() < 0) {
+        status = -1;
+    }
 
+#ifdef _WIN32
     printf("\nPress Enter to exit...");
     getchar();
+#endif
 
-    return 0;
+    return status == 0 ? 0 : 1;
 }
@@ -0,0 +1,112 @@
+import re
+from tinypy_ir import (FunctionDef, VarDeclaration, ArrayDeclaration, DictDeclaration, Constant,
+                       Statement, Global, walk)
+from vector_transpiler import ASSIGNED_NAME_PATTERN
+
+# Builtins generated code calls; bound to locals when a loop uses them
+LOCALIZED_BUILTINS = ("print", "input", "int", "float", "range", "len", "str")
+# Prefix of the local each hot name is bound to at function entry
+LOCAL_PREFIX = "_tpy_local_"
+
+STRING_PATTERN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'')
+# A string literal, or a name that is read: not an attribute, not the
+# target of an assignment and not a keyword argument
+NAME_PATTERN = re.compile(STRING_PATTERN.pattern + r'|(?<![\w.])([A-Za-z_]\w*)(?!\w)(?!\s*=(?!=))')
+# Lines of Python that bind names in the function scope
+BINDING_PATTERN = re.compile(r'^\s*(\w+(?:\s*,\s*\w+)*)\s*(?:[-+*/%&|^@]|//|\*\*|<<|>>)?=(?!=)')
+FOR_TARGET_PATTERN = re.compile(r'^\s*for\s+(.+?)\s+in\s')
+DEF_PATTERN = re.compile(r'^\s*def\s+\w+\((.*)\):')
+IDENTIFIER_PATTERN = re.compile(r'[A-Za-z_]\w*')
+# Constructs that bind or look up names in ways the line scan does not follow
+UNSUPPORTED_PATTERN = re.compile(
+    r'\b(?:lambda|import|with|del|nonlocal|class|def|except|globals|locals|vars|eval|exec)\b|:='
+)
+
+class NameLocalizer:
+    """
+    Binds the builtins and read-only module globals a function reads inside
+    its loops to locals at function entry, so every loop iteration does a
+    fast local load instead of a dict lookup. A name is only localized when
+    it is bound at module level before the def (so it exists whenever the
+    function runs), the function never binds it and no function declares it
+    universal (so nothing can rebind it while the function runs).
+    """
+
+    def __init__(self, module_names=()):
+        self.module_names = set(module_names)
+        self.universal_names = set()
+
+    def scan_module(self, nodes):
+        """
+        Records every name any function writes through universal.
+        """
+        for node in nodes:
+            for child in walk(node):
+                if type(child) is Global:
+                    self.universal_names.update(IDENTIFIER_PATTERN.findall(child.source))
+
+    def record(self, node):
+        """
+        Records the name a top-level node binds at module level, if any.
+        """
+        node_type = type(node)
+        if node_type in (FunctionDef, VarDeclaration, ArrayDeclaration, DictDeclaration):
+            self.module_names.add(node.name)
+            return
+        if node_type is Statement:
+            match = ASSIGNED_NAME_PATTERN.match(node.expression.source)
+        elif node_type is Constant:
+            match = ASSIGNED_NAME_PATTERN.match(node.declaration.source)
+        else:
+            return
+        if match:
+            self.module_names.add(match.group(1))
+
+    def localize(self, lines):
+        """
+        Rewrites the Python lines of a top-level def, header first, binding
+        hot names to locals right after the header. Returns the lines
+        unchanged when nothing is worth binding or the body uses constructs
+        whose name binding the scan does not follow.
+        """
+        header, body = lines[0], lines[1:]
+        if not body:
+            return lines
+        code = [STRING_PATTERN.sub('""', line) for line in body]
+        if any(UNSUPPORTED_PATTERN.search(line) for line in code):
+            return lines
+
+        match = DEF_PATTERN.match(header)
+        if not match:
+            return lines
+        bound = set(IDENTIFIER_PATTERN.findall(match.group(1)))
+        for line in code:
+            match = BINDING_PATTERN.match(line) or FOR_TARGET_PATTERN.match(line)
+            if match:
+                bound.update(IDENTIFIER_PATTERN.findall(match.group(1)))
+        candidates = (self.module_names | set(LOCALIZED_BUILTINS)) - bound - self.universal_names
+
+        # Names read in a loop body or a while condition, found by indentation
+        hot = set()
+        loop_indents = []
+        for line in code:
+            stripped = line.lstrip()
+            indent = len(line) - len(stripped)
+            while loop_indents and loop_indents[-1] >= indent:
+                loop_indents.pop()
+            if loop_indents or stripped.startswith("while "):
+                for name in NAME_PATTERN.finditer(line):
+                    if name.group(1) in candidates:
+                        hot.add(name.group(1))
+            if stripped.startswith(("for ", "while ")):
+                loop_indents.append(indent)
+        if not hot:
+            return lines
+
+        def rename(match):
+            name = match.group(1)
+            return LOCAL_PREFIX + name if name in hot else match.group()
+
+        indent = header[:len(header) - len(header.lstrip())] + "    "
+        bindings = [f"{indent}{LOCAL_PREFIX}{name} = {name}" for name in sorted(hot)]
+        return [header] + bindings + [NAME_PATTERN.sub(rename, line) for line in body]
@@ -0,0 +1,512 @@
+import ast
+import math
+import operator
+import re
+import transpile_options
+from name_localizer import STRING_PATTERN, IDENTIFIER_PATTERN
+from tinypy_ir import (FunctionDef, VarDeclaration, ArrayDeclaration, DictDeclaration, Constant, Global,
+                       Increment, Input, ForRange, ForEachLoop, ForDictLoop, Statement, walk)
+
+# Optimization passes, in the order they run; each one is a code-generation
+# option of the same name
+PASSES = ("propagate_constants", "fold_constants", "eliminate_dead_code", "while_to_for")
+# Passes turned on by each -O level
+LEVELS = {
+    0: (),
+    1: ("propagate_constants", "fold_constants", "eliminate_dead_code"),
+    2: PASSES,
+}
+
+# Folded values past these sizes stay expressions, as in CPython's own folding
+MAX_INT_BITS = 128
+MAX_STRING_LENGTH = 4096
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+    ast.LShift: operator.lshift, ast.RShift: operator.rshift, ast.BitOr: operator.or_,
+    ast.BitXor: operator.xor, ast.BitAnd: operator.and_,
+}
+UNARY_OPERATORS = {ast.Not: operator.not_, ast.Invert: operator.invert, ast.USub: operator.neg,
+                   ast.UAdd: operator.pos}
+COMPARISONS = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt, ast.LtE: operator.le,
+    ast.Gt: operator.gt, ast.GtE: operator.ge,
+}
+# Statements after which nothing in the same body runs
+JUMPS = (ast.Return, ast.Raise, ast.Break, ast.Continue)
+# Statements the optimizer knows how to print back
+COMPOUND_STATEMENTS = (ast.FunctionDef, ast.If, ast.While, ast.For)
+
+# The last plain or augmented = of a line; names before it may be bound
+ASSIGNMENT_PATTERN = re.compile(r'(?<![=!<>])=(?!=)')
+WALRUS_PATTERN = re.compile(r'(\w+)\s*:=')
+DEL_PATTERN = re.compile(r'\bdel\b')
+
+class NotOptimizable(Exception):
+    pass
+
+def level_options(level):
+    """
+    Returns the pass options an -O level stands for.
+    """
+    return {name: name in LEVELS[level] for name in PASSES}
+
+def active_passes():
+    return tuple(name for name in PASSES if transpile_options.get(name))
+
+def bound_names(node):
+    """
+    Yields the names an IR node may bind, erring on the side of too many.
+    """
+    node_type = type(node)
+    if node_type is FunctionDef:
+        yield node.name
+        yield from (param.name for param in node.params)
+    elif node_type in (VarDeclaration, ArrayDeclaration, DictDeclaration, Increment):
+        yield node.name
+    elif node_type is Input:
+        yield node.target
+    elif node_type is ForRange:
+        yield node.var
+    elif node_type is ForEachLoop:
+        yield node.item
+    elif node_type is ForDictLoop:
+        yield node.key
+        yield node.value
+    elif node_type is Global:
+        yield from IDENTIFIER_PATTERN.findall(node.source)
+    elif node_type is Statement or node_type is Constant:
+        source = STRING_PATTERN.sub('""', (node.expression if node_type is Statement else node.declaration).source)
+        if DEL_PATTERN.search(source):
+            yield from IDENTIFIER_PATTERN.findall(source)
+        assignments = list(ASSIGNMENT_PATTERN.finditer(source))
+        if assignments:
+            yield from IDENTIFIER_PATTERN.findall(source[:assignments[-1].start()])
+    for slot in ("condition", "value", "values", "start", "limit"):
+        text = getattr(node, slot, None)
+        if text is not None:
+            text = " ".join(text) if type(text) is list else getattr(text, "source", text)
+            if type(text) is str:
+                yield from WALRUS_PATTERN.findall(text)
+
+def literal_value(node):
+    """
+    Returns (True, value) when an expression is a literal: a constant, or a
+    signed number. Returns (False, None) otherwise.
+    """
+    if type(node) is ast.Constant:
+        return True, node.value
+    if (type(node) is ast.UnaryOp and type(node.op) in (ast.USub, ast.UAdd) and type(node.operand) is ast.Constant
+            and type(node.operand.value) in (int, float)):
+        return True, UNARY_OPERATORS[type(node.op)](node.operand.value)
+    return False, None
+
+def is_foldable(value):
+    value_type = type(value)
+    if value_type is bool or value_type is type(None):
+        return True
+    if value_type is int:
+        return value.bit_length() <= MAX_INT_BITS
+    if value_type is float:
+        return math.isfinite(value)
+    if value_type is str:
+        return len(value) <= MAX_STRING_LENGTH
+    return False
+
+def within_limits(compute, *operands):
+    """
+    Tells whether an operation on literals is cheap enough to evaluate
+    while transpiling: powers, shifts and repeated strings are checked
+    before they are computed.
+    """
+    if len(operands) != 2:
+        return True
+    left, right = operands
+    if compute is operator.pow and type(left) is int and type(right) is int:
+        return right <= MAX_INT_BITS and left.bit_length() * right <= MAX_INT_BITS
+    if compute is operator.lshift and type(right) is int:
+        return right <= MAX_INT_BITS
+    if compute is operator.mul and (type(left) is str or type(right) is str):
+        count = right if type(left) is str else left
+        return type(count) is not int or count * len(left if type(left) is str else right) <= MAX_STRING_LENGTH
+    return True
+
+def literal(value, location):
+    """
+    Returns the expression for a foldable value. Negative numbers are
+    spelled as a minus applied to a constant, which is how the parser reads
+    them and what ast.unparse parenthesizes correctly.
+    """
+    if type(value) in (int, float) and math.copysign(1, value) < 0:
+        node = ast.UnaryOp(ast.USub(), ast.Constant(-value))
+    else:
+        node = ast.Constant(value)
+    return ast.copy_location(node, location)
+
+class ConstantSubstituter(ast.NodeTransformer):
+    def __init__(self, constants):
+        self.constants = constants
+        self.changed = False
+
+    def visit_Name(self, node):
+        if type(node.ctx) is ast.Load and node.id in self.constants:
+            self.changed = True
+            return literal(self.constants[node.id], node)
+        return node
+
+class ConstantFolder(ast.NodeTransformer):
+    """
+    Evaluates operators whose operands are all literals, innermost first,
+    with Python itself, so a folded value is exactly what the generated code
+    would compute. Operations that raise are left for run time.
+    """
+
+    def __init__(self):
+        self.changed = False
+
+    def fold(self, node, compute, *operands):
+        if not within_limits(compute, *operands):
+            return node
+        try:
+            value = compute(*operands)
+        except Exception:
+            return node
+        if not is_foldable(value):
+            return node
+        self.changed = True
+        return literal(value, node)
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        left_is_literal, left = literal_value(node.left)
+        right_is_literal, right = literal_value(node.right)
+        compute = BINARY_OPERATORS.get(type(node.op))
+        if not (left_is_literal and right_is_literal) or compute is None:
+            return node
+        return self.fold(node, compute, left, right)
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if literal_value(node)[0]:
+            return node  # already as folded as it gets
+        is_literal, operand = literal_value(node.operand)
+        if not is_literal:
+            return node
+        return self.fold(node, UNARY_OPERATORS[type(node.op)], operand)
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        operands = [literal_value(operand) for operand in [node.left] + node.comparators]
+        if not all(is_literal for is_literal, _ in operands) or not all(type(op) in COMPARISONS for op in node.ops):
+            return node
+
+        def compare():
+            values = [value for _, value in operands]
+            return all(COMPARISONS[type(op)](values[i], values[i + 1]) for i, op in enumerate(node.ops))
+        return self.fold(node, compare)
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        operands = [literal_value(value) for value in node.values]
+        if not all(is_literal for is_literal, _ in operands):
+            return node
+
+        def evaluate():
+            result = operands[0][1]
+            for _, value in operands[1:]:
+                if (type(node.op) is ast.And) != bool(result):
+                    break
+                result = value
+            return result
+        return self.fold(node, evaluate)
+
+def expression_fields(statement):
+    """
+    Yields (field, value) for the expression parts of a statement, leaving
+    out nested statement bodies.
+    """
+    for field, value in ast.iter_fields(statement):
+        if field not in ("body", "orelse", "finalbody", "handlers"):
+            yield field, value
+
+def statement_lists(tree):
+    """
+    Yields every body and orelse list in the tree.
+    """
+    for node in ast.walk(tree):
+        for field in ("body", "orelse"):
+            body = getattr(node, field, None)
+            if type(body) is list and body and isinstance(body[0], ast.stmt):
+                yield body
+
+def stored_names(tree):
+    names = set()
+    for node in ast.walk(tree):
+        if type(node) is ast.Name and type(node.ctx) is not ast.Load:
+            names.add(node.id)
+        elif type(node) is ast.arg:
+            names.add(node.arg)
+        elif type(node) in (ast.Global, ast.Nonlocal):
+            names.update(node.names)
+        elif type(node) in (ast.FunctionDef, ast.ClassDef):
+            names.add(node.name)
+        elif type(node) in (ast.Import, ast.ImportFrom):
+            names.update((alias.asname or alias.name).split(".")[0] for alias in node.names)
+    return names
+
+class Optimizer:
+    """
+    Runs the optimization passes over the Python lines of each top-level
+    node. The lines are parsed with ast; statements a pass changes are
+    printed again with ast.unparse, and every other line is kept exactly as
+    emitted, so the output only differs where code was optimized and each
+    line keeps the TinyPy line it came from. Nodes whose lines are not
+    valid Python on their own are left alone.
+
+    propagate_constants replaces reads of brick constants declared at the
+    top of the file with their values, in code after the declaration, when
+    the value is a literal (or folds to one) and nothing else in the file
+    binds the name. fold_constants evaluates operators on literals.
+    eliminate_dead_code drops statements after a ret (or break, continue)
+    in the same body. while_to_for turns a repeatWhile inside a function
+    whose variable is set to an int literal before it, compared with < or
+    <= against an int literal and only changed by the i++ ending its body
+    into a for loop over a range, followed by the value the while loop would
+    have left in the variable.
+    """
+
+    def __init__(self, passes):
+        self.passes = set(passes)
+        self.binding_counts = {}
+        self.constants = {}  # brick name: value, for the bricks declared so far
+
+    def scan_module(self, nodes):
+        """
+        Counts the bindings of every name in the file, so only bricks that
+        are never rebound are propagated.
+        """
+        for node in nodes:
+            for child in walk(node):
+                for name in bound_names(child):
+                    self.binding_counts[name] = self.binding_counts.get(name, 0) + 1
+
+    def optimize(self, node, lines, origins=None):
+        """
+        Returns (lines, origins) for the Python lines of a top-level node and
+        the TinyPy line of each; origins may be None.
+        """
+        if origins is None:
+            origins = [0] * len(lines)
+        try:
+            tree = ast.parse("\n".join(lines))
+            rewriter = Rewriter(lines, origins, tree)
+        except (SyntaxError, NotOptimizable, RecursionError, ValueError):
+            return lines, origins
+
+        if "propagate_constants" in self.passes and self.constants:
+            local_names = stored_names(tree)
+            names = {name: value for name, value in self.constants.items() if name not in local_names}
+            if names:
+                rewriter.transform(lambda: ConstantSubstituter(names))
+        if "fold_constants" in self.passes:
+            rewriter.transform(ConstantFolder)
+        if "eliminate_dead_code" in self.passes:
+            rewriter.eliminate_dead_code()
+        if "while_to_for" in self.passes and type(node) is FunctionDef and "range" not in self.binding_counts:
+            rewriter.convert_counted_loops()
+
+        if "propagate_constants" in self.passes and type(node) is Constant:
+            self.record_constant(tree)
+        if not rewriter.changed:
+            return lines, origins
+        try:
+            return rewriter.render()
+        except NotOptimizable:
+            return lines, origins
+
+    def record_constant(self, tree):
+        if len(tree.body) != 1 or type(tree.body[0]) is not ast.Assign:
+            return
+        assignment = tree.body[0]
+        if len(assignment.targets) != 1 or type(assignment.targets[0]) is not ast.Name:
+            return
+        name = assignment.targets[0].id
+        is_literal, value = literal_value(assignment.value)
+        if is_literal and is_foldable(value) and type(value) is not type(None) and self.binding_counts.get(name) == 1:
+            self.constants[name] = value
+
+class Rewriter:
+    """
+    The parsed lines of one top-level node, the changes made to them and
+    how to print them back.
+    """
+
+    def __init__(self, lines, origins, tree):
+        self.lines = lines
+        self.origins = origins
+        self.tree = tree
+        self.dirty = set()  # ids of statements to print again
+        self.changed = False
+        self.else_lines = {}  # id of an if: index of its else: line
+        self.elifs = set()  # ids of ifs written as elif
+        for node in ast.walk(tree):
+            if type(node) is ast.If and node.orelse:
+                first = node.orelse[0]
+                if type(first) is ast.If and lines[first.lineno - 1].lstrip().startswith("elif "):
+                    self.elifs.add(id(first))
+                else:
+                    self.else_lines[id(node)] = first.lineno - 2
+        # Every line must come back unchanged before anything is changed
+        if self.render()[0] != lines:
+            raise NotOptimizable()
+
+    def transform(self, make_transformer):
+        for statement in [node for node in ast.walk(self.tree) if isinstance(node, ast.stmt)]:
+            transformer = make_transformer()
+            for field, value in expression_fields(statement):
+                if isinstance(value, ast.expr):
+                    setattr(statement, field, transformer.visit(value))
+                elif type(value) is list:
+                    value[:] = [transformer.visit(item) if isinstance(item, ast.expr) else item for item in value]
+            if transformer.changed:
+                self.dirty.add(id(statement))
+                self.changed = True
+
+    def eliminate_dead_code(self):
+        for body in statement_lists(self.tree):
+            for i, statement in enumerate(body):
+                if isinstance(statement, JUMPS) and i + 1 < len(body):
+                    del body[i + 1:]
+                    self.changed = True
+                    break
+
+    def convert_counted_loops(self):
+        function = self.tree.body[0]
+        global_names = {name for node in ast.walk(function) if type(node) is ast.Global for name in node.names}
+        for body in list(statement_lists(function)):
+            i = 0
+            while i < len(body):
+                loop = counted_loop(body, i, global_names)
+                if loop is not None:
+                    body[i:i + 1] = self.for_loop(body[i], *loop)
+                i += 1
+
+    def for_loop(self, loop, var, start, stop):
+        """
+        Returns the for loop replacing a counted while loop and the
+        assignment of the value the while loop leaves in its variable.
+        """
+        body = loop.body[:-1]
+        if not body:
+            body = [ast.copy_location(ast.Pass(), loop.body[-1])]
+            self.dirty.add(id(body[0]))
+        iterator = ast.Call(ast.Name("range", ast.Load()), [literal(start, loop), literal(stop, loop)], [])
+        for_loop = ast.copy_location(ast.For(ast.Name(var, ast.Store()), iterator, body, [], None), loop)
+        final = ast.copy_location(ast.Assign([ast.Name(var, ast.Store())], literal(max(start, stop), loop), None),
+                                  loop)
+        self.dirty.update((id(for_loop), id(final)))
+        self.changed = True
+        return [for_loop, final]
+
+    def render(self):
+        lines = []
+        origins = []
+        for statement in self.tree.body:
+            self.render_statement(statement, "", lines, origins)
+        return lines, origins
+
+    def render_statement(self, statement, indent, lines, origins):
+        origin = self.origins[statement.lineno - 1]
+        dirty = id(statement) in self.dirty
+        statement_type = type(statement)
+        if not isinstance(statement, COMPOUND_STATEMENTS):
+            if not dirty and statement.end_lineno != statement.lineno:
+                raise NotOptimizable()
+            lines.append(indent + ast.unparse(statement) if dirty else self.lines[statement.lineno - 1])
+            origins.append(origin)
+            return
+
+        if not dirty:
+            header = self.lines[statement.lineno - 1]
+        elif statement_type is ast.If:
+            keyword = "elif" if id(statement) in self.elifs else "if"
+            header = f"{indent}{keyword} {ast.unparse(statement.test)}:"
+        elif statement_type is ast.While:
+            header = f"{indent}while {ast.unparse(statement.test)}:"
+        elif statement_type is ast.For:
+            header = f"{indent}for {ast.unparse(statement.target)} in {ast.unparse(statement.iter)}:"
+        else:
+            raise NotOptimizable()
+        if statement.body[0].lineno == statement.lineno and id(statement.body[0]) not in self.dirty:
+            raise NotOptimizable()  # a one-line compound statement
+        lines.append(header)
+        origins.append(origin)
+        for child in statement.body:
+            self.render_statement(child, indent + "    ", lines, origins)
+
+        if not getattr(statement, "orelse", None):
+            return
+        if statement_type is not ast.If:
+            raise NotOptimizable()
+        if id(statement.orelse[0]) in self.elifs:
+            self.render_statement(statement.orelse[0], indent, lines, origins)
+            return
+        else_line = self.else_lines[id(statement)]
+        if self.lines[else_line].strip() != "else:":
+            raise NotOptimizable()
+        lines.append(self.lines[else_line])
+        origins.append(self.origins[else_line])
+        for child in statement.orelse:
+            self.render_statement(child, indent + "    ", lines, origins)
+
+def counted_loop(body, index, global_names):
+    """
+    Returns (variable, start, stop) when body[index] is a while loop that
+    runs its variable over range(start, stop) and leaves it otherwise
+    alone, or None.
+    """
+    loop = body[index]
+    if type(loop) is not ast.While or loop.orelse or len(loop.body) == 0:
+        return None
+    test = loop.test
+    if (type(test) is not ast.Compare or len(test.ops) != 1 or type(test.ops[0]) not in (ast.Lt, ast.LtE)
+            or type(test.left) is not ast.Name):
+        return None
+    var = test.left.id
+    is_literal, limit = literal_value(test.comparators[0])
+    if not is_literal or type(limit) is not int or var in global_names:
+        return None
+
+    # The loop ends with var += 1 (or var = var + 1) and nothing else in it
+    # writes var, jumps to the next iteration or leaves the loop early
+    last = loop.body[-1]
+    if type(last) is ast.AugAssign and type(last.op) is ast.Add:
+        target, step = last.target, last.value
+    elif (type(last) is ast.Assign and len(last.targets) == 1 and type(last.value) is ast.BinOp
+          and type(last.value.op) is ast.Add and type(last.value.left) is ast.Name and last.value.left.id == var):
+        target, step = last.targets[0], last.value.right
+    else:
+        return None
+    if type(target) is not ast.Name or target.id != var or type(step) is not ast.Constant or step.value != 1 \
+            or type(step.value) is not int:
+        return None
+    for statement in loop.body[:-1]:
+        for node in ast.walk(statement):
+            if type(node) in (ast.Break, ast.Continue, ast.FunctionDef, ast.Lambda, ast.ClassDef):
+                return None
+            if type(node) is ast.Name and node.id == var and type(node.ctx) is not ast.Load:
+                return None
+
+    # The last write to var before the loop, in the same body, sets it to an int literal
+    for previous in reversed(body[:index]):
+        if var not in stored_names(previous):
+            continue
+        if (type(previous) is not ast.Assign or len(previous.targets) != 1
+                or type(previous.targets[0]) is not ast.Name or previous.targets[0].id != var):
+            return None
+        is_literal, start = literal_value(previous.value)
+        if not is_literal or type(start) is not int:
+            return None
+        return var, start, limit + 1 if type(test.ops[0]) is ast.LtE else limit
+    return None
@@ -0,0 +1,634 @@
+import re
+import time
+from array import array
+from itertools import chain, islice, repeat
+import transpile_options
+from expression_transpiler import translate_expression
+from vector_transpiler import LoopVectorizer, VECTOR_PRELUDE, ASSIGNED_NAME_PATTERN
+from name_localizer import NameLocalizer
+from optimizer import Optimizer, active_passes
+from sidecar_data import SIDECAR_MAGIC, SIDECAR_MIN_ELEMENTS, SIDECAR_SUFFIX
+from c_backend import NATIVE_IMPORTS, NATIVE_PRELUDE
+from tinypy_ir import (FunctionDef, Return, VarDeclaration, Constant, Global, Increment,
+                       ArrayDeclaration, DictDeclaration, ForRange, WhileLoop, ForEachLoop,
+                       ForDictLoop, Print, Input, Statement, Block, If, Else, BLOCK_NODES)
+
+# array.array typecodes used for typed arrays under the "array" backend;
+# dyn and string arrays always stay lists. Char arrays use 'w', which
+# replaced the deprecated 'u' in Python 3.13; generated code picks 'u'
+# where 'w' does not exist yet.
+ARRAY_TYPECODES = {
+    'int': 'q',
+    'float': 'd',
+    'bool': 'b',
+    'char': 'w',
+}
+# The imports and runtime helper every module using the "array" backend starts with
+ARRAY_PRELUDE = "from array import array as _tpy_array"
+ARRAY_IMPORTS = [
+    ARRAY_PRELUDE,
+    "from array import typecodes as _tpy_typecodes",
+]
+ARRAY_HELPERS = [
+    "_tpy_char_typecode = 'w' if 'w' in _tpy_typecodes else 'u'",
+]
+
+# NumPy dtypes used for typed arrays under the "numpy" backend; char, dyn
+# and string arrays stay lists
+NUMPY_DTYPES = {
+    'int': 'int64',
+    'float': 'float64',
+    'bool': 'bool_',
+}
+NUMPY_PRELUDE = "import numpy as _tpy_np"
+
+# How each enter() format converts the line it reads
+INPUT_CONVERSIONS = {
+    'i': "int({})",
+    'f': "float({})",
+    'b': "{}.lower() in ['true', '1']",
+    'c': "{}[0]",
+    's': "{}",
+    'dy': "{}",
+}
+
+# Line reader and printer called by generated code in each io_mode
+IO_CALLS = {
+    "standard": ("input()", "print"),
+    "buffered": ("_tpy_input()", "_tpy_print"),
+}
+
+# Imports and runtime helpers every module using buffered I/O starts with.
+# Input is read line by line from the binary stdin buffer; printed lines
+# are collected and written in bulk, and at exit (including after an error).
+IO_IMPORTS = [
+    "import atexit as _tpy_atexit",
+    "import sys as _tpy_sys",
+]
+IO_PRELUDE = [
+    "_tpy_readline = _tpy_sys.stdin.buffer.readline",
+    "_tpy_encoding = _tpy_sys.stdin.encoding",
+    "_tpy_crlf = _tpy_sys.platform == \"win32\"  # where input() also drops a \\r",
+    "_tpy_output = []",
+    "",
+    "def _tpy_input():",
+    "    line = _tpy_readline()",
+    "    if not line:",
+    "        raise EOFError(\"EOF when reading a line\")",
+    "    if line.endswith(b\"\\n\"):",
+    "        line = line[:-2] if _tpy_crlf and line.endswith(b\"\\r\\n\") else line[:-1]",
+    "    return line.decode(_tpy_encoding)",
+    "",
+    "def _tpy_print(*values):",
+    "    _tpy_output.append(\" \".join([str(value) for value in values]))",
+    "    if len(_tpy_output) >= 4096:",
+    "        _tpy_flush()",
+    "",
+    "def _tpy_flush():",
+    "    if _tpy_output:",
+    "        _tpy_output.append(\"\")",
+    "        _tpy_sys.stdout.write(\"\\n\".join(_tpy_output))",
+    "        _tpy_output.clear()",
+    "    _tpy_sys.stdout.flush()",
+    "",
+    "_tpy_atexit.register(_tpy_flush)",
+]
+
+# Imports and loaders every module using sidecar data starts with. The
+# data file is mapped copy-on-write on first use, so arrays can be viewed
+# in place and written to without touching the file.
+SIDECAR_IMPORTS = [
+    ARRAY_PRELUDE,
+    "import marshal as _tpy_marshal",
+    "import mmap as _tpy_mmap",
+    "import os as _tpy_os",
+    "import sys as _tpy_sys",
+]
+SIDECAR_PRELUDE = [
+    "_tpy_data_file = None",
+    "",
+    "def _tpy_data():",
+    "    global _tpy_data_file",
+    "    if _tpy_data_file is None:",
+    f"        path = _tpy_os.path.splitext(_tpy_os.path.abspath(__file__))[0] + {SIDECAR_SUFFIX!r}",
+    "        with open(path, \"rb\") as f:",
+    "            data = _tpy_mmap.mmap(f.fileno(), 0, access=_tpy_mmap.ACCESS_COPY)",
+    f"        if data[:{len(SIDECAR_MAGIC)}] != {SIDECAR_MAGIC!r}:",
+    "            raise ValueError(path + \" is not a TinyPy data file\")",
+    "        _tpy_data_file = data",
+    "    return _tpy_data_file",
+    "",
+    "def _tpy_load_array(typecode, offset, count):",
+    "    values = _tpy_array(typecode)",
+    "    values.frombytes(memoryview(_tpy_data())[offset:offset + count * values.itemsize])",
+    "    if _tpy_sys.byteorder == \"big\":",
+    "        values.byteswap()",
+    "    return values",
+    "",
+    "def _tpy_load_list(typecode, offset, count):",
+    "    values = _tpy_load_array(typecode, offset, count)",
+    "    if typecode == \"b\":",
+    "        return list(map(bool, values))",
+    "    return values.tolist()",
+    "",
+    "def _tpy_load_dict(offset, size):",
+    "    return _tpy_marshal.loads(memoryview(_tpy_data())[offset:offset + size])",
+]
+# Under the numpy backend arrays are views of the mapped file, so pages are
+# only read once they are used
+SIDECAR_NUMPY_PRELUDE = [
+    "def _tpy_load_numpy(dtype, offset, count):",
+    "    return _tpy_np.frombuffer(_tpy_data(), dtype=dtype, count=count, offset=offset)",
+]
+# How typed array elements are stored in sidecar data: the array typecode
+# under the list and array backends and the little-endian dtype under numpy
+SIDECAR_TYPECODES = {int: 'q', float: 'd', bool: 'b'}
+SIDECAR_DTYPES = {'int': '<i8', 'float': '<f8', 'bool': '|b1'}
+
+# Plain literals that sidecar data can hold, as Python would read them
+INT_LITERAL_PATTERN = re.compile(r'-?(?:0|[1-9][0-9]*)')
+FLOAT_LITERAL_PATTERN = re.compile(r'-?(?:[0-9]+\.[0-9]*|\.[0-9]+|[0-9]+(?=[eE]))(?:[eE][-+]?[0-9]+)?')
+STRING_LITERAL_PATTERN = re.compile(r'"[^"\\\n]*"|\'[^\'\\\n]*\'')
+
+# Initializer values that are rewritten, keyed by their lowercase spelling
+BOOL_LITERALS = {'true': 'True', 'false': 'False'}
+
+# Module-level bindings in prelude lines: imports, assignments and defs
+PRELUDE_NAME_PATTERN = re.compile(r'^(?:(?:from \S+ )?import \S+ as (\w+)|(\w+) =|def (\w+)\()')
+
+def prelude(sidecar_loaders=False):
+    """
+    Returns the import lines and runtime helpers the code generated under
+    the active options relies on; empty with the default options. The
+    loaders of the sidecar_data option are only included with
+    sidecar_loaders, since they are only needed once an output has
+    actually written a data file.
+    """
+    imports = []
+    helpers = []
+    backend = transpile_options.get("array_backend")
+    if backend == "array":
+        imports.extend(ARRAY_IMPORTS)
+        helpers.append(ARRAY_HELPERS)
+    elif backend == "numpy":
+        imports.append(NUMPY_PRELUDE)
+        if transpile_options.get("vectorize"):
+            helpers.append(VECTOR_PRELUDE)
+    if transpile_options.get("io_mode") == "buffered":
+        imports.extend(IO_IMPORTS)
+        helpers.append(IO_PRELUDE)
+    if sidecar_loaders and transpile_options.get("sidecar_data"):
+        imports.extend(SIDECAR_IMPORTS)
+        helpers.append(SIDECAR_PRELUDE)
+        if backend == "numpy":
+            helpers.append(SIDECAR_NUMPY_PRELUDE)
+    if transpile_options.get("native_functions"):
+        imports.extend(NATIVE_IMPORTS)
+        helpers.append(NATIVE_PRELUDE)
+
+    # Helpers may share an import
+    lines = list(dict.fromkeys(imports))
+    for block in helpers:
+        lines.append("")
+        lines.extend(block)
+    return lines
+
+def prelude_names():
+    """
+    Returns the names the prelude binds at module level under the active
+    options.
+    """
+    names = []
+    # Code only calls the sidecar loaders in outputs that include them
+    for line in prelude(sidecar_loaders=True):
+        match = PRELUDE_NAME_PATTERN.match(line)
+        if match:
+            names.append(match.group(match.lastindex))
+    return names
+
+def convert_value(value_str):
+    """
+    Convert a string value to appropriate Python representation.
+    """
+    value_str = value_str.strip()
+    # Only booleans change; string literals, numbers and names are kept
+    # as written
+    return BOOL_LITERALS.get(value_str.lower(), value_str)
+
+def get_default_value(data_type):
+    """
+    Get default value for a given data type.
+    """
+    defaults = {
+        'int': '0',
+        'float': '0.0',
+        'bool': 'False',
+        'char': "''",
+        'string': '""',
+        'dyn': 'None'
+    }
+    return defaults.get(data_type, 'None')
+
+def has_bool_literal(values):
+    """
+    Tells whether any of the values may be spelled true or false, with one
+    scan over their joined text instead of a check per value.
+    """
+    text = ','.join(values).lower()
+    return 'true' in text or 'false' in text
+
+def format_array_values(values, array_type):
+    """
+    Formats initializer elements (already stripped) as a Python list
+    literal, in a single pass over the elements.
+    """
+    if (array_type == 'dyn' or array_type == 'bool') and has_bool_literal(values):
+        # Keep values as written except for booleans
+        items = [BOOL_LITERALS.get(part.lower(), part) for part in values]
+    elif array_type == 'string':
+        # String array - ensure all values are strings
+        items = [part if part.startswith('"') and part.endswith('"') else f'"{part}"' for part in values]
+    else:
+        # Numeric types (int, float, char), and dyn or bool values that
+        # hold no booleans, are kept as written
+        items = values
+    return '[' + ', '.join(items) + ']'
+
+def convert_dict_pairs(pairs):
+    """
+    Returns initializer pairs as a dict of converted key and value text; a
+    repeated key keeps its first position and its last value.
+    """
+    if has_bool_literal(chain.from_iterable(pairs)):
+        # Parsed pairs are already stripped, so only booleans need converting
+        return {BOOL_LITERALS.get(key.lower(), key): BOOL_LITERALS.get(value.lower(), value)
+                for key, value in pairs}
+    return dict(pairs)
+
+def format_dict_pairs(pairs):
+    """
+    Formats initializer pairs as a Python dict literal.
+    """
+    converted = convert_dict_pairs(pairs)
+    # Joined as one flat run of keys, values and separators, so no string
+    # is built per pair
+    pieces = chain.from_iterable(zip(repeat(', '), converted.keys(), repeat(': '), converted.values()))
+    return '{' + ''.join(islice(pieces, 1, None)) + '}'
+
+def literal_values(texts, booleans=False):
+    """
+    Returns the Python values of initializer elements when all of them are
+    plain literals of one kind: integers, floats, simple string literals or,
+    if booleans is set, true/false. Returns None otherwise.
+    """
+    if all(map(INT_LITERAL_PATTERN.fullmatch, texts)):
+        return list(map(int, texts))
+    if all(map(FLOAT_LITERAL_PATTERN.fullmatch, texts)):
+        return list(map(float, texts))
+    if all(map(STRING_LITERAL_PATTERN.fullmatch, texts)):
+        return [text[1:-1] for text in texts]
+    if booleans:
+        flags = [BOOL_LITERALS.get(text.lower()) for text in texts]
+        if None not in flags:
+            return [flag == 'True' for flag in flags]
+    return None
+
+def emit_sidecar_array(node, writer):
+    """
+    Moves a large typed numeric array initializer into sidecar data and
+    returns the line loading it, or None when the array stays a literal.
+    """
+    array_type = node.element_type
+    if array_type not in SIDECAR_DTYPES or node.values is None or len(node.values) < SIDECAR_MIN_ELEMENTS:
+        return None
+    values = literal_values(node.values, array_type == 'bool')
+    if values is None or type(values[0]) is str:
+        return None
+    value_type = type(values[0])
+    backend = transpile_options.get("array_backend")
+    if backend == "array":
+        loader = "_tpy_load_array"
+        typecode = ARRAY_TYPECODES[array_type]
+    elif backend == "numpy":
+        # Only conversions numpy makes exactly like array.array
+        if array_type == 'float' and value_type is not bool:
+            typecode = 'd'
+        elif value_type is not float and (array_type == 'bool') == (value_type is bool):
+            typecode = SIDECAR_TYPECODES[value_type]
+        else:
+            return None
+        loader = "_tpy_load_numpy"
+    else:
+        # Lists keep the values exactly as written
+        loader = "_tpy_load_list"
+        typecode = SIDECAR_TYPECODES[value_type]
+    try:
+        packed = array(typecode, values)
+    except (TypeError, OverflowError):
+        return None  # left to fail at run time, as the literal would
+    offset = writer.add_array(packed)
+    if backend == "numpy":
+        return f"{node.name} = {loader}('{SIDECAR_DTYPES[array_type]}', {offset}, {len(packed)})"
+    return f"{node.name} = {loader}('{typecode}', {offset}, {len(packed)})"
+
+def emit_sidecar_dict(node, writer):
+    """
+    Moves a large dict initializer whose keys and values are plain literals
+    into sidecar data and returns the line loading it, or None when the
+    dict stays a literal.
+    """
+    if node.pairs is None or len(node.pairs) < SIDECAR_MIN_ELEMENTS:
+        return None
+    # Deduplicated as text first, like the literal
+    converted = convert_dict_pairs(node.pairs)
+    keys = literal_values(list(converted.keys()), True)
+    values = literal_values(list(converted.values()), True)
+    if keys is None or values is None:
+        return None
+    offset, size = writer.add_dict(dict(zip(keys, values)))
+    return f"{node.name} = _tpy_load_dict({offset}, {size})"
+
+def emit_function_def(node):
+    return f"def {node.name}({', '.join(param.name for param in node.params)}):"
+
+def emit_return(node):
+    return "return " + node.value
+
+def emit_var_declaration(node):
+    if node.value is None:
+        return f"{node.name} = None"
+    return f"{node.name} = {translate_expression(node.value.source)}"
+
+def emit_constant(node):
+    return translate_expression(node.declaration.source)
+
+def emit_global(node):
+    return node.source.replace("universal ", "global ")
+
+def emit_increment(node):
+    return node.name + (' += 1' if node.delta > 0 else ' -= 1')
+
+def emit_array_declaration(node):
+    backend = transpile_options.get("array_backend")
+    array_type = node.element_type
+    if backend == "array" and array_type in ARRAY_TYPECODES:
+        typecode = "_tpy_char_typecode" if array_type == 'char' else f"'{ARRAY_TYPECODES[array_type]}'"
+        if node.values:
+            return f"{node.name} = _tpy_array({typecode}, {format_array_values(node.values, array_type)})"
+        if node.values is not None:
+            return f"{node.name} = _tpy_array({typecode})"
+        # Character arrays cannot hold '', so they start out as NUL characters
+        default_value = "'\\0'" if array_type == 'char' else get_default_value(array_type)
+        return f"{node.name} = _tpy_array({typecode}, [{default_value}]) * {node.size}"
+
+    if backend == "numpy" and array_type in NUMPY_DTYPES:
+        dtype = NUMPY_DTYPES[array_type]
+        if node.values is not None:
+            return f"{node.name} = _tpy_np.array({format_array_values(node.values, array_type)}, dtype=_tpy_np.{dtype})"
+        return f"{node.name} = _tpy_np.zeros({node.size}, dtype=_tpy_np.{dtype})"
+
+    if node.values is not None:
+        return f"{node.name} = {format_array_values(node.values, array_type)}"
+    if array_type == 'dyn':
+        # Dynamic array - just create empty list
+        return f"{node.name} = []"
+    # Typed array - create list with default values based on size
+    return f"{node.name} = [{get_default_value(array_type)}] * {node.size}"
+
+def emit_dict_declaration(node):
+    if node.pairs:
+        return f"{node.name} = {format_dict_pairs(node.pairs)}"
+    return f"{node.name} = {{}}"
+
+def emit_for_range(node):
+    start, limit = node.start, node.limit
+    if node.operator == '<' or node.operator == '!=':
+        return f"for {node.var} in range({start}, {limit}):"
+    if node.operator == '<=':
+        return f"for {node.var} in range({start}, ({limit}) + 1):"
+    if node.operator == '>':
+        return f"for {node.var} in range({start}, {limit}, -1):"
+    if node.operator == '>=':
+        return f"for {node.var} in range({start}, ({limit}) - 1, -1):"
+    return f"for {node.var} in range({start}, {node.condition}):"
+
+def emit_while_loop(node):
+    return f"while {translate_expression(node.condition.source)}:"
+
+def emit_foreach_loop(node):
+    return f"for {node.item} in {node.collection}:"
+
+def emit_fordict_loop(node):
+    return f"for {node.key}, {node.value} in {node.dictionary}.items():"
+
+def emit_print(node):
+    return IO_CALLS[transpile_options.get("io_mode")][1] + "(" + ", ".join(node.values) + ")"
+
+def emit_input(node):
+    value = INPUT_CONVERSIONS[node.fmt].format(IO_CALLS[transpile_options.get("io_mode")][0])
+    if node.index is None:
+        return f"{node.target} = {value}"
+    return f"{node.target}[{node.index}] = {value}"
+
+def emit_statement(node):
+    return translate_expression(node.expression.source)
+
+def emit_block(node):
+    return "" if node.header is None else emit_line(node.header)
+
+def emit_if(node):
+    keyword = "elif" if node.chained else "if"
+    return f"{keyword} {translate_expression(node.condition.source)}:"
+
+def emit_else(node):
+    return "else:"
+
+LINE_EMITTERS = {
+    FunctionDef: emit_function_def,
+    Return: emit_return,
+    VarDeclaration: emit_var_declaration,
+    Constant: emit_constant,
+    Global: emit_global,
+    Increment: emit_increment,
+    ArrayDeclaration: emit_array_declaration,
+    DictDeclaration: emit_dict_declaration,
+    ForRange: emit_for_range,
+    WhileLoop: emit_while_loop,
+    ForEachLoop: emit_foreach_loop,
+    ForDictLoop: emit_fordict_loop,
+    Print: emit_print,
+    Input: emit_input,
+    Statement: emit_statement,
+    Block: emit_block,
+    If: emit_if,
+    Else: emit_else,
+}
+
+def emit_line(node):
+    """
+    Returns the Python line for a single node: the whole statement for
+    simple nodes and the header line for blocks.
+    """
+    return LINE_EMITTERS[type(node)](node)
+
+class PythonEmitter:
+    """
+    Turns IR nodes into indented Python lines under the active options.
+    One emitter is used per file, since vectorizing loops needs to know
+    which names hold typed arrays at each point of the file. Given a
+    SidecarWriter (and the sidecar_data option), large initializers are
+    written to its data file instead of the Python source. Given a
+    NativeBuilder (and the native_functions option), every top-level def
+    is handed to it and followed by the line binding its native twin.
+    With any optimization pass on, the lines of every top-level node go
+    through the Optimizer before names are localized or functions built.
+    """
+
+    def __init__(self, stats=None, sidecar=None, native=None):
+        self.stats = stats
+        self.native = native if transpile_options.get("native_functions") else None
+        self.emitters = LINE_EMITTERS
+        if sidecar is not None and transpile_options.get("sidecar_data"):
+            # Large initializers go to the data file when they can
+            self.emitters = dict(LINE_EMITTERS)
+            self.emitters[ArrayDeclaration] = lambda node: (emit_sidecar_array(node, sidecar)
+                                                            or emit_array_declaration(node))
+            self.emitters[DictDeclaration] = lambda node: (emit_sidecar_dict(node, sidecar)
+                                                           or emit_dict_declaration(node))
+        self.vectorizer = None
+        if transpile_options.get("array_backend") == "numpy" and transpile_options.get("vectorize"):
+            self.vectorizer = LoopVectorizer()
+        self.optimizer = None
+        if active_passes():
+            self.optimizer = Optimizer(active_passes())
+        self.localizer = None
+        if transpile_options.get("localize_names"):
+            self.localizer = NameLocalizer(prelude_names())
+
+    def streams(self):
+        """
+        Tells whether nodes can be emitted one line at a time, a block's
+        header before its body is parsed. The optimizer, native builder,
+        name localizer and loop vectorizer all need whole nodes.
+        """
+        return (self.optimizer is None and self.native is None and self.localizer is None
+                and self.vectorizer is None)
+
+    def line(self, node):
+        """
+        Returns the Python line for a single node, unindented.
+        """
+        if self.vectorizer is not None:
+            self.observe(node)
+        if self.stats is None:
+            return self.emitters[type(node)](node)
+        start = time.perf_counter()
+        py_line = self.emitters[type(node)](node)
+        self.stats.add_phase("emit", time.perf_counter() - start)
+        return py_line
+
+    def observe(self, node):
+        """
+        Keeps the vectorizer's array symbol table in step with the code.
+        """
+        node_type = type(node)
+        if node_type is FunctionDef:
+            self.vectorizer.enter_function()
+        elif node_type is ArrayDeclaration:
+            array_type = node.element_type
+            self.vectorizer.declare(node.name, array_type if array_type in NUMPY_DTYPES else None)
+        elif node_type is VarDeclaration:
+            self.vectorizer.forget(node.name)
+        elif node_type is Statement:
+            match = ASSIGNED_NAME_PATTERN.match(node.expression.source)
+            if match:
+                self.vectorizer.forget(match.group(1))
+        elif node_type is Block and node.header is not None:
+            self.observe(node.header)
+
+    def emit(self, node, depth=0, line_map=None):
+        """
+        Returns the Python lines for node and everything nested in it.
+        When line_map is a list, the TinyPy line each returned line comes
+        from is appended to it.
+        """
+        lines = []
+        origins = None if line_map is None else []
+        self.emit_into(node, depth, lines, origins)
+        if self.optimizer is not None and depth == 0:
+            start = time.perf_counter()
+            lines, optimized_origins = self.optimizer.optimize(node, lines, origins)
+            if origins is not None:
+                origins = optimized_origins
+            if self.stats is not None:
+                self.stats.add_phase("optimize", time.perf_counter() - start)
+        binding = None
+        if self.native is not None and depth == 0:
+            self.native.record(node)
+            if type(node) is FunctionDef:
+                # The builder reads the def as emitted, before names are localized
+                binding = self.native.add_function(node, lines)
+        if self.localizer is not None and depth == 0:
+            # A def binds its own name before it can ever be called
+            self.localizer.record(node)
+            if type(node) is FunctionDef:
+                localized = self.localizer.localize(lines)
+                if origins is not None:
+                    # Bindings are inserted right after the def header
+                    origins[1:1] = [node.lineno] * (len(localized) - len(lines))
+                lines = localized
+        if binding is not None:
+            lines.append(binding)
+            if origins is not None:
+                origins.append(node.lineno)
+        if line_map is not None:
+            line_map.extend(origins)
+        return lines
+
+    def emit_into(self, node, depth, lines, origins=None):
+        indent = "    " * depth
+        node_type = type(node)
+
+        if node_type is If or node_type is Else:
+            lines.append(indent + self.line(node))
+            if origins is not None:
+                origins.append(node.lineno)
+            for child in node.body:
+                py_line = self.line(child)
+                if py_line:
+                    lines.append(indent + "    " + py_line)
+                    if origins is not None:
+                        origins.append(child.lineno)
+            return
+
+        if node_type in BLOCK_NODES:
+            if (node_type is ForRange and self.vectorizer is not None and len(node.body) == 1
+                    and type(node.body[0]) not in BLOCK_NODES and type(node.body[0]) not in (If, Else)):
+                header = self.line(node)
+                body = self.line(node.body[0])
+                vector_lines = self.vectorizer.transpile_loop(header, body)
+                if vector_lines is None:
+                    vector_lines = [py_line for py_line in (header, body and "    " + body) if py_line]
+                for py_line in vector_lines:
+                    lines.append(indent + py_line)
+                if origins is not None:
+                    # The whole-array form belongs to the loop line; only the
+                    # scalar body (always last) comes from the body line
+                    origins.extend([node.lineno] * (len(vector_lines) - 1))
+                    origins.append(node.body[0].lineno if body else node.lineno)
+                return
+
+            header = self.line(node)
+            if header:
+                lines.append(indent + header)
+                if origins is not None:
+                    origins.append(node.lineno)
+            for child in node.body:
+                self.emit_into(child, depth + 1, lines, origins)
+            return
+
+        py_line = self.line(node)
+        if py_line:
+            lines.append(indent + py_line)
+            if origins is not None:
+                origins.append(node.lineno)
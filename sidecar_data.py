@@ -0,0 +1,106 @@
+import marshal
+import os
+import sys
+
+# Large initializers are written next to their output as <stem>.tpyd,
+# e.g. prog.tpyd for prog.py
+SIDECAR_SUFFIX = ".tpyd"
+# Every data file starts with these 8 bytes; the last one is the format version
+SIDECAR_MAGIC = b"TPYDATA\x01"
+# Initializers with fewer elements stay literals: below this, compiling the
+# literal costs about as much as opening and mapping the data file
+SIDECAR_MIN_ELEMENTS = 1024
+# Blobs start on 8-byte boundaries, so typed views over the mapped file are aligned
+SIDECAR_ALIGNMENT = 8
+# Oldest marshal format that covers every literal stored, readable by any Python 3.4+
+MARSHAL_VERSION = 4
+
+def sidecar_path(output_path):
+    return os.path.splitext(output_path)[0] + SIDECAR_SUFFIX
+
+def is_sidecar(path):
+    """
+    Tells whether path is a data file written by SidecarWriter.
+    """
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(SIDECAR_MAGIC)) == SIDECAR_MAGIC
+    except FileNotFoundError:
+        return False
+
+def remove_sidecar(path):
+    """
+    Removes an outdated data file; anything else at path is left alone.
+    """
+    if is_sidecar(path):
+        os.remove(path)
+
+class SidecarWriter:
+    """
+    Collects the binary blobs of one output's large initializers into its
+    data file. The file is written to a temporary path and only created
+    once a first blob is added; commit() moves it into place. Typed arrays
+    are stored little-endian, dicts in marshal format.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.temp_path = path + ".tmp"
+        self.file = None
+        self.size = 0
+
+    def add(self, data):
+        """
+        Appends a blob (any bytes-like object) and returns its offset.
+        """
+        if self.file is None:
+            self.file = open(self.temp_path, "wb")
+            self.file.write(SIDECAR_MAGIC)
+            self.size = len(SIDECAR_MAGIC)
+        padding = -self.size % SIDECAR_ALIGNMENT
+        if padding:
+            self.file.write(bytes(padding))
+        offset = self.size + padding
+        self.file.write(data)
+        self.size = offset + memoryview(data).nbytes
+        return offset
+
+    def add_array(self, values):
+        """
+        Appends an array.array and returns its offset.
+        """
+        if sys.byteorder == "big" and values.itemsize > 1:
+            values = values[:]
+            values.byteswap()
+        return self.add(values)
+
+    def add_dict(self, values):
+        """
+        Appends a dict of plain values and returns (offset, size).
+        """
+        data = marshal.dumps(values, MARSHAL_VERSION)
+        return self.add(data), len(data)
+
+    def commit(self):
+        """
+        Moves the data file into place. When nothing was added, a data file
+        left by an earlier run is removed instead. Returns whether a file
+        was written.
+        """
+        if self.file is None:
+            remove_sidecar(self.path)
+            return False
+        self.file.close()
+        self.file = None
+        os.replace(self.temp_path, self.path)
+        return True
+
+    def discard(self):
+        """
+        Drops the data written so far, e.g. when transpiling failed.
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
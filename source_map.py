@@ -0,0 +1,45 @@
+import json
+import os
+
+# A map is written next to its output as <output>.map, e.g. prog.py.map
+SOURCE_MAP_SUFFIX = ".map"
+SOURCE_MAP_VERSION = 1
+
+def source_map_path(output_path):
+    return output_path + SOURCE_MAP_SUFFIX
+
+def write_source_map(path, line_map):
+    """
+    Writes a line map atomically. line_map[k] is the 1-based TinyPy line
+    that Python line k + 1 was generated from, or 0 for generated code
+    (the prelude and the main() call). The map holds no file names, so a
+    cached copy is valid wherever the same source is transpiled.
+    """
+    temp_path = path + ".tmp"
+    try:
+        with open(temp_path, "w") as f:
+            json.dump({"version": SOURCE_MAP_VERSION, "lines": line_map}, f, separators=(",", ":"))
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def read_source_map(path):
+    """
+    Returns the line list of a map written by write_source_map.
+    Raises ValueError for files that are not version 1 maps.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or data.get("version") != SOURCE_MAP_VERSION:
+        raise ValueError(f"{path} is not a version {SOURCE_MAP_VERSION} TinyPy source map")
+    return data["lines"]
+
+def tpy_line(line_map, py_lineno):
+    """
+    Returns the TinyPy line for a 1-based Python line, or 0 when the line
+    is generated or lies outside the map.
+    """
+    if 0 < py_lineno <= len(line_map):
+        return line_map[py_lineno - 1]
+    return 0
@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import socket
+import struct
+import sys
+import tempfile
+import transpile_options
+
+# Where tinypy_server listens unless told otherwise
+DEFAULT_SOCKET = os.environ.get("TINYPY_SOCKET") or os.path.join(tempfile.gettempdir(), "tinypy_server.sock")
+
+# Every message is a JSON object preceded by its length as 4 big-endian bytes
+HEADER = struct.Struct(">I")
+MAX_MESSAGE_SIZE = 1 << 30
+
+def send_message(sock, message):
+    data = json.dumps(message).encode()
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+def receive_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("connection closed mid-message")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+def receive_message(sock):
+    """
+    Reads one message. Raises ConnectionError if the peer hangs up and
+    ValueError for malformed messages.
+    """
+    (size,) = HEADER.unpack(receive_exactly(sock, HEADER.size))
+    if size > MAX_MESSAGE_SIZE:
+        raise ValueError(f"message of {size} bytes is too large")
+    return json.loads(receive_exactly(sock, size))
+
+def run_program(source, kind="tpy", stdin="", options=None, timeout=None, socket_path=DEFAULT_SOCKET):
+    """
+    Runs a program on the execution server and returns its result: a dict
+    with stdout, stderr, exit_code and seconds (time spent in the worker).
+    kind is "tpy" for TinyPy source or "py" for already transpiled Python;
+    options are transpile options such as {"io_mode": "buffered"}.
+    """
+    request = {"kind": kind, "source": source, "stdin": stdin, "options": options or {}}
+    if timeout is not None:
+        request["timeout"] = timeout
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        send_message(sock, request)
+        return receive_message(sock)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a TinyPy or Python program on a warm tinypy_server.")
+    parser.add_argument("program", help=".tpy source, or a transpiled .py file")
+    parser.add_argument("--stdin", metavar="FILE",
+                        help="file to feed the program as stdin (default: this process's stdin when it "
+                             "is not a terminal, otherwise nothing)")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help=f"server socket (default: {DEFAULT_SOCKET})")
+    parser.add_argument("--timeout", type=float, help="seconds the program may run (default: the server's)")
+    parser.add_argument("--array-backend", choices=transpile_options.CHOICES["array_backend"],
+                        help="transpile option, as for tinypy_compiler.py")
+    parser.add_argument("--no-vectorize", dest="vectorize", action="store_false", default=None,
+                        help="transpile option, as for tinypy_compiler.py")
+    parser.add_argument("--io-mode", choices=transpile_options.CHOICES["io_mode"],
+                        help="transpile option, as for tinypy_compiler.py")
+    parser.add_argument("--localize-names", action="store_true", default=None,
+                        help="transpile option, as for tinypy_compiler.py")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.program) as f:
+            source = f.read()
+        if args.stdin is not None:
+            with open(args.stdin, newline="") as f:
+                stdin = f.read()
+        elif not sys.stdin.isatty():
+            # The whole input is sent with the program, so it is read up front
+            stdin = sys.stdin.read()
+        else:
+            stdin = ""
+    except OSError as error:
+        print(f"❌ {error}", file=sys.stderr)
+        return 2
+
+    # Options without a flag here (sidecar_data needs an output file) keep their defaults
+    options = {name: getattr(args, name, None) for name in transpile_options.CHOICES
+               if getattr(args, name, None) is not None}
+    kind = "py" if args.program.endswith(".py") else "tpy"
+
+    try:
+        result = run_program(source, kind, stdin, options, args.timeout, args.socket)
+    except (OSError, ValueError) as error:
+        print(f"❌ Could not run {args.program} on the server at {args.socket}: {error}", file=sys.stderr)
+        return 2
+
+    sys.stdout.write(result["stdout"])
+    sys.stderr.write(result["stderr"])
+    return result["exit_code"]
+
+if __name__ == "__main__":
+    sys.exit(main())
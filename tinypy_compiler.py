@@ -1,8 +1,158 @@
+import argparse
+import glob
+import os
 import sys
+import line_cache
+import transpile_options
+import transpile_stats
+from optimizer import PASSES, LEVELS, level_options
 from file_transpiler import transpile_file
+from batch_transpiler import transpile_batch, print_summary
+from build_cache import BuildCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, DEFAULT_MAX_AGE
+from tinypy_watch import watch, DEFAULT_DEBOUNCE
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python tinypy_compiler.py <input.tpy>")
+# Optimization passes as spelled on the command line, e.g. fold-constants
+PASS_FLAGS = {name.replace("_", "-"): name for name in PASSES}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transpile TinyPy (.tpy) sources to Python.")
+    parser.add_argument("inputs", nargs="+", metavar="input",
+                        help=".tpy file, directory or glob pattern")
+    parser.add_argument("-o", "--out-dir",
+                        help="write outputs under this directory, mirroring the input layout")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="worker processes for batch runs (default: one per core) and for splitting "
+                             "a single large file at its functions (default: no splitting)")
+    parser.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_DIR, metavar="DIR",
+                        help=f"reuse outputs of unchanged sources from a build cache (default dir: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--cache-max-size", type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024), metavar="MB",
+                        help="evict least recently used cache entries above this size")
+    parser.add_argument("--cache-max-age", type=float, default=DEFAULT_MAX_AGE / 86400, metavar="DAYS",
+                        help="evict cache entries unused for this long")
+    parser.add_argument("--stats", nargs="?", const="-", metavar="FILE",
+                        help="report per-phase and per-transpiler timings as JSON (to stdout or FILE); "
+                             "batch runs are done in-process")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and re-transpile sources as they change (Ctrl+C to stop)")
+    parser.add_argument("--watch-backend", choices=("auto", "inotify", "poll"), default="auto",
+                        help="how --watch notices changes (default: inotify on Linux, polling elsewhere)")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE * 1000, metavar="MS",
+                        help="with --watch, wait this long after the last change before rebuilding")
+    parser.add_argument("--line-cache", nargs="?", type=int, const=line_cache.DEFAULT_SIZE, default=0,
+                        metavar="LINES",
+                        help="remember the parse of up to LINES distinct source lines (default: "
+                             f"{line_cache.DEFAULT_SIZE}), shared by every file a process transpiles; "
+                             "pays off on repetitive code")
+    parser.add_argument("--source-map", action="store_true",
+                        help="write a line map from the .py back to the .tpy next to every output (prog.py.map)")
+    parser.add_argument("--array-backend", choices=transpile_options.CHOICES["array_backend"],
+                        default=transpile_options.DEFAULTS["array_backend"],
+                        help="storage for typed arrays: Python lists, compact array.array or NumPy arrays")
+    parser.add_argument("--no-vectorize", dest="vectorize", action="store_false",
+                        help="with --array-backend numpy, keep every repeatFor loop scalar")
+    parser.add_argument("--io-mode", choices=transpile_options.CHOICES["io_mode"],
+                        default=transpile_options.DEFAULTS["io_mode"],
+                        help="buffered: enter() reads through a fast stdin reader and disp output "
+                             "is written in bulk at exit")
+    parser.add_argument("--localize-names", action="store_true",
+                        help="bind builtins and read-only globals used in loops to locals "
+                             "at the top of each function")
+    parser.add_argument("--sidecar-data", action="store_true",
+                        help="write large numeric array and literal dict initializers to a binary "
+                             "data file next to every output (prog.tpyd), loaded when they are declared")
+    parser.add_argument("--native-functions", action="store_true",
+                        help="compile functions that only use int, float and bool values to C with gcc, "
+                             "in an extension module next to every output (prog.native*.so)")
+    parser.add_argument("--bytecode", action="store_true",
+                        help="also write the compiled code object next to every output (prog.pyc), "
+                             "validated by a hash of the .py, for the native runner to execute")
+    parser.add_argument("-O", dest="level", type=int, choices=sorted(LEVELS), default=0,
+                        help="optimization level: -O1 propagates brick constants, folds constant "
+                             "expressions and drops code after ret; -O2 also turns counted repeatWhile "
+                             "loops into for loops (default: -O0, the literal translation)")
+    parser.add_argument("--enable-pass", action="append", default=[], choices=PASS_FLAGS, metavar="PASS",
+                        help=f"turn on one optimization pass on top of the -O level ({', '.join(PASS_FLAGS)})")
+    parser.add_argument("--disable-pass", action="append", default=[], choices=PASS_FLAGS, metavar="PASS",
+                        help="turn off one optimization pass of the -O level")
+    args = parser.parse_args(argv)
+    if args.watch:
+        # Watch mode rebuilds one source at a time in this process
+        ignored = [flag for flag, value in (("--cache", args.cache), ("-j/--jobs", args.jobs),
+                                            ("--stats", args.stats)) if value is not None]
+        if ignored:
+            parser.error(f"--watch cannot be combined with {', '.join(ignored)}")
+
+    passes = level_options(args.level)
+    for flag in args.enable_pass:
+        passes[PASS_FLAGS[flag]] = True
+    for flag in args.disable_pass:
+        passes[PASS_FLAGS[flag]] = False
+    transpile_options.set_options(**passes)
+    transpile_options.set_options(array_backend=args.array_backend, vectorize=args.vectorize,
+                                  io_mode=args.io_mode, localize_names=args.localize_names,
+                                  sidecar_data=args.sidecar_data, native_functions=args.native_functions,
+                                  write_bytecode=args.bytecode)
+    line_cache.configure(args.line_cache)
+
+    if args.watch:
+        try:
+            watch(args.inputs, out_dir=args.out_dir, source_map=args.source_map,
+                  backend=args.watch_backend, debounce=args.debounce / 1000)
+        except (OSError, ValueError) as error:
+            print(f"❌ {error}")
+            return 1
+        return 0
+
+    if args.stats is None:
+        return run(args)
+
+    with transpile_stats.collect() as stats:
+        status = run(args)
+    if line_cache.shared() is not None:
+        stats.line_cache = line_cache.shared().stats()
+    if args.stats == "-":
+        print(stats.to_json())
     else:
-        transpile_file(sys.argv[1])
\ No newline at end of file
+        with open(args.stats, "w") as f:
+            f.write(stats.to_json())
+    return status
+
+def run(args):
+    # A single plain file keeps the classic one-shot behaviour
+    single = args.inputs[0]
+    if (len(args.inputs) == 1 and args.out_dir is None and args.cache is None
+            and not glob.has_magic(single) and not os.path.isdir(single)):
+        transpile_file(single, source_map=args.source_map, workers=args.jobs)
+        return 0
+
+    cache = None
+    if args.cache is not None:
+        cache = BuildCache(args.cache, max_bytes=int(args.cache_max_size * 1024 * 1024),
+                           max_age=args.cache_max_age * 86400)
+
+    # Instrumentation only sees this process, so stats runs skip the pool
+    workers = 1 if args.stats is not None else args.jobs
+    try:
+        results = transpile_batch(args.inputs, out_dir=args.out_dir, workers=workers, cache=cache,
+                                  source_map=args.source_map)
+    except ValueError as error:
+        print(f"❌ {error}")
+        return 1
+    if not results:
+        print("❌ No .tpy sources found")
+        return 1
+    failed = print_summary(results)
+    if line_cache.shared() is not None:
+        lines = line_cache.summarize(result[4] for result in results)
+        print(f"🧾 line cache: {lines['hits']} hits, {lines['misses']} misses, "
+              f"{lines['evictions']} evicted ({lines['hit_rate']:.0%} hit rate)")
+
+    if cache is not None:
+        stats = cache.stats()
+        print(f"🗃️  cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['evictions']} evicted ({stats['hit_rate']:.0%} hit rate)")
+        cache.save_stats()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
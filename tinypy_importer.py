@@ -0,0 +1,145 @@
+import importlib.abc
+import importlib.util
+import marshal
+import os
+import sys
+from build_cache import output_fingerprint
+from bytecode_output import bytecode_header, store_pyc
+from file_transpiler import transpile_source
+
+SOURCE_SUFFIX = ".tpy"
+MTIME_INVALIDATION = "mtime"
+HASH_INVALIDATION = "hash"
+
+def cache_path_for(source_path):
+    """
+    Returns the __pycache__ path for a .tpy module. The name carries the
+    transpiler fingerprint (and active options) so upgrading the transpiler
+    never reuses stale bytecode, and stays apart from the cache of a transpiled foo.py that may
+    sit next to foo.tpy.
+    """
+    return importlib.util.cache_from_source(f"{source_path}-{output_fingerprint()[:8]}.py")
+
+class TinyPyLoader(importlib.abc.FileLoader):
+    """
+    Loads a .tpy module by transpiling it in memory and compiling the result,
+    caching the marshalled code object in __pycache__ with a standard pyc
+    header validated against the source mtime/size or the source hash.
+    """
+
+    invalidation = MTIME_INVALIDATION
+
+    def is_package(self, fullname):
+        return False
+
+    def get_source(self, fullname):
+        with open(self.get_filename(fullname), "rb") as f:
+            return transpile_source(f.read().decode())
+
+    def source_to_code(self, data, path):
+        return compile(transpile_source(data.decode()), path, "exec", dont_inherit=True)
+
+    def get_code(self, fullname):
+        source_path = self.get_filename(fullname)
+        cache_path = cache_path_for(source_path)
+        stat = os.stat(source_path)
+        source_bytes = None
+
+        try:
+            with open(cache_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            data = None
+
+        if data is not None and len(data) >= 16 and data[:4] == importlib.util.MAGIC_NUMBER:
+            flags = int.from_bytes(data[4:8], "little")
+            if flags == 0:
+                mtime = int.from_bytes(data[8:12], "little")
+                size = int.from_bytes(data[12:16], "little")
+                if mtime == int(stat.st_mtime) & 0xFFFFFFFF and size == stat.st_size & 0xFFFFFFFF:
+                    return marshal.loads(data[16:])
+            elif flags & 0b1:
+                with open(source_path, "rb") as f:
+                    source_bytes = f.read()
+                if data[8:16] == importlib.util.source_hash(source_bytes):
+                    return marshal.loads(data[16:])
+
+        if source_bytes is None:
+            with open(source_path, "rb") as f:
+                source_bytes = f.read()
+        code = self.source_to_code(source_bytes, source_path)
+
+        if not sys.dont_write_bytecode:
+            if self.invalidation == HASH_INVALIDATION:
+                header = bytecode_header(source_bytes)
+            else:
+                header = (importlib.util.MAGIC_NUMBER + (0).to_bytes(4, "little")
+                          + (int(stat.st_mtime) & 0xFFFFFFFF).to_bytes(4, "little")
+                          + (stat.st_size & 0xFFFFFFFF).to_bytes(4, "little"))
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                store_pyc(cache_path, header, code)
+            except OSError:
+                pass  # read-only source trees are silently skipped
+        return code
+
+class TinyPyFinder(importlib.abc.MetaPathFinder):
+    """
+    Finds `name.tpy` on sys.path (or a package's __path__). Directory
+    listings are cached and refreshed when the directory mtime changes, so
+    imports of ordinary modules pay one stat per path entry.
+    """
+
+    def __init__(self):
+        self.listings = {}
+
+    def tpy_names(self, directory):
+        try:
+            mtime = os.stat(directory).st_mtime
+        except OSError:
+            return ()
+        cached = self.listings.get(directory)
+        if cached is None or cached[0] != mtime:
+            try:
+                names = {name for name in os.listdir(directory) if name.endswith(SOURCE_SUFFIX)}
+            except OSError:
+                names = set()
+            cached = (mtime, names)
+            self.listings[directory] = cached
+        return cached[1]
+
+    def find_spec(self, fullname, path=None, target=None):
+        filename = fullname.rpartition(".")[2] + SOURCE_SUFFIX
+        for entry in (path if path is not None else sys.path):
+            if not isinstance(entry, str):
+                continue
+            directory = entry or os.getcwd()
+            if filename in self.tpy_names(directory):
+                source_path = os.path.join(directory, filename)
+                loader = TinyPyLoader(fullname, source_path)
+                return importlib.util.spec_from_file_location(fullname, source_path, loader=loader)
+        return None
+
+    def invalidate_caches(self):
+        self.listings.clear()
+
+_finder = None
+
+def install(invalidation=MTIME_INVALIDATION):
+    """
+    Makes `import foo` load foo.tpy. A .tpy module takes precedence over a
+    transpiled foo.py next to it. invalidation selects how cached bytecode is
+    checked: "mtime" (source mtime and size) or "hash" (source content).
+    """
+    global _finder
+    TinyPyLoader.invalidation = invalidation
+    if _finder is None:
+        _finder = TinyPyFinder()
+        sys.meta_path.insert(0, _finder)
+    return _finder
+
+def uninstall():
+    global _finder
+    if _finder is not None:
+        sys.meta_path.remove(_finder)
+        _finder = None
@@ -0,0 +1,264 @@
+# Intermediate representation between parsing and code generation.
+#
+# The parser turns every TinyPy line into one of the nodes below and nests
+# them into blocks; python_emitter turns the tree into Python source. Nodes
+# keep their fields in __slots__ so even huge files stay affordable, and
+# they keep the declared TinyPy types (int, float, bool, char, string, dyn,
+# dict<K,V>) for later analysis and optimization passes.
+#
+# Expressions are Expr nodes holding TinyPy expression text. Fields the
+# classic translation copies verbatim into the output (loop bounds, return
+# values, initializer elements) are kept as plain strings.
+
+TYPES = ("int", "bool", "char", "float", "string", "dyn")
+
+class Node:
+    """
+    Base class of IR nodes. lineno is the 1-based source line the node
+    came from, or None for nodes built by hand.
+    """
+    __slots__ = ("lineno",)
+
+    def __repr__(self):
+        fields = []
+        for cls in type(self).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if name != "lineno":
+                    fields.append(f"{name}={getattr(self, name)!r}")
+        return f"{type(self).__name__}({', '.join(fields)})"
+
+class Expr(Node):
+    __slots__ = ("source",)
+
+    def __init__(self, source, lineno=None):
+        self.source = source
+        self.lineno = lineno
+
+class Module(Node):
+    __slots__ = ("body",)
+
+    def __init__(self, body, lineno=None):
+        self.body = body
+        self.lineno = lineno
+
+class Param(Node):
+    """
+    A function parameter; param_type is None when no type was written.
+    """
+    __slots__ = ("param_type", "name")
+
+    def __init__(self, param_type, name, lineno=None):
+        self.param_type = param_type
+        self.name = name
+        self.lineno = lineno
+
+class FunctionDef(Node):
+    __slots__ = ("return_type", "name", "params", "body")
+
+    def __init__(self, return_type, name, params, body=None, lineno=None):
+        self.return_type = return_type
+        self.name = name
+        self.params = params
+        self.body = [] if body is None else body
+        self.lineno = lineno
+
+class Return(Node):
+    __slots__ = ("value",)
+
+    def __init__(self, value, lineno=None):
+        self.value = value
+        self.lineno = lineno
+
+class VarDeclaration(Node):
+    """
+    A scalar declaration; value is an Expr, or None when uninitialized.
+    """
+    __slots__ = ("var_type", "name", "value")
+
+    def __init__(self, var_type, name, value, lineno=None):
+        self.var_type = var_type
+        self.name = name
+        self.value = value
+        self.lineno = lineno
+
+class Constant(Node):
+    """
+    A brick constant; declaration is the line after the keyword.
+    """
+    __slots__ = ("declaration",)
+
+    def __init__(self, declaration, lineno=None):
+        self.declaration = declaration
+        self.lineno = lineno
+
+class Global(Node):
+    """
+    A universal declaration, kept as written.
+    """
+    __slots__ = ("source",)
+
+    def __init__(self, source, lineno=None):
+        self.source = source
+        self.lineno = lineno
+
+class Increment(Node):
+    __slots__ = ("name", "delta")
+
+    def __init__(self, name, delta, lineno=None):
+        self.name = name
+        self.delta = delta
+        self.lineno = lineno
+
+class ArrayDeclaration(Node):
+    """
+    A fixed-size array; values is the list of initializer elements, or
+    None when there is no initializer.
+    """
+    __slots__ = ("element_type", "name", "size", "values")
+
+    def __init__(self, element_type, name, size, values, lineno=None):
+        self.element_type = element_type
+        self.name = name
+        self.size = size
+        self.values = values
+        self.lineno = lineno
+
+class DictDeclaration(Node):
+    """
+    A dict<key_type, value_type>; pairs is a list of (key, value) source
+    strings, or None when there is no initializer.
+    """
+    __slots__ = ("name", "key_type", "value_type", "size", "pairs")
+
+    def __init__(self, name, key_type, value_type, size, pairs, lineno=None):
+        self.name = name
+        self.key_type = key_type
+        self.value_type = value_type
+        self.size = size
+        self.pairs = pairs
+        self.lineno = lineno
+
+class ForRange(Node):
+    """
+    A repeatFor loop. operator and limit come from the loop condition and
+    are None when it is not a simple comparison of the loop variable.
+    """
+    __slots__ = ("var_type", "var", "start", "operator", "limit", "condition", "body")
+
+    def __init__(self, var_type, var, start, operator, limit, condition, body=None, lineno=None):
+        self.var_type = var_type
+        self.var = var
+        self.start = start
+        self.operator = operator
+        self.limit = limit
+        self.condition = condition
+        self.body = [] if body is None else body
+        self.lineno = lineno
+
+class WhileLoop(Node):
+    __slots__ = ("condition", "body")
+
+    def __init__(self, condition, body=None, lineno=None):
+        self.condition = condition
+        self.body = [] if body is None else body
+        self.lineno = lineno
+
+class ForEachLoop(Node):
+    __slots__ = ("item", "collection", "body")
+
+    def __init__(self, item, collection, body=None, lineno=None):
+        self.item = item
+        self.collection = collection
+        self.body = [] if body is None else body
+        self.lineno = lineno
+
+class ForDictLoop(Node):
+    __slots__ = ("key", "value", "dictionary", "body")
+
+    def __init__(self, key, value, dictionary, body=None, lineno=None):
+        self.key = key
+        self.value = value
+        self.dictionary = dictionary
+        self.body = [] if body is None else body
+        self.lineno = lineno
+
+class Print(Node):
+    __slots__ = ("values",)
+
+    def __init__(self, values, lineno=None):
+        self.values = values
+        self.lineno = lineno
+
+class Input(Node):
+    """
+    An enter() call; index is the element index or key, or None when the
+    target is a plain variable.
+    """
+    __slots__ = ("fmt", "target", "index")
+
+    def __init__(self, fmt, target, index=None, lineno=None):
+        self.fmt = fmt
+        self.target = target
+        self.index = index
+        self.lineno = lineno
+
+class Statement(Node):
+    """
+    Any other line, translated as an expression statement.
+    """
+    __slots__ = ("expression",)
+
+    def __init__(self, expression, lineno=None):
+        self.expression = expression
+        self.lineno = lineno
+
+class Block(Node):
+    """
+    A brace block opened by a line that is not itself a loop or function;
+    header is the node for that line.
+    """
+    __slots__ = ("header", "body")
+
+    def __init__(self, header, body=None, lineno=None):
+        self.header = header
+        self.body = [] if body is None else body
+        self.lineno = lineno
+
+class If(Node):
+    """
+    A thereBe{ ... }if(...) block, or }else if(...) when chained is set.
+    The body is flat: lines in it are translated one by one.
+    """
+    __slots__ = ("condition", "body", "chained")
+
+    def __init__(self, condition, body, chained=False, lineno=None):
+        self.condition = condition
+        self.body = body
+        self.chained = chained
+        self.lineno = lineno
+
+class Else(Node):
+    """
+    An alas{ ... } block; like If, its body is flat.
+    """
+    __slots__ = ("body",)
+
+    def __init__(self, body, lineno=None):
+        self.body = body
+        self.lineno = lineno
+
+# Nodes that own a nested body filled in by the parser
+BLOCK_NODES = (FunctionDef, ForRange, WhileLoop, ForEachLoop, ForDictLoop, Block)
+
+def walk(node):
+    """
+    Yields node and every node nested in its bodies, depth first. The
+    header of a Block comes right after the Block itself.
+    """
+    yield node
+    if type(node) is Block and node.header is not None:
+        yield node.header
+    body = getattr(node, "body", None)
+    if body:
+        for child in body:
+            yield from walk(child)
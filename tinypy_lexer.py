@@ -0,0 +1,55 @@
+import re
+from function_transpiler import FUNC_DEF_PATTERN
+
+# Line kinds produced by the lexer
+THEREBE = "thereBe"
+ALAS = "alas"
+IF_CLOSE = "if_close"            # }if(...)
+ELSE_IF_CLOSE = "else_if_close"  # }else if(...)
+IF = "if"                        # if(...) on the line after a closing brace
+ELSE_IF = "else_if"              # else if(...) on the line after a closing brace
+FUNC_DEF = "function"
+BLOCK_OPEN = "block"
+CLOSE = "close"
+STATEMENT = "statement"
+
+# Kinds that carry the condition of a preceding thereBe{ block
+CONDITION_KINDS = (IF_CLOSE, ELSE_IF_CLOSE, IF, ELSE_IF)
+
+# A single anchored pattern recognises every structural line head, so each
+# line is classified by one regex match instead of a chain of startswith()
+# and re.match() calls. The function alternative is FUNC_DEF_PATTERN
+# without its anchor.
+LINE_PATTERN = re.compile(
+    r'(?P<thereBe>thereBe\{)'
+    r'|(?P<if_close>\}if\()'
+    r'|(?P<else_if_close>\}else if\()'
+    r'|(?P<alas>alas\{)'
+    r'|(?P<if>if\()'
+    r'|(?P<else_if>else if\()'
+    r'|(?P<function>' + FUNC_DEF_PATTERN[1:] + r')'
+)
+
+def tokenize_line(line):
+    """
+    Tokenizes a single source line into a (kind, text) pair.
+    The text is the stripped line; the kind tells the parser how to treat it.
+    """
+    text = line.strip()
+
+    match = LINE_PATTERN.match(text)
+    if match:
+        return match.lastgroup, text
+
+    if text == "}":
+        return CLOSE, text
+    if text.endswith("{"):
+        return BLOCK_OPEN, text
+    return STATEMENT, text
+
+def tokenize(lines):
+    """
+    Tokenizes an iterable of source lines lazily, one line at a time.
+    """
+    for line in lines:
+        yield tokenize_line(line)
@@ -0,0 +1,244 @@
+import argparse
+import json
+import sys
+import time
+import traceback
+import transpile_options
+from file_transpiler import transpile_source
+from source_map import tpy_line
+
+class LineProfiler:
+    """
+    Times a transpiled program line by line with sys.settrace and charges
+    every Python line to the TinyPy line it was generated from. A line's
+    time runs until the next traced line starts, so it includes builtins
+    and prelude helpers it calls but not other TinyPy functions. Functions
+    are timed from call to return, including their callees; recursive calls
+    are only counted once in their time.
+    """
+
+    def __init__(self, filename, line_map):
+        self.filename = filename
+        self.line_map = line_map
+        self.line_hits = {}      # py lineno -> times started
+        self.line_seconds = {}   # py lineno -> seconds
+        self.function_calls = {}    # (name, py def lineno) -> calls
+        self.function_seconds = {}  # (name, py def lineno) -> seconds
+        self.active_calls = {}      # (name, py def lineno) -> [depth, start]
+        self.stack = []  # py lineno running in each traced frame, None before its first line
+        self.last = 0.0
+
+    def charge(self, now):
+        stack = self.stack
+        if stack:
+            lineno = stack[-1]
+            # Entering a call is charged to the line that made it
+            if lineno is None and len(stack) > 1:
+                lineno = stack[-2]
+            if lineno is not None:
+                self.line_seconds[lineno] = self.line_seconds.get(lineno, 0.0) + now - self.last
+        self.last = now
+
+    def trace_call(self, frame, event, arg):
+        code = frame.f_code
+        if event != "call" or code.co_filename != self.filename:
+            return None
+        # Prelude helpers are not TinyPy functions; their time stays with
+        # the line that called them
+        if code.co_name != "<module>" and not tpy_line(self.line_map, code.co_firstlineno):
+            return None
+        now = time.perf_counter()
+        self.charge(now)
+        self.stack.append(None)
+        if code.co_name != "<module>":
+            key = (code.co_name, code.co_firstlineno)
+            self.function_calls[key] = self.function_calls.get(key, 0) + 1
+            active = self.active_calls.get(key)
+            if active is None:
+                self.active_calls[key] = [1, now]
+            else:
+                active[0] += 1
+        return self.trace_line
+
+    def trace_line(self, frame, event, arg):
+        if event == "line":
+            self.charge(time.perf_counter())
+            lineno = frame.f_lineno
+            self.stack[-1] = lineno
+            self.line_hits[lineno] = self.line_hits.get(lineno, 0) + 1
+        elif event == "return":
+            now = time.perf_counter()
+            self.charge(now)
+            self.stack.pop()
+            code = frame.f_code
+            active = self.active_calls.get((code.co_name, code.co_firstlineno))
+            if active is not None:
+                active[0] -= 1
+                if not active[0]:
+                    key = (code.co_name, code.co_firstlineno)
+                    del self.active_calls[key]
+                    self.function_seconds[key] = self.function_seconds.get(key, 0.0) + now - active[1]
+        return self.trace_line
+
+    def run(self, code, namespace):
+        self.last = time.perf_counter()
+        sys.settrace(self.trace_call)
+        try:
+            exec(code, namespace)
+        finally:
+            sys.settrace(None)
+            now = time.perf_counter()
+            self.charge(now)
+            # Frames left by an exception or exit still count up to here
+            for key, (depth, start) in self.active_calls.items():
+                self.function_seconds[key] = self.function_seconds.get(key, 0.0) + now - start
+            self.active_calls = {}
+            self.stack = []
+
+    def report(self, source_lines):
+        """
+        Aggregates the counters per TinyPy line and function.
+        A TinyPy line's hits are those of its first generated line.
+        """
+        lines = {}
+        for lineno, seconds in self.line_seconds.items():
+            tpy_lineno = tpy_line(self.line_map, lineno)
+            if tpy_lineno:
+                entry = lines.setdefault(tpy_lineno, {"hits": 0, "seconds": 0.0})
+                entry["seconds"] += seconds
+        first_lines = {}
+        for lineno in sorted(self.line_hits):
+            first_lines.setdefault(tpy_line(self.line_map, lineno), lineno)
+        for tpy_lineno, lineno in first_lines.items():
+            if tpy_lineno:
+                lines.setdefault(tpy_lineno, {"hits": 0, "seconds": 0.0})["hits"] = self.line_hits[lineno]
+
+        functions = []
+        for key, calls in self.function_calls.items():
+            name, lineno = key
+            functions.append({"name": name, "line": tpy_line(self.line_map, lineno), "calls": calls,
+                              "seconds": self.function_seconds.get(key, 0.0)})
+
+        return {
+            "lines": [{"line": lineno, "source": source_lines[lineno - 1].strip() if lineno <= len(source_lines) else "",
+                       **entry} for lineno, entry in sorted(lines.items())],
+            "functions": sorted(functions, key=lambda entry: entry["line"]),
+        }
+
+def print_tpy_traceback(error, filename, source_path, line_map, source_lines):
+    """
+    Prints a traceback whose frames point at the TinyPy lines they came
+    from. Frames in generated code (the main() call) are left out.
+    """
+    frames = []
+    for frame in traceback.extract_tb(error.__traceback__):
+        if frame.filename != filename:
+            continue  # the profiler's own frames
+        lineno = tpy_line(line_map, frame.lineno)
+        if lineno:
+            text = source_lines[lineno - 1].strip() if lineno <= len(source_lines) else ""
+            frames.append(traceback.FrameSummary(source_path, lineno, frame.name, line=text))
+    print("Traceback (most recent call last):", file=sys.stderr)
+    print("".join(traceback.format_list(frames)), end="", file=sys.stderr)
+    print("".join(traceback.format_exception_only(type(error), error)), end="", file=sys.stderr)
+
+def profile_file(source_path, stdin=None, **options):
+    """
+    Transpiles a .tpy file in memory and runs it as __main__ under the
+    line profiler. stdin, if given, is a file object the program reads
+    instead of sys.stdin. Returns (exit code, report), where the report
+    holds per-line hits and seconds and per-function calls and seconds,
+    keyed by TinyPy line numbers.
+    """
+    with open(source_path) as f:
+        source = f.read()
+    line_map = []
+    python_source = transpile_source(source, line_map=line_map, **options)
+    filename = f"<tinypy {source_path}>"
+    code = compile(python_source, filename, "exec", dont_inherit=True)
+
+    profiler = LineProfiler(filename, line_map)
+    saved_stdin = sys.stdin
+    if stdin is not None:
+        sys.stdin = stdin
+    exit_code = 0
+    start = time.perf_counter()
+    try:
+        profiler.run(code, {"__name__": "__main__", "__file__": source_path})
+    except SystemExit as error:
+        if isinstance(error.code, int):
+            exit_code = error.code
+        elif error.code is not None:
+            print(error.code, file=sys.stderr)
+            exit_code = 1
+    except Exception as error:
+        print_tpy_traceback(error, filename, source_path, line_map, source.splitlines())
+        exit_code = 1
+    finally:
+        sys.stdin = saved_stdin
+    total = time.perf_counter() - start
+
+    report = profiler.report(source.splitlines())
+    report["file"] = source_path
+    report["seconds"] = total
+    return exit_code, report
+
+def format_report(report, top=20, sort="seconds"):
+    """
+    Formats a report as text tables of the top lines and all functions.
+    """
+    total = report["seconds"] or 1.0
+    out = [f"📊 {report['file']}: {report['seconds']:.3f}s under the profiler", "",
+           f"{'line':>6} {'hits':>10} {'seconds':>10} {'%':>6}  source"]
+    for entry in sorted(report["lines"], key=lambda entry: -entry[sort])[:top]:
+        out.append(f"{entry['line']:>6} {entry['hits']:>10} {entry['seconds']:>10.4f} "
+                   f"{100 * entry['seconds'] / total:>5.1f}%  {entry['source'][:60]}")
+    if report["functions"]:
+        function_sort = "calls" if sort == "hits" else sort
+        out += ["", f"{'line':>6} {'calls':>10} {'seconds':>10} {'%':>6}  function"]
+        for entry in sorted(report["functions"], key=lambda entry: -entry[function_sort]):
+            out.append(f"{entry['line']:>6} {entry['calls']:>10} {entry['seconds']:>10.4f} "
+                       f"{100 * entry['seconds'] / total:>5.1f}%  {entry['name']}")
+    return "\n".join(out)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a TinyPy program under a profiler and report the hot "
+                                                 "TinyPy lines and functions.")
+    parser.add_argument("program", help=".tpy source")
+    parser.add_argument("--stdin", metavar="FILE", help="file to feed the program as stdin")
+    parser.add_argument("--top", type=int, default=20, help="lines to list (default: 20)")
+    parser.add_argument("--sort", choices=("seconds", "hits"), default="seconds")
+    parser.add_argument("--json", metavar="FILE", help="also write the full report as JSON")
+    parser.add_argument("--array-backend", choices=transpile_options.CHOICES["array_backend"],
+                        help="transpile option, as for tinypy_compiler.py")
+    parser.add_argument("--no-vectorize", dest="vectorize", action="store_false", default=None,
+                        help="transpile option, as for tinypy_compiler.py")
+    parser.add_argument("--io-mode", choices=transpile_options.CHOICES["io_mode"],
+                        help="transpile option, as for tinypy_compiler.py")
+    parser.add_argument("--localize-names", action="store_true", default=None,
+                        help="transpile option, as for tinypy_compiler.py")
+    args = parser.parse_args(argv)
+
+    # Options without a flag here (sidecar_data needs an output file) keep their defaults
+    options = {name: getattr(args, name, None) for name in transpile_options.CHOICES
+               if getattr(args, name, None) is not None}
+    try:
+        if args.stdin is not None:
+            with open(args.stdin) as stdin:
+                exit_code, report = profile_file(args.program, stdin, **options)
+        else:
+            exit_code, report = profile_file(args.program, **options)
+    except OSError as error:
+        print(f"❌ {error}", file=sys.stderr)
+        return 2
+
+    # The program owns stdout, so the report goes to stderr
+    sys.stdout.flush()
+    print(format_report(report, args.top, args.sort), file=sys.stderr)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+import argparse
+import builtins
+import functools
+import io
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+import types
+import transpile_options
+from file_transpiler import transpile_source
+from tinypy_client import DEFAULT_SOCKET, send_message, receive_message
+
+# Exit code reported for programs stopped by the time limit, as timeout(1) does
+TIMEOUT_EXIT_CODE = 124
+
+# Run once in the master before forking so every worker starts with the
+# transpiler imported, its patterns compiled and its caches filled
+WARM_UP_PROGRAM = """
+int square(int x) {
+    ret x * x;
+}
+int main() {
+    int a[3] = {1, 2, 3};
+    dict d <string,int>[1] = {"k": 1};
+    repeatFor(int i = 0; i < 3; i++) {
+        thereBe{
+            disp << "big" << square(a[i]);
+        }if(a[i] > 1 && !false)
+        alas{
+            disp << "small";
+        }
+    }
+    ret 0;
+}
+"""
+
+class ProgramTimeout(BaseException):
+    """
+    Raised inside a program that ran past its time limit. A BaseException,
+    so it is not swallowed as an ordinary error.
+    """
+
+def on_timeout(signum, frame):
+    raise ProgramTimeout()
+
+@functools.lru_cache(maxsize=256)
+def compile_program(source, kind, options):
+    """
+    Transpiles (for kind "tpy") and compiles a program. Results are cached
+    per worker, so a program sent again skips both steps.
+    """
+    if kind == "tpy":
+        source = transpile_source(source, **dict(options))
+    elif kind != "py":
+        raise ValueError(f"unknown program kind: {kind!r}")
+    return compile(source, "<program>", "exec", dont_inherit=True)
+
+def exit_status(code):
+    """
+    Returns the process exit code SystemExit(code) would have produced.
+    """
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+def run_code(code, stdin_text, timeout):
+    """
+    Runs a compiled program as __main__ with fresh globals, the given stdin
+    and captured stdout/stderr. Exit handlers the program registers run
+    when it ends, as they would at interpreter exit.
+    Returns (exit code, stdout, stderr).
+    """
+    # Same newline handling as the standard streams on POSIX
+    stdin = io.TextIOWrapper(io.BytesIO(stdin_text.encode()), encoding="utf-8", newline="\n")
+    stdout_bytes = io.BytesIO()
+    stdout = io.TextIOWrapper(stdout_bytes, encoding="utf-8", newline="\n")
+    stderr = io.StringIO()
+
+    exit_handlers = []
+
+    def register(func, *args, **kwargs):
+        exit_handlers.append((func, args, kwargs))
+        return func
+
+    def unregister(func):
+        exit_handlers[:] = [handler for handler in exit_handlers if handler[0] != func]
+
+    program_atexit = types.ModuleType("atexit")
+    program_atexit.register = register
+    program_atexit.unregister = unregister
+
+    saved_streams = sys.stdin, sys.stdout, sys.stderr
+    saved_atexit = sys.modules.get("atexit")
+    sys.stdin, sys.stdout, sys.stderr = stdin, stdout, stderr
+    sys.modules["atexit"] = program_atexit
+    exit_code = 0
+    try:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            exec(code, {"__name__": "__main__", "__builtins__": builtins})
+        except SystemExit as error:
+            exit_code = exit_status(error.code)
+        except ProgramTimeout:
+            print(f"TimeoutError: program ran longer than {timeout:g}s", file=sys.stderr)
+            exit_code = TIMEOUT_EXIT_CODE
+        except BaseException as error:
+            # Leave this function's frame out, as a traceback from the
+            # interpreter would start at the program
+            traceback.print_exception(type(error), error, error.__traceback__.tb_next)
+            exit_code = 1
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+        while exit_handlers:
+            func, args, kwargs = exit_handlers.pop()
+            try:
+                func(*args, **kwargs)
+            except BaseException:
+                traceback.print_exc()
+        try:
+            stdout.flush()
+        except ValueError:
+            pass  # the program closed its stdout
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = saved_streams
+        if saved_atexit is None:
+            sys.modules.pop("atexit", None)
+        else:
+            sys.modules["atexit"] = saved_atexit
+
+    return exit_code, stdout_bytes.getvalue().decode("utf-8", "replace"), stderr.getvalue()
+
+def handle_request(request, default_timeout):
+    """
+    Runs one request and returns the response message.
+    """
+    start = time.perf_counter()
+    timeout = request.get("timeout", default_timeout)
+    try:
+        options = tuple(sorted(request.get("options", {}).items()))
+        code = compile_program(request["source"], request.get("kind", "tpy"), options)
+    except (SyntaxError, ValueError, KeyError, TypeError) as error:
+        return {"exit_code": 1, "stdout": "", "stderr": f"{type(error).__name__}: {error}\n",
+                "seconds": time.perf_counter() - start}
+
+    exit_code, stdout, stderr = run_code(code, request.get("stdin", ""), timeout)
+    return {"exit_code": exit_code, "stdout": stdout, "stderr": stderr,
+            "seconds": time.perf_counter() - start}
+
+def worker_loop(listener, max_requests, timeout):
+    """
+    Serves connections one at a time until max_requests were handled, then
+    exits so the master replaces it with a fresh worker.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGALRM, on_timeout)
+    for _ in range(max_requests):
+        connection, _ = listener.accept()
+        with connection:
+            try:
+                request = receive_message(connection)
+            except (ConnectionError, ValueError):
+                continue
+            response = handle_request(request, timeout)
+            try:
+                send_message(connection, response)
+            except OSError:
+                pass  # the client went away
+
+def spawn_worker(listener, max_requests, timeout):
+    pid = os.fork()
+    if pid == 0:
+        status = 0
+        try:
+            worker_loop(listener, max_requests, timeout)
+        except BaseException:
+            traceback.print_exc()
+            status = 1
+        finally:
+            # Skip the master's cleanup code and exit handlers
+            os._exit(status)
+    return pid
+
+def warm_up():
+    """
+    Imports and exercises the transpiler under every option value, so
+    forked workers share the warm state instead of rebuilding it.
+    """
+    for name, values in transpile_options.CHOICES.items():
+        for value in values:
+            compile_program(WARM_UP_PROGRAM, "tpy", ((name, value),))
+    compile_program.cache_clear()
+
+def serve(socket_path=DEFAULT_SOCKET, workers=None, max_requests=1000, timeout=10.0, verbose=True):
+    """
+    Listens on a Unix socket with a pool of pre-forked workers, replacing
+    any worker that exits, until SIGINT or SIGTERM.
+    """
+    if not hasattr(os, "fork") or not hasattr(socket, "AF_UNIX"):
+        raise OSError("the execution server needs os.fork and Unix sockets")
+    workers = workers or os.cpu_count() or 1
+
+    warm_up()
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Anyone who can connect can run code as this user
+    old_umask = os.umask(0o177)
+    try:
+        listener.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+    listener.listen(128)
+
+    pids = set()
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for _ in range(workers):
+            pids.add(spawn_worker(listener, max_requests, timeout))
+        if verbose:
+            print(f"✅ Serving on {socket_path} with {workers} workers")
+        while pids:
+            try:
+                pid, _ = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            pids.discard(pid)
+            if not stopping:
+                pids.add(spawn_worker(listener, max_requests, timeout))
+    finally:
+        listener.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run TinyPy programs on a pool of warm, pre-forked workers.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help=f"Unix socket to listen on (default: {DEFAULT_SOCKET})")
+    parser.add_argument("-w", "--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--max-requests", type=int, default=1000,
+                        help="programs a worker runs before it is replaced by a fresh one")
+    parser.add_argument("--timeout", type=float, default=10.0,
+                        help="seconds a program may run unless the request says otherwise (0: no limit)")
+    args = parser.parse_args(argv)
+
+    try:
+        serve(args.socket, args.workers, args.max_requests, args.timeout)
+    except OSError as error:
+        print(f"❌ {error}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+import ctypes
+import ctypes.util
+import fnmatch
+import glob
+import os
+import select
+import struct
+import sys
+import time
+from batch_transpiler import SOURCE_EXTENSION, collect_sources, glob_root, output_path_for, output_paths
+from file_transpiler import transpile_file
+
+# inotify event masks, from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len; the name follows
+
+DEFAULT_DEBOUNCE = 0.1
+DEFAULT_POLL_INTERVAL = 0.5
+
+def watch_roots(inputs):
+    """
+    Returns the directories to watch for the inputs, each with whether its
+    subdirectories matter: directories recursively, the folder of a plain
+    file, and the part of a glob pattern before its first wildcard.
+    """
+    roots = {}
+    for item in inputs:
+        if glob.has_magic(item):
+            directory = glob_root(item)
+            roots[directory] = roots.get(directory, False) or "**" in item or glob.has_magic(os.path.dirname(item))
+        elif os.path.isdir(item):
+            roots[item] = True
+        else:
+            roots.setdefault(os.path.dirname(item) or ".", False)
+    return roots
+
+def matches(path, inputs):
+    """
+    Tells whether a .tpy path is one of the sources the inputs name.
+    """
+    path = os.path.normpath(path)
+    for item in inputs:
+        if glob.has_magic(item):
+            if fnmatch.fnmatch(path, os.path.normpath(item)):
+                return True
+        elif os.path.isdir(item):
+            if path.startswith(os.path.join(os.path.normpath(item), "")) or os.path.normpath(item) == ".":
+                return True
+        elif path == os.path.normpath(item):
+            return True
+    return False
+
+class PollingWatcher:
+    """
+    Finds changed sources by comparing size and mtime snapshots of every
+    source the inputs match. Works everywhere; a scan costs one stat per
+    source every interval.
+    """
+    name = "polling"
+
+    def __init__(self, inputs, interval=DEFAULT_POLL_INTERVAL):
+        self.inputs = inputs
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        for path, _ in collect_sources(self.inputs):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout=None):
+        """
+        Returns the sources created, changed or deleted since the last call,
+        waiting up to timeout seconds (forever if None) for some.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.interval
+            if deadline is not None:
+                delay = min(delay, max(0.0, deadline - time.monotonic()))
+            time.sleep(delay)
+            snapshot = self.scan()
+            changed = {path for path in snapshot.keys() | self.snapshot.keys()
+                       if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        pass
+
+class InotifyWatcher:
+    """
+    Linux inotify through ctypes: the kernel reports writes, renames and
+    deletions in every watched directory, so nothing is scanned between
+    changes. New subdirectories are watched as they appear.
+    """
+    name = "inotify"
+
+    def __init__(self, inputs):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.inputs = inputs
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {}  # watch descriptor -> (directory, recursive)
+        for directory, recursive in watch_roots(inputs).items():
+            self.add_tree(directory, recursive)
+
+    def add_watch(self, directory, recursive):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"cannot watch {directory}: {os.strerror(errno)}")
+        self.directories[wd] = (directory, recursive)
+
+    def add_tree(self, directory, recursive):
+        """
+        Watches a directory (and, if recursive, everything below it).
+        Returns the sources already in it, which may have been written
+        before the watch was in place.
+        """
+        found = []
+        if not os.path.isdir(directory):
+            return found
+        self.add_watch(directory, recursive)
+        for dir_path, dir_names, file_names in os.walk(directory):
+            if dir_path != directory:
+                self.add_watch(dir_path, recursive)
+            if not recursive:
+                dir_names[:] = []
+            found.extend(os.path.normpath(os.path.join(dir_path, name))
+                         for name in file_names if name.endswith(SOURCE_EXTENSION))
+        return found
+
+    def read_events(self):
+        data = os.read(self.fd, 1 << 16)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost: treat every source as changed
+                changed.update(path for path, _ in collect_sources(self.inputs))
+                continue
+            if mask & IN_IGNORED:
+                self.directories.pop(wd, None)
+                continue
+            directory, recursive = self.directories.get(wd, (None, False))
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    changed.update(self.add_tree(path, recursive))
+            elif name.endswith(SOURCE_EXTENSION):
+                changed.add(os.path.normpath(path))
+        return {path for path in changed if matches(path, self.inputs)}
+
+    def wait(self, timeout=None):
+        """
+        Returns the sources created, changed or deleted, waiting up to
+        timeout seconds (forever if None) for the first event.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        return self.read_events()
+
+    def close(self):
+        os.close(self.fd)
+
+def make_watcher(inputs, backend="auto", interval=DEFAULT_POLL_INTERVAL):
+    """
+    Returns an inotify watcher on Linux (or when asked for) and a polling
+    one otherwise, or when inotify cannot be set up under "auto".
+    """
+    if backend == "poll":
+        return PollingWatcher(inputs, interval)
+    if backend == "auto" and not sys.platform.startswith("linux"):
+        return PollingWatcher(inputs, interval)
+    try:
+        return InotifyWatcher(inputs)
+    except (OSError, AttributeError):
+        # AttributeError: the C library has no inotify functions
+        if backend == "inotify":
+            raise
+        return PollingWatcher(inputs, interval)
+
+def is_stale(source_path, output_path):
+    try:
+        return os.stat(output_path).st_mtime_ns < os.stat(source_path).st_mtime_ns
+    except FileNotFoundError:
+        return True
+
+class Rebuilder:
+    """
+    Re-transpiles changed sources in this process, so the lexer, parsers
+    and compiled patterns stay warm between changes. Remembers the root
+    every source was found under, to place outputs under out_dir, and
+    raises ValueError if two sources would share an output.
+    """
+
+    def __init__(self, inputs, out_dir=None, source_map=False):
+        self.inputs = inputs
+        self.out_dir = out_dir
+        self.source_map = source_map
+        self.roots = dict(collect_sources(inputs))
+        output_paths(self.roots.items(), out_dir)
+
+    def output_path(self, source_path):
+        if source_path not in self.roots:
+            # A source created since the last scan
+            self.roots = dict(collect_sources(self.inputs))
+            output_paths(self.roots.items(), self.out_dir)
+        return output_path_for(source_path, self.roots.get(source_path), self.out_dir)
+
+    def build(self, source_path, changed_at=None):
+        """
+        Transpiles one source and reports how long it took and, given the
+        time its change was seen, the latency from change to output.
+        Returns False if the source failed to transpile.
+        """
+        if not os.path.exists(source_path):
+            self.roots.pop(source_path, None)
+            print(f"🗑️  {source_path} removed")
+            return True
+        start = time.perf_counter()
+        try:
+            output_path = self.output_path(source_path)
+            if os.path.dirname(output_path):
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            transpile_file(source_path, output_path, verbose=False, source_map=self.source_map)
+        except Exception as e:
+            print(f"❌ {source_path}: {type(e).__name__}: {e}")
+            return False
+        done = time.perf_counter()
+        message = f"✅ {source_path} -> {output_path} in {(done - start) * 1000:.1f} ms"
+        if changed_at is not None:
+            message += f" ({(done - changed_at) * 1000:.1f} ms after the change was seen)"
+        print(message)
+        return True
+
+def watch(inputs, out_dir=None, source_map=False, backend="auto", debounce=DEFAULT_DEBOUNCE,
+          interval=DEFAULT_POLL_INTERVAL):
+    """
+    Transpiles every stale source, then watches the inputs and re-transpiles
+    each source that changes. Changes are collected until none arrives for
+    debounce seconds, so an editor's burst of writes costs one rebuild.
+    Runs until interrupted.
+    """
+    # Watch first, so nothing written during the initial build is missed
+    watcher = make_watcher(inputs, backend, interval)
+    rebuilder = Rebuilder(inputs, out_dir, source_map)
+    for source_path in sorted(rebuilder.roots):
+        if is_stale(source_path, rebuilder.output_path(source_path)):
+            rebuilder.build(source_path)
+    print(f"👀 Watching {len(rebuilder.roots)} sources ({watcher.name}); press Ctrl+C to stop")
+    sys.stdout.flush()
+    pending = {}  # source -> when its first change in this burst was seen
+    last_change = 0.0
+    try:
+        while True:
+            timeout = None
+            if pending:
+                timeout = max(0.0, last_change + debounce - time.perf_counter())
+            changed = watcher.wait(timeout)
+            now = time.perf_counter()
+            if changed:
+                for path in changed:
+                    pending.setdefault(path, now)
+                last_change = now
+                continue
+            if pending and now - last_change >= debounce:
+                for path, changed_at in sorted(pending.items()):
+                    rebuilder.build(path, changed_at)
+                pending = {}
+                sys.stdout.flush()
+    except KeyboardInterrupt:
+        print("👋 Stopped watching")
+    finally:
+        watcher.close()
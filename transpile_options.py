@@ -0,0 +1,79 @@
+from contextlib import contextmanager
+
+# Code-generation options and the values each one accepts; the first
+# value is the default and reproduces the classic output.
+CHOICES = {
+    "array_backend": ("list", "array", "numpy"),
+    # Only used by the numpy backend: run recognized repeatFor idioms as
+    # whole-array operations
+    "vectorize": (True, False),
+    # How generated code reads enter() values and prints disp lines
+    "io_mode": ("standard", "buffered"),
+    # Bind builtins and read-only globals used in loops to locals at the
+    # top of each function
+    "localize_names": (False, True),
+    # Write large numeric array and literal dict initializers to a binary
+    # data file next to the output, loaded when the declaration runs
+    "sidecar_data": (False, True),
+    # Compile functions that only use int, float and bool values to C, in an
+    # extension module next to the output that the generated code binds to
+    "native_functions": (False, True),
+    # Also write the compiled code object of the output next to it (prog.pyc),
+    # validated by a hash of the .py, for the native runner to execute
+    "write_bytecode": (False, True),
+    # Optimization passes over the generated code (see optimizer.py); the
+    # -O levels of tinypy_compiler.py turn them on in groups
+    "propagate_constants": (False, True),
+    "fold_constants": (False, True),
+    "eliminate_dead_code": (False, True),
+    "while_to_for": (False, True),
+}
+
+DEFAULTS = {name: values[0] for name, values in CHOICES.items()}
+
+# Options in effect for every transpile in this process
+_options = dict(DEFAULTS)
+
+def get(name):
+    return _options[name]
+
+def current():
+    """
+    Returns a copy of the options in effect, e.g. to hand to worker processes.
+    """
+    return dict(_options)
+
+def set_options(**options):
+    """
+    Changes code-generation options for every later transpile in this process.
+    Raises ValueError for unknown options or values.
+    """
+    for name, value in options.items():
+        if name not in CHOICES:
+            raise ValueError(f"unknown transpile option: {name}")
+        if value not in CHOICES[name]:
+            raise ValueError(f"invalid value for {name}: {value!r} (choose from {', '.join(map(repr, CHOICES[name]))})")
+    _options.update(options)
+
+@contextmanager
+def using(**options):
+    """
+    Applies options to the transpiles run inside the with block:
+        with using(array_backend="array"):
+            transpile_file("prog.tpy")
+    """
+    saved = dict(_options)
+    set_options(**options)
+    try:
+        yield
+    finally:
+        _options.clear()
+        _options.update(saved)
+
+def options_key():
+    """
+    Returns a stable string naming every option that differs from its
+    default, or "" when all are defaults, for use in cache keys.
+    """
+    return ",".join(f"{name}={_options[name]}" for name in sorted(_options)
+                    if _options[name] != DEFAULTS[name])
@@ -0,0 +1,108 @@
+import heapq
+import json
+import time
+from contextlib import contextmanager
+
+# Stats collector for the current process, or None when instrumentation is off
+_active = None
+
+class TranspileStats:
+    """
+    Collects per-phase wall time, per-transpiler call/hit counts and time,
+    and the slowest source lines across every file transpiled while active.
+    """
+
+    def __init__(self, slowest_lines=10):
+        self.slowest_lines = slowest_lines
+        self.phases = {}
+        self.transpilers = {}
+        self.files = []
+        self.current_file = None
+        self._slow_lines = []  # min-heap of (seconds, sequence, file, lineno, text)
+        self._sequence = 0
+        self.line_cache = None  # LineCache.stats() of the run, when it used one
+
+    def add_phase(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def record_transpiler(self, name, matched, seconds):
+        entry = self.transpilers.get(name)
+        if entry is None:
+            entry = self.transpilers[name] = [0, 0, 0.0]
+        entry[0] += 1
+        if matched:
+            entry[1] += 1
+        entry[2] += seconds
+
+    def record_line(self, lineno, text, seconds):
+        self._sequence += 1
+        item = (seconds, self._sequence, self.current_file, lineno, text)
+        if len(self._slow_lines) < self.slowest_lines:
+            heapq.heappush(self._slow_lines, item)
+        elif seconds > self._slow_lines[0][0]:
+            heapq.heapreplace(self._slow_lines, item)
+
+    def record_file(self, path, output_lines, seconds):
+        self.files.append({"path": path, "output_lines": output_lines, "seconds": seconds})
+
+    def timed(self, name, transpiler):
+        """
+        Wraps a construct transpiler so every call is counted and timed.
+        """
+        def timed_transpiler(line):
+            start = time.perf_counter()
+            result = transpiler(line)
+            self.record_transpiler(name, result is not None, time.perf_counter() - start)
+            return result
+        return timed_transpiler
+
+    def to_dict(self):
+        return {
+            "files": self.files,
+            "phases": self.phases,
+            "transpilers": {
+                name: {"calls": calls, "hits": hits, "seconds": seconds}
+                for name, (calls, hits, seconds) in self.transpilers.items()
+            },
+            "slowest_lines": [
+                {"file": path, "line": lineno, "source": text, "seconds": seconds}
+                for seconds, _, path, lineno, text in sorted(self._slow_lines, reverse=True)
+            ],
+            "line_cache": self.line_cache,
+        }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent)
+
+def enable(slowest_lines=10):
+    """
+    Starts collecting stats for every transpile in this process.
+    """
+    global _active
+    _active = TranspileStats(slowest_lines)
+    return _active
+
+def disable():
+    """
+    Stops collecting and returns the stats gathered so far.
+    """
+    global _active
+    stats, _active = _active, None
+    return stats
+
+def active():
+    return _active
+
+@contextmanager
+def collect(slowest_lines=10):
+    """
+    Collects stats for the transpiles run inside the with block:
+        with collect() as stats:
+            transpile_file("prog.tpy")
+        print(stats.to_json())
+    """
+    stats = enable(slowest_lines)
+    try:
+        yield stats
+    finally:
+        disable()
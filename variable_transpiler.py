@@ -1,12 +1,28 @@
 import re
+from tinypy_ir import Expr, VarDeclaration, Constant, Global, Increment
+from python_emitter import emit_line
+
+DECLARATION_PATTERN = re.compile(r'^(int|bool|char|float|string|dyn)\s+(\w+)(\s*=\s*.+)?$')
+INCREMENT_PATTERN = re.compile(r'^\w+\+\+$')
+DECREMENT_PATTERN = re.compile(r'^\w+\-\-$')
 
 def transpile_variable(line):
     """
     Transpiles variable-related constructs (declarations, constants, globals, inc/dec).
     Returns None if the line is not a variable-related construct.
     """
+    node = parse_variable(line)
+    if node is None:
+        return None
+    return emit_line(node)
+
+def parse_variable(line):
+    """
+    Parses a declaration, constant, global or inc/dec statement into its node.
+    Returns None if the line is not a variable-related construct.
+    """
     # Variable declarations (with or without assignment)
-    match = re.match(r'^(int|bool|char|float|string|dyn)\s+(\w+)(\s*=\s*.+)?$', line)
+    match = DECLARATION_PATTERN.match(line)
     if match:
         var_type, var_name, assignment = match.groups()
         if assignment:
@@ -16,25 +32,38 @@ def transpile_variable(line):
                 assignment_value = 'True'
             elif assignment_value.lower() == 'false':
                 assignment_value = 'False'
-            return f"{var_name} = {assignment_value}"
+            return VarDeclaration(var_type, var_name, Expr(assignment_value))
         else:
-            return f"{var_name} = None"
+            return VarDeclaration(var_type, var_name, None)
 
     # Constant declaration (brick keyword)
     if line.startswith("brick "):
-        const_line = line.replace("brick ", "")
-        # Handle boolean constants
-        const_line = const_line.replace(' true', ' True').replace(' false', ' False')
-        return const_line
+        return Constant(Expr(line.replace("brick ", "")))
 
     # Global variable declaration (universal keyword)
     if line.startswith("universal "):
-        return line.replace("universal ", "global ")
+        return Global(line)
+
+    return parse_increment(line)
 
-    # Increment/decrement operators
-    if re.match(r'^\w+\+\+$', line):
-        return line[:-2] + ' += 1'
-    if re.match(r'^\w+\-\-$', line):
-        return line[:-2] + ' -= 1'
+def transpile_increment(line):
+    """
+    Transpiles increment/decrement statements (i++, i--).
+    Returns None if the line is not one.
+    """
+    node = parse_increment(line)
+    if node is None:
+        return None
+    return emit_line(node)
+
+def parse_increment(line):
+    """
+    Parses an increment/decrement statement into an Increment node.
+    Returns None if the line is not one.
+    """
+    if INCREMENT_PATTERN.match(line):
+        return Increment(line[:-2], 1)
+    if DECREMENT_PATTERN.match(line):
+        return Increment(line[:-2], -1)
 
-    return None
\ No newline at end of file
+    return None
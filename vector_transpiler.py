@@ -0,0 +1,195 @@
+import keyword
+import re
+
+# Scalar translation of a repeatFor header, as produced by transpile_for_loop
+SCALAR_LOOP_PATTERN = re.compile(r'^for (\w+) in (range\(.*\)):$')
+# Loop bodies that can run as whole-array operations
+ELEMENT_ASSIGN_PATTERN = re.compile(r'^(\w+)\[\s*(\w+)\s*\]\s*=\s*(.+)$')
+REDUCTION_PATTERN = re.compile(r'^(\w+)\s*=\s*(\w+)\s*([-+])\s*(.+)$')
+# Any statement that (re)binds a name, so it no longer refers to a known array
+ASSIGNED_NAME_PATTERN = re.compile(r'^(?:(?:int|bool|char|float|string|dyn)\s+)?(\w+)\s*(?:=(?!=)|$)')
+# Tokens allowed in a vectorized expression: elements indexed by the loop
+# variable, names, numbers, + - * and parentheses
+TERM_TOKEN_PATTERN = re.compile(
+    r'\s*(?:(?P<element>(?P<array>[A-Za-z_]\w*)\[\s*(?P<index>\w+)\s*\])'
+    r'|(?P<name>[A-Za-z_]\w*)'
+    r'|(?P<number>\d+(?:\.\d+)?)'
+    r'|(?P<operator>[-+*])'
+    r'|(?P<open>\()'
+    r'|(?P<close>\)))'
+)
+
+# Runtime helpers every module using vectorized loops starts with. The
+# scalar loop stays in the generated code and runs whenever the span check
+# fails, so out-of-range, negative or empty ranges and arrays that were
+# rebound to something else behave exactly as before.
+VECTOR_PRELUDE = [
+    "def _tpy_vector_span(loop_range, *arrays):",
+    "    if loop_range.step != 1 or not 0 <= loop_range.start < loop_range.stop:",
+    "        return None",
+    "    for array in arrays:",
+    "        if type(array) is not _tpy_np.ndarray or array.ndim != 1 or len(array) < loop_range.stop:",
+    "            return None",
+    "    return slice(loop_range.start, loop_range.stop)",
+    "",
+    "def _tpy_reduce(total, terms, subtract=False):",
+    "    # Integer sums wrap the same in any order; floats are accumulated",
+    "    # one term at a time so rounding matches the scalar loop",
+    "    if terms.dtype.kind in \"biu\" and isinstance(total, (int, _tpy_np.integer)):",
+    "        return total - terms.sum() if subtract else total + terms.sum()",
+    "    values = _tpy_np.concatenate(([total], terms))",
+    "    if subtract:",
+    "        values[1:] = -values[1:]",
+    "    return _tpy_np.add.accumulate(values)[-1]",
+]
+
+class LoopVectorizer:
+    """
+    Rewrites single-statement repeatFor loops over typed NumPy arrays into
+    whole-array operations: element-wise maps and fills (c[i] = a[i] * b[i],
+    a[i] = 0) and running sums (total = total + a[i] * 2). Tracks which
+    names hold typed arrays as code is emitted, per function.
+    """
+
+    def __init__(self):
+        self.module_arrays = {}
+        self.function_arrays = None  # None outside of a function
+
+    def enter_function(self):
+        """
+        Starts a new function scope; its arrays shadow module-level ones.
+        """
+        self.function_arrays = {}
+
+    def scope(self):
+        return self.function_arrays if self.function_arrays is not None else self.module_arrays
+
+    def declare(self, name, array_type):
+        """
+        Records an array declaration; array_type is None for arrays that
+        are not typed NumPy arrays.
+        """
+        self.scope()[name] = array_type
+
+    def forget(self, name):
+        """
+        Records that name was rebound to something other than a known array.
+        """
+        self.scope()[name] = None
+
+    def array_type(self, name):
+        if self.function_arrays is not None and name in self.function_arrays:
+            return self.function_arrays[name]
+        return self.module_arrays.get(name)
+
+    def vector_expression(self, text, index, total=None):
+        """
+        Rewrites an expression over elements [index] into one over the span.
+        Returns (expression, arrays, has_top_level_sum) or None when the
+        expression uses anything but typed arrays indexed by the loop
+        variable, plain names, numbers, + - * and parentheses.
+        """
+        pieces = []
+        arrays = []
+        depth = 0
+        has_top_level_sum = False
+        previous = None
+        text = text.strip()
+        position = 0
+        while position < len(text):
+            match = TERM_TOKEN_PATTERN.match(text, position)
+            if not match:
+                return None
+            position = match.end()
+            kind = match.lastgroup
+            token = match.group(kind)
+            lead = match.group()[:match.start(kind) - match.start()]
+
+            if kind == "element":
+                array = match.group("array")
+                if match.group("index") != index or self.array_type(array) is None:
+                    return None
+                arrays.append(array)
+                token = f"{array}[_tpy_span]"
+            elif kind == "name":
+                if keyword.iskeyword(token) or token == total or self.array_type(token) is not None:
+                    return None
+                if token == index:
+                    token = "_tpy_np.arange(_tpy_span.start, _tpy_span.stop)"
+            elif kind == "operator":
+                if depth == 0 and token != "*":
+                    has_top_level_sum = True
+            elif kind == "open":
+                # A parenthesis right after an operand is a call or subscript
+                if previous in ("element", "name", "number", "close"):
+                    return None
+                depth += 1
+            elif kind == "close":
+                depth -= 1
+                if depth < 0:
+                    return None
+
+            pieces.append(lead + token)
+            previous = kind
+
+        if depth != 0 or not pieces:
+            return None
+        return "".join(pieces), arrays, has_top_level_sum
+
+    def vectorize_statement(self, body, index):
+        """
+        Returns (vectorized statement, arrays it touches) for a loop body,
+        or None when the body is not a recognized idiom.
+        """
+        match = ELEMENT_ASSIGN_PATTERN.match(body)
+        if match:
+            target, target_index, value = match.groups()
+            if target_index != index or self.array_type(target) is None:
+                return None
+            result = self.vector_expression(value, index)
+            if result is None:
+                return None
+            expression, arrays, _ = result
+            return f"{target}[_tpy_span] = {expression}", [target] + arrays
+
+        match = REDUCTION_PATTERN.match(body)
+        if match:
+            total, operand, operator, value = match.groups()
+            if operand != total or total == index or self.array_type(total) is not None:
+                return None
+            result = self.vector_expression(value, index, total)
+            if result is None:
+                return None
+            expression, arrays, has_top_level_sum = result
+            # total + a[i] - b[i] is two roundings per step, not one
+            if not arrays or has_top_level_sum:
+                return None
+            subtract = ", subtract=True" if operator == "-" else ""
+            return f"{total} = _tpy_reduce({total}, {expression}{subtract})", arrays
+
+        return None
+
+    def transpile_loop(self, header, body):
+        """
+        Returns the Python lines for a single-statement repeatFor loop, given
+        the scalar translations of its header and body, or None when it
+        cannot be vectorized. The scalar loop is kept as the fallback.
+        """
+        match = SCALAR_LOOP_PATTERN.match(header)
+        if not match:
+            return None
+        index, loop_range = match.groups()
+        result = self.vectorize_statement(body, index)
+        if result is None:
+            return None
+        statement, arrays = result
+        return [
+            f"_tpy_range = {loop_range}",
+            f"_tpy_span = _tpy_vector_span(_tpy_range, {', '.join(dict.fromkeys(arrays))})",
+            "if _tpy_span is not None:",
+            f"    {statement}",
+            f"    {index} = _tpy_range[-1]",
+            "else:",
+            f"    for {index} in _tpy_range:",
+            f"        {body}",
+        ]